@@ -1,22 +1,206 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import asyncio
+import json
+import logging
+import zipfile
+import zlib
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.session import get_session
-from db.models.core import Site, TimeSeriesRaw
-from app.schemas import UploadSummary
-from app.services.ingestion import load_timeseries_from_csv, summarize_timeseries
-import pandas as pd
+from db.session import get_session, new_session
+from db.models.core import Site
+from app.config import get_settings
+from app.schemas import (
+    ArchiveSummary,
+    BatchFileResult,
+    BatchUploadSummary,
+    ProcessingSummary,
+    RepairSummary,
+    SiteCoverage,
+    UploadSummary,
+)
+from app.services.aggregation import (
+    bucket_start,
+    next_bucket,
+    parse_aggregations,
+    parse_interval,
+    resample_statement,
+)
+from app.services.manifest import record_manifest, sites_coverage
+from app.services.storage import (
+    ConflictMode,
+    raw_rows_from_long,
+    resolve_channels,
+    resolve_source,
+    upsert_raw_rows,
+)
+from app.services.workers import get_worker_pool
 from io import BytesIO
 
 router = APIRouter(prefix="/data", tags=["data"])
+logger = logging.getLogger(__name__)
+
+# What reading one damaged member can raise: bad CRC or header, corrupt deflate
+# stream, truncated data, encryption, or a compression method zipfile lacks.
+MEMBER_READ_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+
+@router.post("/upload/batch", response_model=BatchUploadSummary)
+async def upload_batch(
+    file: UploadFile = File(..., description="ZIP archive with one CSV per logger"),
+    manifest: str = Form(..., description="JSON object mapping archive member names to site ids"),
+    on_conflict: ConflictMode = "skip",
+    session: AsyncSession = Depends(get_session),
+) -> BatchUploadSummary:
+    from app.services.ingestion import parse_upload
+
+    try:
+        mapping = {str(name): int(site_id) for name, site_id in json.loads(manifest).items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest: {str(e)}")
+
+    try:
+        archive = zipfile.ZipFile(file.file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Upload is not a valid ZIP archive")
+
+    result = await session.execute(select(Site.id).where(Site.id.in_(set(mapping.values()))))
+    known_sites = set(result.scalars().all())
+
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    pool = get_worker_pool()
+    # A member holds a slot from read until its insert commits, so at most
+    # `worker_processes` payloads (bytes, parsed frame, row dicts) sit in memory.
+    inflight_slots = asyncio.Semaphore(settings.worker_processes)
+    # SQLite serializes writers anyway; concurrent transactions would only contend for the lock.
+    insert_limit = 1 if session.bind.dialect.name == "sqlite" else settings.ingest_max_concurrency
+    insert_slots = asyncio.Semaphore(insert_limit)
+
+    async def ingest_member(info: zipfile.ZipInfo) -> BatchFileResult:
+        name = info.filename
+        site_id = mapping.get(name)
+        if site_id is None:
+            return BatchFileResult(filename=name, error="Not listed in manifest")
+        if site_id not in known_sites:
+            return BatchFileResult(filename=name, site_id=site_id, error="Site not found")
+        # zipfile never inflates past the declared size, so checking it bounds the read.
+        if info.file_size > settings.batch_member_max_bytes:
+            return BatchFileResult(
+                filename=name,
+                site_id=site_id,
+                error=f"Member exceeds {settings.batch_member_max_bytes} bytes uncompressed",
+            )
+        async with inflight_slots:
+            try:
+                content = await loop.run_in_executor(None, archive.read, info)
+            except MEMBER_READ_ERRORS as e:
+                return BatchFileResult(
+                    filename=name, site_id=site_id, error=f"Failed to read member: {str(e)}"
+                )
+            try:
+                long_df, summary, units = await loop.run_in_executor(
+                    pool, parse_upload, content
+                )
+            except ValueError as e:
+                return BatchFileResult(
+                    filename=name, site_id=site_id, error=f"Failed to parse CSV: {str(e)}"
+                )
+            del content
+
+            try:
+                async with insert_slots, new_session() as member_session:
+                    channel_ids = await resolve_channels(
+                        member_session, site_id, long_df["parameter"].unique(), units
+                    )
+                    source_id = await resolve_source(member_session, name)
+                    rows = raw_rows_from_long(long_df, channel_ids, source_id)
+                    counts = await upsert_raw_rows(member_session, rows, on_conflict)
+                    recorded = await record_manifest(
+                        member_session,
+                        site_id,
+                        "batch",
+                        counts,
+                        row_count=len(long_df),
+                        source_id=source_id,
+                        on_conflict=on_conflict,
+                    )
+                    await member_session.commit()
+            except SQLAlchemyError as e:
+                # Other members may already be committed; report this one and carry on.
+                return BatchFileResult(
+                    filename=name,
+                    site_id=site_id,
+                    error=f"Failed to store data: {getattr(e, 'orig', None) or e}",
+                )
+        return BatchFileResult(
+            filename=name,
+            site_id=site_id,
+            records_imported=counts.written,
+            inserted=counts.inserted,
+            updated=counts.updated,
+            skipped=counts.skipped,
+            time_range=summary["time_range"],
+            parameters=summary["columns"],
+            manifest_id=recorded.id,
+        )
+
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    names = {info.filename for info in members}
+    missing = [
+        BatchFileResult(filename=name, site_id=site_id, error="Not found in archive")
+        for name, site_id in mapping.items()
+        if name not in names
+    ]
+    try:
+        # Every member runs to completion before the archive closes, and an
+        # unexpected failure is reported against its member rather than
+        # failing a response whose siblings have already committed.
+        outcomes = await asyncio.gather(
+            *(ingest_member(info) for info in members), return_exceptions=True
+        )
+    finally:
+        archive.close()
+    results = []
+    for info, outcome in zip(members, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, Exception):
+            logger.error("Batch member %s failed", info.filename, exc_info=outcome)
+            outcome = BatchFileResult(
+                filename=info.filename,
+                site_id=mapping.get(info.filename),
+                error=f"Failed to ingest: {str(outcome)}",
+            )
+        results.append(outcome)
+    results.extend(missing)
+
+    return BatchUploadSummary(
+        files_processed=sum(1 for r in results if r.error is None),
+        files_failed=sum(1 for r in results if r.error is not None),
+        records_imported=sum(r.records_imported for r in results),
+        inserted=sum(r.inserted for r in results),
+        updated=sum(r.updated for r in results),
+        skipped=sum(r.skipped for r in results),
+        files=results,
+    )
 
 
 @router.post("/upload/{site_id}", response_model=UploadSummary)
 async def upload_timeseries(
     site_id: int,
     file: UploadFile = File(...),
+    on_conflict: ConflictMode = "skip",
     session: AsyncSession = Depends(get_session),
 ) -> UploadSummary:
+    import pandas as pd
+    from app.services.ingestion import (
+        split_unit_headers,
+        summarize_timeseries,
+        to_long_format,
+    )
+
     # Verify site exists
     result = await session.execute(select(Site).where(Site.id == site_id))
     site = result.scalar_one_or_none()
@@ -35,52 +219,109 @@ async def upload_timeseries(
         raise HTTPException(status_code=400, detail="Missing 'timestamp' column")
 
     df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
-    
-    # Import time series data
-    records = []
-    param_cols = [c for c in df.columns if c != "timestamp"]
-    
-    for _, row in df.iterrows():
-        for param in param_cols:
-            if pd.notna(row[param]):
-                records.append(
-                    TimeSeriesRaw(
-                        site_id=site_id,
-                        parameter=param,
-                        timestamp=row["timestamp"],
-                        value=float(row[param]),
-                        unit=None,
-                        source=file.filename,
-                    )
-                )
+    # Headers like "depth (mm)" carry the unit; channels are keyed on the bare name.
+    try:
+        df, units = split_unit_headers(df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    session.add_all(records)
+    # Import time series data
+    param_cols = list(units)
+    summary = summarize_timeseries(df, param_cols)
+    channel_ids = await resolve_channels(session, site_id, param_cols, units)
+    source_id = await resolve_source(session, file.filename)
+    long_df = to_long_format(df, param_cols)
+    rows = raw_rows_from_long(long_df, channel_ids, source_id)
+    counts = await upsert_raw_rows(session, rows, on_conflict)
+    manifest = await record_manifest(
+        session,
+        site_id,
+        "upload",
+        counts,
+        row_count=len(long_df),
+        source_id=source_id,
+        on_conflict=on_conflict,
+    )
     await session.commit()
 
-    # Generate summary
-    summary = summarize_timeseries(df, param_cols)
     return UploadSummary(
         site_id=site_id,
-        records_imported=len(records),
+        records_imported=counts.written,
+        inserted=counts.inserted,
+        updated=counts.updated,
+        skipped=counts.skipped,
         time_range=summary["time_range"],
         parameters=summary["columns"],
+        manifest_id=manifest.id,
     )
 
 
+@router.get("/coverage/{site_id}", response_model=SiteCoverage)
+async def site_coverage(site_id: int, session: AsyncSession = Depends(get_session)) -> SiteCoverage:
+    """What data a site has, answered from the ingestion manifest without scanning samples."""
+    if await session.get(Site, site_id) is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+    (coverage,) = await sites_coverage(session, [site_id])
+    return SiteCoverage.model_validate(coverage)
+
+
+@router.post("/process/{site_id}", response_model=ProcessingSummary)
+async def process_site_timeseries(
+    site_id: int,
+    full: bool = Query(False, description="Ignore watermarks and reprocess all raw data"),
+    session: AsyncSession = Depends(get_session),
+) -> ProcessingSummary:
+    from app.services.processing import process_site
+
+    try:
+        result = await process_site(session, site_id, full=full)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    await session.commit()
+    return ProcessingSummary.model_validate(result)
+
+
+@router.post("/repair/{site_id}", response_model=RepairSummary)
+async def repair_site_timeseries(
+    site_id: int,
+    parameter: list[str] | None = Query(None, description="Parameters to repair; all by default"),
+    session: AsyncSession = Depends(get_session),
+) -> RepairSummary:
+    from app.services.repair import repair_sites
+
+    if await session.get(Site, site_id) is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+    (result,) = await repair_sites([site_id], parameters=parameter)
+    return RepairSummary.model_validate(result)
+
+
+@router.post("/archive/{site_id}", response_model=ArchiveSummary)
+async def archive_site_timeseries(
+    site_id: int,
+    older_than_days: int | None = Query(
+        None, ge=0, description="Archive raw samples older than this; defaults to the configured age"
+    ),
+    session: AsyncSession = Depends(get_session),
+) -> ArchiveSummary:
+    from app.services.archive import archive_sites
+
+    if await session.get(Site, site_id) is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+    (result,) = await archive_sites([site_id], older_than_days)
+    return ArchiveSummary.model_validate(result)
+
+
 @router.get("/timeseries/{site_id}")
 async def get_timeseries(
     site_id: int,
     parameter: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
     session: AsyncSession = Depends(get_session),
 ) -> list[dict]:
-    query = select(TimeSeriesRaw).where(TimeSeriesRaw.site_id == site_id)
-    if parameter:
-        query = query.where(TimeSeriesRaw.parameter == parameter)
-    query = query.order_by(TimeSeriesRaw.timestamp)
-
-    result = await session.execute(query)
-    records = result.scalars().all()
-    
+    from app.services.archive import read_raw
+
+    records = await read_raw(session, site_id, parameter, start, end)
     return [
         {
             "timestamp": r.timestamp.isoformat(),
@@ -91,3 +332,54 @@ async def get_timeseries(
         }
         for r in records
     ]
+
+
+@router.get("/timeseries/{site_id}/resample")
+async def resample_timeseries(
+    site_id: int,
+    interval: str = "15min",
+    agg: list[str] = Query(default=["mean"]),
+    parameter: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    session: AsyncSession = Depends(get_session),
+) -> list[dict]:
+    try:
+        interval_s = parse_interval(interval)
+        aggregations = parse_aggregations(agg)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if await session.get(Site, site_id) is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+
+    from app.services.archive import archive_horizon, as_utc, resample_cold
+
+    start, end = (as_utc(ts) if ts else None for ts in (start, end))
+    rows: list[dict] = []
+    # Buckets up to the first boundary past the archived range are aggregated in
+    # memory over archive + database rows, a bounded window at a time; later
+    # buckets stay in SQL.
+    horizon = await archive_horizon(session, site_id)
+    if horizon is not None and (start is None or start <= horizon):
+        split = next_bucket(horizon, interval_s)
+        cold_end = split if end is None else min(end, split)
+        rows += await resample_cold(
+            session, site_id, interval_s, aggregations, parameter, start, cold_end
+        )
+        start = split
+
+    if end is None or start is None or start < end:
+        query = resample_statement(
+            session.bind.dialect.name, site_id, interval_s, aggregations, parameter, start, end
+        )
+        rows += [dict(row._mapping) for row in await session.execute(query)]
+    rows.sort(key=lambda row: (row["parameter"], bucket_start(row["bucket"])))
+
+    return [
+        {
+            "timestamp": bucket_start(row["bucket"]).isoformat(),
+            "parameter": row["parameter"],
+            **{label: row[label] for label in aggregations},
+        }
+        for row in rows
+    ]
@@ -0,0 +1,75 @@
+from collections.abc import AsyncIterator, Callable
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.session import get_session, new_session
+from db.models.core import Project, Site
+from app.services.exports import iter_csv, iter_project_zip, iter_swmm, site_label
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+
+def _stream(
+    produce: Callable[[AsyncSession], AsyncIterator[bytes]], media_type: str, filename: str
+) -> StreamingResponse:
+    # The request-scoped session may close before the body is sent, so the
+    # generator owns a session for as long as it streams.
+    async def body() -> AsyncIterator[bytes]:
+        async with new_session() as session:
+            async for chunk in produce(session):
+                if chunk:
+                    yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def _get_site(session: AsyncSession, site_id: int) -> Site:
+    result = await session.execute(select(Site).where(Site.id == site_id))
+    site = result.scalar_one_or_none()
+    if not site:
+        raise HTTPException(status_code=404, detail="Site not found")
+    return site
+
+
+@router.get("/sites/{site_id}/csv")
+async def export_site_csv(
+    site_id: int, parameter: str | None = None, session: AsyncSession = Depends(get_session)
+) -> StreamingResponse:
+    site = await _get_site(session, site_id)
+    return _stream(
+        lambda s: iter_csv(s, site.id, parameter), "text/csv", f"{site_label(site)}_cleaned.csv"
+    )
+
+
+@router.get("/sites/{site_id}/swmm")
+async def export_site_swmm(
+    site_id: int, parameter: str = "flow", session: AsyncSession = Depends(get_session)
+) -> StreamingResponse:
+    site = await _get_site(session, site_id)
+    return _stream(
+        lambda s: iter_swmm(s, [site], parameter), "text/plain", f"{site_label(site)}_inflows.inp"
+    )
+
+
+@router.get("/projects/{project_id}/zip")
+async def export_project_zip(
+    project_id: int, parameter: str = "flow", session: AsyncSession = Depends(get_session)
+) -> StreamingResponse:
+    result = await session.execute(select(Project).where(Project.id == project_id))
+    project = result.scalar_one_or_none()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    result = await session.execute(
+        select(Site).where(Site.project_id == project_id).order_by(Site.id)
+    )
+    sites = list(result.scalars().all())
+    return _stream(
+        lambda s: iter_project_zip(s, sites, parameter),
+        "application/zip",
+        f"project_{project.id}_export.zip",
+    )
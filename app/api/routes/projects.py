@@ -1,9 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.session import get_session
 from db.models.core import Project, Site
-from app.schemas import ProjectCreate, ProjectResponse, SiteCreate, SiteResponse
+from app.config import get_settings
+from app.schemas import (
+    AlignedFrame,
+    AlignedQuery,
+    ProcessingSummary,
+    ProjectCoverage,
+    RepairSummary,
+    ProjectCreate,
+    ProjectResponse,
+    SiteCreate,
+    SiteResponse,
+)
+from app.services.aggregation import parse_interval
+from app.services.manifest import project_coverage
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -58,3 +72,112 @@ async def list_sites(
         select(Site).where(Site.project_id == project_id).order_by(Site.created_at.desc())
     )
     return list(result.scalars().all())
+
+
+@router.get("/{project_id}/coverage", response_model=ProjectCoverage)
+async def get_project_coverage(
+    project_id: int, session: AsyncSession = Depends(get_session)
+) -> ProjectCoverage:
+    if await session.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return ProjectCoverage.model_validate(await project_coverage(session, project_id))
+
+
+@router.post("/{project_id}/process", response_model=list[ProcessingSummary])
+async def process_project_timeseries(
+    project_id: int,
+    full: bool = Query(False, description="Ignore watermarks and reprocess all raw data"),
+    session: AsyncSession = Depends(get_session),
+) -> list[ProcessingSummary]:
+    from app.services.processing import process_sites
+
+    if await session.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    site_ids = list(await session.scalars(select(Site.id).where(Site.project_id == project_id)))
+    results = await process_sites(site_ids, full=full)
+    return [ProcessingSummary.model_validate(r) for r in results]
+
+
+@router.post("/{project_id}/repair", response_model=list[RepairSummary])
+async def repair_project_timeseries(
+    project_id: int,
+    parameter: list[str] | None = Query(None, description="Parameters to repair; all by default"),
+    session: AsyncSession = Depends(get_session),
+) -> list[RepairSummary]:
+    from app.services.repair import repair_sites
+
+    if await session.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    site_ids = list(await session.scalars(select(Site.id).where(Site.project_id == project_id)))
+    results = await repair_sites(site_ids, parameters=parameter)
+    return [RepairSummary.model_validate(r) for r in results]
+
+
+@router.post("/{project_id}/timeseries/query", response_model=AlignedFrame)
+async def query_aligned_timeseries(
+    project_id: int, query: AlignedQuery, session: AsyncSession = Depends(get_session)
+) -> AlignedFrame:
+    import numpy as np
+    import pandas as pd
+    from app.services.alignment import (
+        align_matrix,
+        build_wide_matrix,
+        grid_size,
+        regular_grid,
+        to_epoch_ns,
+    )
+
+    refs = list(dict.fromkeys((ref.site_id, ref.parameter) for ref in query.series))
+    site_ids = {site_id for site_id, _ in refs}
+    result = await session.execute(
+        select(Site.id).where(Site.project_id == project_id, Site.id.in_(site_ids))
+    )
+    missing = site_ids - set(result.scalars().all())
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Sites not found in project: {sorted(missing)}"
+        )
+    try:
+        step_ns = parse_interval(query.freq) * 1_000_000_000
+        tolerance_ns = parse_interval(query.tolerance) * 1_000_000_000 if query.tolerance else step_ns
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    from app.services.archive import read_series_frame
+
+    # One federated read (database + archive) for every requested series.
+    frame = await read_series_frame(session, refs, query.start, query.end)
+    frame = frame[frame["value"].notna()]
+    timestamps_ns = frame["timestamp"].to_numpy("datetime64[ns]").astype(np.int64)
+    column_idx = pd.MultiIndex.from_tuples(refs).get_indexer(
+        pd.MultiIndex.from_arrays([frame["site_id"], frame["parameter"].astype(object)])
+    )
+    values = frame["value"].to_numpy(np.float64)
+    union = np.unique(timestamps_ns)
+
+    limit = get_settings().aligned_max_points
+    if query.align == "none" or not union.size:
+        points = union.size
+    else:
+        start_ns = int(to_epoch_ns([query.start])[0] if query.start else union[0])
+        # `end` is exclusive, as in resample; without one the last sample is covered.
+        end_ns = int(to_epoch_ns([query.end])[0] if query.end else union[-1] + 1)
+        points = grid_size(start_ns, end_ns, step_ns)
+    if points > limit:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Result would have {points} rows; the limit is {limit}. "
+            "Narrow start/end or use a coarser freq.",
+        )
+    grid, matrix = build_wide_matrix(timestamps_ns, column_idx, values, len(refs), union)
+    if query.align != "none" and grid.size:
+        target = regular_grid(start_ns, end_ns, step_ns)
+        matrix = align_matrix(grid, matrix, target, query.align, tolerance_ns)
+        grid = target
+
+    instants = grid.view("datetime64[ns]").astype("datetime64[us]").astype(object)
+    return AlignedFrame(
+        timestamps=[ts.replace(tzinfo=timezone.utc) for ts in instants],
+        columns=[{"site_id": site_id, "parameter": parameter} for site_id, parameter in refs],
+        values=np.where(np.isnan(matrix), None, matrix).tolist(),
+    )
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.session import get_session
+from db.models.core import Site
+from app.schemas import ReportFormat, ReportJobResponse, ReportKind
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@router.post("/sites/{site_id}", response_model=ReportJobResponse, status_code=202)
+async def create_site_report(
+    site_id: int,
+    kind: ReportKind = "site",
+    format: ReportFormat = "pdf",
+    session: AsyncSession = Depends(get_session),
+) -> ReportJobResponse:
+    from app.services.reports import submit_report_job
+
+    result = await session.execute(select(Site.id).where(Site.id == site_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+    return ReportJobResponse.model_validate(submit_report_job(site_id, kind, format))
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_status(job_id: str) -> ReportJobResponse:
+    from app.services.reports import get_report_job
+
+    job = get_report_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return ReportJobResponse.model_validate(job)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_report(job_id: str) -> FileResponse:
+    from app.services.reports import get_report_job
+
+    job = get_report_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    if job.status != "done" or job.output_path is None:
+        raise HTTPException(status_code=409, detail=f"Report is {job.status}")
+    return FileResponse(
+        job.output_path,
+        media_type=MEDIA_TYPES[job.format],
+        filename=f"site_{job.site_id}_{job.kind}_report.{job.format}",
+    )
@@ -0,0 +1,92 @@
+from datetime import timezone
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.requests import HTTPConnection
+from pydantic import ValidationError
+from sqlalchemy import select
+from app.config import get_settings
+from app.schemas import TelemetryAck, TelemetryBatch
+from app.services.telemetry import BufferFull, TelemetryBuffer
+from db.models.core import Site
+from db.session import new_session
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+
+
+async def get_telemetry_buffer(conn: HTTPConnection) -> TelemetryBuffer:
+    """The app lifespan owns the buffer; start one on demand when no lifespan ran."""
+    buffer = getattr(conn.app.state, "telemetry", None)
+    if buffer is None:
+        buffer = TelemetryBuffer.from_settings(get_settings())
+        await buffer.start()
+        conn.app.state.telemetry = buffer
+    return buffer
+
+
+async def _unknown_sites(buffer: TelemetryBuffer, site_ids: set[int]) -> set[int]:
+    missing = site_ids - buffer.known_sites
+    if missing:
+        async with new_session() as session:
+            found = set(await session.scalars(select(Site.id).where(Site.id.in_(missing))))
+        buffer.known_sites |= found
+        missing -= found
+    return missing
+
+
+async def _accept(buffer: TelemetryBuffer, batch: TelemetryBatch) -> TelemetryAck:
+    unknown = await _unknown_sites(buffer, {r.site_id for r in batch.readings})
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown site ids: {sorted(unknown)}")
+    readings = [
+        {
+            "site_id": r.site_id,
+            "parameter": r.parameter,
+            "timestamp": (
+                r.timestamp.replace(tzinfo=timezone.utc)
+                if r.timestamp.tzinfo is None
+                else r.timestamp.astimezone(timezone.utc)
+            ),
+            "value": r.value,
+            "unit": r.unit,
+            "source": batch.device,
+        }
+        for r in batch.readings
+    ]
+    try:
+        pending = await buffer.put(readings)
+    except BufferFull as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Telemetry buffer full: {exc}",
+            headers={"Retry-After": str(max(1, round(buffer.flush_interval_s)))},
+        )
+    return TelemetryAck(accepted=len(readings), pending=pending)
+
+
+@router.post("/readings", response_model=TelemetryAck, status_code=202)
+async def post_readings(
+    batch: TelemetryBatch,
+    buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+) -> TelemetryAck:
+    return await _accept(buffer, batch)
+
+
+@router.websocket("/ws")
+async def telemetry_socket(
+    websocket: WebSocket,
+    buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+) -> None:
+    """Each text frame is a TelemetryBatch; each is answered with an ack or an error."""
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                ack = await _accept(buffer, TelemetryBatch.model_validate_json(message))
+            except ValidationError as exc:
+                await websocket.send_json({"status": 422, "detail": exc.errors(include_url=False)})
+            except HTTPException as exc:
+                await websocket.send_json({"status": exc.status_code, "detail": exc.detail})
+            else:
+                await websocket.send_json({"status": 202, **ack.model_dump()})
+    except WebSocketDisconnect:
+        pass
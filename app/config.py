@@ -15,6 +15,37 @@ class Settings(BaseSettings):
     )
     app_name: str = Field(default="Sewer Flow Model API")
     cors_allow_origins: list[str] = Field(default_factory=lambda: ["*"])
+    worker_processes: int = Field(default=4, description="Process pool size for CPU-bound work")
+    ingest_max_concurrency: int = Field(
+        default=4, description="Maximum files inserted concurrently during batch uploads"
+    )
+    batch_member_max_bytes: int = Field(
+        default=200 * 1024 * 1024,
+        description="Largest uncompressed archive member a batch upload will read",
+    )
+    aligned_max_points: int = Field(
+        default=100_000, description="Most rows a project time-series query may return, aligned or not"
+    )
+    telemetry_batch_size: int = Field(default=5000, description="Readings per telemetry flush")
+    telemetry_flush_interval_s: float = Field(default=1.0, description="Max seconds between flushes")
+    telemetry_max_pending: int = Field(
+        default=100_000, description="Buffered readings before producers are pushed back"
+    )
+    telemetry_put_timeout_s: float = Field(
+        default=5.0, description="How long a producer waits for buffer room before a 503"
+    )
+    archive_dir: str = Field(
+        default="./archive", description="Per-site/month Parquet files of archived raw samples"
+    )
+    archive_after_days: int = Field(
+        default=365, description="Raw samples older than this move to the Parquet archive"
+    )
+    report_dir: str = Field(
+        default="./reports", description="Cached report stage artifacts and rendered outputs"
+    )
+    report_job_ttl_s: int = Field(
+        default=86400, description="Finished report jobs and their outputs are removed after this"
+    )
 
 
 @lru_cache(maxsize=1)
@@ -8,28 +8,60 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import get_settings
-from app.api.routes import health, projects, data
+from app.config import Settings, get_settings
+from app.api.routes import health, projects, data, exports, reports, telemetry
+from app.services.telemetry import TelemetryBuffer
+from app.services.workers import shutdown_worker_pool
+from db.session import dispose_engine, init_engine
 
 
-settings = get_settings()
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """Build the application; the engine, worker pool and telemetry buffer live for the lifespan only."""
+    settings = settings or get_settings()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_allow_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        init_engine(settings.database_url)
+        app.state.telemetry = TelemetryBuffer.from_settings(settings)
+        await app.state.telemetry.start()
+        try:
+            yield
+        finally:
+            await app.state.telemetry.stop()
+            del app.state.telemetry
+            # Report jobs only exist once their (numeric-heavy) module has been imported.
+            reports_module = sys.modules.get("app.services.reports")
+            if reports_module is not None:
+                await reports_module.cancel_report_jobs()
+            shutdown_worker_pool()
+            await dispose_engine()
 
-app.include_router(health.router)
-app.include_router(projects.router)
-app.include_router(data.router)
+    app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
 
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_allow_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-@app.get("/")
-async def root() -> dict:
-    return {"message": "Sewer flow modelling API", "env": settings.env}
+    app.include_router(health.router)
+    app.include_router(projects.router)
+    app.include_router(data.router)
+    app.include_router(exports.router)
+    app.include_router(reports.router)
+    app.include_router(telemetry.router)
+
+    @app.get("/")
+    async def root() -> dict:
+        return {"message": "Sewer flow modelling API", "env": settings.env}
+
+    return app
+
+
+app = create_app()
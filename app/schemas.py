@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
+from typing import Literal
 
 
 class ProjectBase(BaseModel):
@@ -54,5 +55,147 @@ class TimeSeriesDataPoint(BaseModel):
 class UploadSummary(BaseModel):
     site_id: int
     records_imported: int
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
     time_range: list[str]
     parameters: dict[str, dict]
+    manifest_id: int | None = None
+
+
+class BatchFileResult(BaseModel):
+    filename: str
+    site_id: int | None = None
+    records_imported: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    time_range: list[str | None] = Field(default_factory=list)
+    parameters: dict[str, dict] = Field(default_factory=dict)
+    manifest_id: int | None = None
+    error: str | None = None
+
+
+class BatchUploadSummary(BaseModel):
+    files_processed: int
+    files_failed: int
+    records_imported: int
+    inserted: int
+    updated: int
+    skipped: int
+    files: list[BatchFileResult]
+
+
+class SeriesRef(BaseModel):
+    site_id: int
+    parameter: str
+
+
+class AlignedQuery(BaseModel):
+    series: list[SeriesRef] = Field(..., min_length=1)
+    start: datetime | None = None
+    end: datetime | None = Field(default=None, description="Exclusive upper bound")
+    align: Literal["none", "nearest", "interpolate"] = "none"
+    freq: str = Field(default="15min", description="Common grid step when aligning")
+    tolerance: str | None = Field(
+        default=None, description="Max distance to a real sample when aligning; defaults to freq"
+    )
+
+
+class AlignedFrame(BaseModel):
+    timestamps: list[datetime]
+    columns: list[SeriesRef]
+    values: list[list[float | None]]
+
+
+ReportKind = Literal["site", "qc", "hydraulics"]
+ReportFormat = Literal["pdf", "xlsx"]
+
+
+class ReportJobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    site_id: int
+    kind: ReportKind
+    format: ReportFormat
+    status: str
+    stages: dict[str, str]
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
+
+
+class TelemetryReading(BaseModel):
+    site_id: int
+    parameter: str = Field(..., min_length=1, max_length=100)
+    timestamp: datetime
+    value: float | None = None
+    unit: str | None = Field(default=None, max_length=50)
+
+
+class TelemetryBatch(BaseModel):
+    device: str = Field(..., min_length=1, max_length=255)
+    readings: list[TelemetryReading] = Field(..., max_length=10_000)
+
+
+class TelemetryAck(BaseModel):
+    accepted: int
+    pending: int
+
+
+class ProcessingSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    site_id: int
+    spans: int
+    written: dict[str, int]
+
+
+class RepairSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    site_id: int
+    repaired: dict[str, dict[str, int]]
+    unfilled: dict[str, int]
+
+
+class ArchiveSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    site_id: int
+    months: list[str]
+    rows_archived: int
+
+
+class ParameterCoverage(BaseModel):
+    parameter: str
+    unit: str | None = None
+    uploads: int
+    samples: int
+    min: float | None = None
+    max: float | None = None
+    mean: float | None = None
+    std: float | None = None
+    first_timestamp: datetime | None = None
+    last_timestamp: datetime | None = None
+
+
+class SiteCoverage(BaseModel):
+    site_id: int
+    uploads: int
+    rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    first_timestamp: datetime | None = None
+    last_timestamp: datetime | None = None
+    parameters: list[ParameterCoverage]
+
+
+class ProjectCoverage(BaseModel):
+    project_id: int
+    uploads: int
+    first_timestamp: datetime | None = None
+    last_timestamp: datetime | None = None
+    sites: list[SiteCoverage]
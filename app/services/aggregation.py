@@ -0,0 +1,173 @@
+"""SQL-side resampling of raw time series into fixed-width buckets."""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+from sqlalchemy import Float, Integer, Select, case, cast, func, literal, select
+from sqlalchemy.sql.elements import ColumnElement
+from app.services.storage import require_supported_dialect
+from db.models.core import Channel, TimeSeriesRaw
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_INTERVAL_RE = re.compile(r"^\s*(\d+)\s*(s|min|h|d)\s*$")
+_UNIT_SECONDS = {"s": 1, "min": 60, "h": 3600, "d": 86400}
+_PERCENTILE_RE = re.compile(r"^p(\d{1,2}(?:\.\d+)?|100)$")
+SIMPLE_AGGREGATIONS = {
+    "mean": func.avg,
+    "min": func.min,
+    "max": func.max,
+    "sum": func.sum,
+    "count": func.count,
+}
+
+
+def parse_interval(text: str) -> int:
+    """Parse an interval such as '15min', '1h' or '1d' into seconds."""
+    match = _INTERVAL_RE.match(text)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid interval '{text}'; use e.g. 30s, 15min, 1h, 1d")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def parse_aggregations(names: list[str]) -> dict[str, float | None]:
+    """Map aggregation labels to a percentile fraction (None for simple aggregates)."""
+    parsed: dict[str, float | None] = {}
+    for name in names:
+        if name in SIMPLE_AGGREGATIONS:
+            parsed[name] = None
+            continue
+        match = _PERCENTILE_RE.match(name)
+        if not match:
+            raise ValueError(
+                f"Unknown aggregation '{name}'; use {', '.join(SIMPLE_AGGREGATIONS)} or pNN"
+            )
+        parsed[name] = float(match.group(1)) / 100.0
+    if not parsed:
+        raise ValueError("At least one aggregation is required")
+    return parsed
+
+
+def bucket_expression(dialect: str, timestamp: ColumnElement, interval_s: int) -> ColumnElement:
+    """Bucket start for each timestamp: a timestamptz on Postgres, epoch seconds on SQLite."""
+    if dialect == "postgresql":
+        return func.date_bin(literal(timedelta(seconds=interval_s)), timestamp, literal(EPOCH))
+    require_supported_dialect(dialect)
+    epoch = cast(func.strftime("%s", timestamp), Integer)
+    return (epoch // interval_s) * interval_s
+
+
+def resample_statement(
+    dialect: str,
+    site_id: int,
+    interval_s: int,
+    aggregations: dict[str, float | None],
+    parameter: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Select:
+    """Build a GROUP BY (parameter, bucket) query returning one row per bucket."""
+    filters = [Channel.site_id == site_id, TimeSeriesRaw.value.is_not(None)]
+    if parameter:
+        filters.append(Channel.parameter == parameter)
+    if start:
+        filters.append(TimeSeriesRaw.timestamp >= start)
+    if end:
+        filters.append(TimeSeriesRaw.timestamp < end)
+
+    bucket = bucket_expression(dialect, TimeSeriesRaw.timestamp, interval_s)
+    columns = [Channel.parameter, bucket.label("bucket"), TimeSeriesRaw.value]
+    # SQLite has no percentile aggregate, so rank values within each bucket and
+    # interpolate between the two ranks straddling the requested fraction.
+    ranked = dialect == "sqlite" and any(q is not None for q in aggregations.values())
+    if ranked:
+        partition = (TimeSeriesRaw.channel_id, bucket)
+        columns += [
+            (func.row_number().over(partition_by=partition, order_by=TimeSeriesRaw.value) - 1).label("rn"),
+            func.count().over(partition_by=partition).label("n"),
+        ]
+    base = (
+        select(*columns)
+        .join(Channel, TimeSeriesRaw.channel_id == Channel.id)
+        .where(*filters)
+        .subquery()
+    )
+
+    measures = []
+    for label, q in aggregations.items():
+        if q is None:
+            measures.append(SIMPLE_AGGREGATIONS[label](base.c.value).label(label))
+        elif ranked:
+            pos = cast(base.c.n - 1, Float) * q
+            lo = cast(pos, Integer)
+            frac = pos - lo
+            measures.append(
+                func.sum(
+                    case(
+                        (base.c.rn == lo, base.c.value * (1 - frac)),
+                        (base.c.rn == lo + 1, base.c.value * frac),
+                        else_=0.0,
+                    )
+                ).label(label)
+            )
+        else:
+            measures.append(func.percentile_cont(q).within_group(base.c.value).label(label))
+
+    return (
+        select(base.c.parameter, base.c.bucket, *measures)
+        .group_by(base.c.parameter, base.c.bucket)
+        .order_by(base.c.parameter, base.c.bucket)
+    )
+
+
+def bucket_start(value: datetime | int) -> datetime:
+    """Normalize a bucket value from either dialect into an aware datetime."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return EPOCH + timedelta(seconds=int(value))
+
+
+def next_bucket(value: datetime, interval_s: int) -> datetime:
+    """Start of the first bucket that begins strictly after ``value``."""
+    seconds = int((value - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=(seconds // interval_s + 1) * interval_s)
+
+
+def resample_frame(
+    frame: "pd.DataFrame", interval_s: int, aggregations: dict[str, float | None]
+) -> list[dict]:
+    """In-memory counterpart of resample_statement for rows read outside SQL.
+
+    ``frame`` has ``parameter``, ``timestamp`` (UTC) and ``value`` columns, as
+    returned by ``archive.read_raw_frame``; grouping runs on the columns without
+    per-row Python objects. Buckets come back as epoch seconds like the SQLite
+    query, and percentiles interpolate linearly like percentile_cont.
+    """
+    import pandas as pd
+
+    frame = frame.loc[frame["value"].notna(), ["parameter", "timestamp", "value"]]
+    if frame.empty:
+        return []
+    epoch_s = (frame["timestamp"] - pd.Timestamp(EPOCH)) // pd.Timedelta(seconds=1)
+    frame = frame.assign(bucket=epoch_s // interval_s * interval_s)
+    grouped = frame.groupby(["parameter", "bucket"])["value"]
+    measures = pd.DataFrame(
+        {
+            label: grouped.agg(label) if q is None else grouped.quantile(q)
+            for label, q in aggregations.items()
+        }
+    )
+    return [
+        {
+            "parameter": parameter,
+            "bucket": int(bucket),
+            **{
+                label: int(row[label]) if label == "count" else float(row[label])
+                for label in aggregations
+            },
+        }
+        for (parameter, bucket), row in measures.iterrows()
+    ]
@@ -0,0 +1,73 @@
+"""Time alignment of multiple series into a wide NumPy matrix."""
+
+from datetime import datetime, timezone
+from typing import Iterable, Literal
+import numpy as np
+
+AlignMethod = Literal["none", "nearest", "interpolate"]
+
+
+def to_epoch_ns(timestamps: Iterable[datetime]) -> np.ndarray:
+    """Convert datetimes (naive values are taken as UTC) to int64 epoch nanoseconds."""
+    naive = [
+        ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts for ts in timestamps
+    ]
+    return np.array(naive, dtype="datetime64[ns]").astype(np.int64)
+
+
+def build_wide_matrix(
+    timestamps_ns: np.ndarray,
+    column_idx: np.ndarray,
+    values: np.ndarray,
+    n_columns: int,
+    grid: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Scatter long-format samples into a (time x column) matrix on their union grid.
+
+    ``grid`` is ``np.unique(timestamps_ns)`` when the caller already has it.
+    """
+    if grid is None:
+        grid = np.unique(timestamps_ns)
+    matrix = np.full((grid.size, n_columns), np.nan)
+    matrix[np.searchsorted(grid, timestamps_ns), column_idx] = values
+    return grid, matrix
+
+
+def grid_size(start_ns: int, end_ns: int, step_ns: int) -> int:
+    """Number of instants ``regular_grid`` would return, without building it."""
+    first = -(-start_ns // step_ns) * step_ns
+    return max(0, -(-(end_ns - first) // step_ns))
+
+
+def regular_grid(start_ns: int, end_ns: int, step_ns: int) -> np.ndarray:
+    """Grid of step-aligned instants covering [start, end)."""
+    first = -(-start_ns // step_ns) * step_ns
+    return np.arange(first, end_ns, step_ns, dtype=np.int64)
+
+
+def align_matrix(
+    grid: np.ndarray,
+    matrix: np.ndarray,
+    target: np.ndarray,
+    method: AlignMethod,
+    tolerance_ns: int,
+) -> np.ndarray:
+    """Resample each column onto ``target``; points farther than tolerance from data become NaN."""
+    aligned = np.full((target.size, matrix.shape[1]), np.nan)
+    for col in range(matrix.shape[1]):
+        valid = ~np.isnan(matrix[:, col])
+        x, y = grid[valid], matrix[valid, col]
+        if x.size == 0:
+            continue
+        right = np.clip(np.searchsorted(x, target), 0, x.size - 1)
+        left = np.clip(right - 1, 0, x.size - 1)
+        left_gap = np.abs(target - x[left])
+        right_gap = np.abs(x[right] - target)
+        nearest = np.where(left_gap <= right_gap, left, right)
+        in_reach = np.minimum(left_gap, right_gap) <= tolerance_ns
+        if method == "nearest":
+            column = y[nearest]
+        else:
+            column = np.interp(target, x, y, left=np.nan, right=np.nan)
+        aligned[:, col] = np.where(in_reach, column, np.nan)
+    return aligned
@@ -0,0 +1,460 @@
+"""Cold tier for raw samples: per-site, per-month Parquet files.
+
+Raw samples older than ``archive_after_days`` move out of ``time_series_raw``
+into ``<archive_dir>/site_<id>/<YYYY-MM>.parquet``, one ``ArchivePartition``
+catalog row per file. Rows in a file are sorted by (parameter, timestamp) and
+written in bounded row groups, so reads filtering on parameter and time skip
+row groups from their min/max statistics and decode only the requested
+columns. pyarrow is imported on first use.
+
+``read_raw_frame`` merges the database with the archive into one columnar
+frame (``read_raw`` wraps it as points, ``read_series_frame`` covers series
+across sites in one query and one scan); the catalog narrows the files to the
+requested range, and a sample present in both (an interrupted archive run or a
+re-upload) is served from the database. Parquet reads and writes run in a
+thread so they do not block the event loop.
+"""
+
+import asyncio
+import os
+from collections.abc import Collection
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.services.storage import dialect_insert
+from db.models.core import ArchivePartition, Channel, TimeSeriesRaw
+from db.session import new_session
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Rows per Parquet row group; the unit of statistics-based pruning on read.
+ARCHIVE_ROW_GROUP_SIZE = 65_536
+# Cold resampling reads and aggregates at most about this much history at a time.
+RESAMPLE_WINDOW = timedelta(days=31)
+READ_COLUMNS = ["parameter", "timestamp", "value", "qc_flag"]
+
+
+class RawPoint(NamedTuple):
+    timestamp: datetime
+    parameter: str
+    value: float | None
+    unit: str | None
+    qc_flag: str | None
+
+
+@dataclass
+class ArchiveResult:
+    site_id: int
+    months: list[str] = field(default_factory=list)
+    rows_archived: int = 0
+
+
+def as_utc(ts: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken as UTC."""
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def month_start(ts: datetime) -> datetime:
+    return as_utc(ts).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def archive_root() -> Path:
+    return Path(get_settings().archive_dir)
+
+
+def _archive_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("parameter", pa.string()),
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+            ("value", pa.float64()),
+            ("source_id", pa.int64()),
+            ("qc_flag", pa.string()),
+        ]
+    )
+
+
+def write_partition(path: Path, rows: list, existing: Path | None = None) -> int:
+    """Write rows (merged over an existing file, new rows winning) sorted for pruning.
+
+    Returns the number of rows in the file. The file is replaced atomically.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    frame = pd.DataFrame(
+        {
+            "id": [r.id for r in rows],
+            "parameter": [r.parameter for r in rows],
+            "timestamp": pd.to_datetime([as_utc(r.timestamp) for r in rows], utc=True),
+            "value": pd.array([r.value for r in rows], dtype="Float64"),
+            "source_id": pd.array([r.source_id for r in rows], dtype="Int64"),
+            "qc_flag": pd.array([r.qc_flag for r in rows], dtype="string"),
+        }
+    )
+    if existing is not None and existing.exists():
+        old = pq.read_table(existing).to_pandas()
+        frame = pd.concat([old.astype(frame.dtypes.to_dict()), frame], ignore_index=True)
+        frame = frame.drop_duplicates(["parameter", "timestamp"], keep="last")
+    frame = frame.sort_values(["parameter", "timestamp"], kind="stable")
+
+    table = pa.Table.from_pandas(frame, schema=_archive_schema(), preserve_index=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp, row_group_size=ARCHIVE_ROW_GROUP_SIZE, compression="zstd")
+    os.replace(tmp, path)
+    return table.num_rows
+
+
+def read_partitions(
+    paths: list[Path],
+    parameter: str | Collection[str] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    columns: list[str] = READ_COLUMNS,
+    with_site: bool = False,
+):
+    """Arrow table of archived rows; filters prune row groups before decoding.
+
+    ``with_site`` adds a ``site_id`` column taken from each file's
+    ``site_<id>`` directory, so several sites' partitions are read in one scan.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    filters = []
+    if isinstance(parameter, str):
+        filters.append(("parameter", "=", parameter))
+    elif parameter is not None:
+        filters.append(("parameter", "in", sorted(parameter)))
+    if start:
+        filters.append(("timestamp", ">=", as_utc(start)))
+    if end:
+        filters.append(("timestamp", "<", as_utc(end)))
+    if not with_site:
+        return pq.read_table([str(p) for p in paths], columns=columns, filters=filters or None)
+    dataset = ds.dataset(
+        [str(p) for p in paths],
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("site", pa.string())])),
+        partition_base_dir=str(archive_root()),
+    )
+    table = dataset.to_table(
+        columns=[*columns, "site"],
+        filter=pq.filters_to_expression(filters) if filters else None,
+    )
+    site_ids = pc.cast(pc.utf8_slice_codeunits(table["site"], len("site_")), pa.int64())
+    return table.drop_columns("site").append_column("site_id", site_ids)
+
+
+async def archive_site(session: AsyncSession, site_id: int, cutoff: datetime) -> ArchiveResult:
+    """Move a site's raw samples older than ``cutoff`` into monthly Parquet files.
+
+    Commits once per month so each file and its catalog row change together.
+    Run the processing pipeline first: archived samples are no longer read by it.
+    """
+    result = ArchiveResult(site_id=site_id)
+    cutoff = as_utc(cutoff)
+    channel_ids = list(await session.scalars(select(Channel.id).where(Channel.site_id == site_id)))
+    if not channel_ids:
+        return result
+    oldest = await session.scalar(
+        select(func.min(TimeSeriesRaw.timestamp)).where(
+            TimeSeriesRaw.channel_id.in_(channel_ids), TimeSeriesRaw.timestamp < cutoff
+        )
+    )
+    if oldest is None:
+        return result
+
+    month = month_start(oldest)
+    while month < cutoff:
+        end = min(next_month(month), cutoff)
+        window = [
+            TimeSeriesRaw.channel_id.in_(channel_ids),
+            TimeSeriesRaw.timestamp >= month,
+            TimeSeriesRaw.timestamp < end,
+        ]
+        rows = (
+            await session.execute(
+                select(
+                    TimeSeriesRaw.id,
+                    Channel.parameter,
+                    TimeSeriesRaw.timestamp,
+                    TimeSeriesRaw.value,
+                    TimeSeriesRaw.source_id,
+                    TimeSeriesRaw.qc_flag,
+                )
+                .join(Channel, TimeSeriesRaw.channel_id == Channel.id)
+                .where(*window)
+            )
+        ).all()
+        if rows:
+            relative = Path(f"site_{site_id}") / f"{month:%Y-%m}.parquet"
+            catalogued = await session.scalar(
+                select(ArchivePartition).where(
+                    ArchivePartition.site_id == site_id, ArchivePartition.month == month
+                )
+            )
+            path = archive_root() / relative
+            row_count = await asyncio.get_running_loop().run_in_executor(
+                None, write_partition, path, rows, path if catalogued else None
+            )
+            timestamps = [as_utc(r.timestamp) for r in rows]
+            first, last = min(timestamps), max(timestamps)
+            if catalogued:
+                first = min(first, as_utc(catalogued.first_timestamp))
+                last = max(last, as_utc(catalogued.last_timestamp))
+
+            stmt = dialect_insert(session, ArchivePartition)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["site_id", "month"],
+                set_={
+                    "path": stmt.excluded.path,
+                    "row_count": stmt.excluded.row_count,
+                    "first_timestamp": stmt.excluded.first_timestamp,
+                    "last_timestamp": stmt.excluded.last_timestamp,
+                    "updated_at": func.now(),
+                },
+            )
+            await session.execute(
+                stmt,
+                [
+                    {
+                        "site_id": site_id,
+                        "month": month,
+                        "path": relative.as_posix(),
+                        "row_count": row_count,
+                        "first_timestamp": first,
+                        "last_timestamp": last,
+                    }
+                ],
+            )
+            max_id = max(r.id for r in rows)
+            await session.execute(delete(TimeSeriesRaw).where(*window, TimeSeriesRaw.id <= max_id))
+            await session.commit()
+            result.months.append(f"{month:%Y-%m}")
+            result.rows_archived += len(rows)
+        month = next_month(month)
+    return result
+
+
+async def archive_sites(site_ids: list[int], older_than_days: int | None = None) -> list[ArchiveResult]:
+    """Bring processed series up to date, then archive each site's cold raw samples."""
+    from app.services.processing import process_sites
+
+    days = get_settings().archive_after_days if older_than_days is None else older_than_days
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    await process_sites(site_ids)
+    results = []
+    for site_id in site_ids:
+        async with new_session() as session:
+            results.append(await archive_site(session, site_id, cutoff))
+    return results
+
+
+async def archive_horizon(session: AsyncSession, site_id: int) -> datetime | None:
+    """Latest archived timestamp for a site, or None when nothing is archived."""
+    latest = await session.scalar(
+        select(func.max(ArchivePartition.last_timestamp)).where(ArchivePartition.site_id == site_id)
+    )
+    return None if latest is None else as_utc(latest)
+
+
+async def read_raw_frame(
+    session: AsyncSession,
+    site_id: int,
+    parameters: str | Collection[str] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> "pd.DataFrame":
+    """Raw samples in [start, end) from the database and the archive, ordered by time.
+
+    Columns are ``parameter``, ``timestamp`` (UTC), ``value`` (NaN when missing)
+    and ``qc_flag``. ``parameters`` is one name or a collection of names.
+    """
+    start = as_utc(start) if start else None
+    end = as_utc(end) if end else None
+    query = (
+        select(Channel.parameter, TimeSeriesRaw.timestamp, TimeSeriesRaw.value, TimeSeriesRaw.qc_flag)
+        .join(Channel, TimeSeriesRaw.channel_id == Channel.id)
+        .where(Channel.site_id == site_id)
+    )
+    if isinstance(parameters, str):
+        query = query.where(Channel.parameter == parameters)
+    elif parameters is not None:
+        query = query.where(Channel.parameter.in_(list(parameters)))
+    if start:
+        query = query.where(TimeSeriesRaw.timestamp >= start)
+    if end:
+        query = query.where(TimeSeriesRaw.timestamp < end)
+    frame = _hot_frame((await session.execute(query)).all(), ["parameter"])
+
+    partitions = select(ArchivePartition.path).where(ArchivePartition.site_id == site_id)
+    if start:
+        partitions = partitions.where(ArchivePartition.last_timestamp >= start)
+    if end:
+        partitions = partitions.where(ArchivePartition.first_timestamp < end)
+    paths = [archive_root() / p for p in await session.scalars(partitions)]
+    if paths:
+        table = await asyncio.get_running_loop().run_in_executor(
+            None, read_partitions, paths, parameters, start, end
+        )
+        frame = _merge_cold(table.to_pandas(), frame, ["parameter"])
+    return frame.sort_values(["timestamp", "parameter"], kind="stable", ignore_index=True)
+
+
+async def read_series_frame(
+    session: AsyncSession,
+    series: Collection[tuple[int, str]],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> "pd.DataFrame":
+    """``read_raw_frame`` across sites: (site_id, parameter) series in [start, end).
+
+    One database query and one archive scan cover every series; the frame has
+    a ``site_id`` column and is ordered by time, then site and parameter.
+    """
+    import pandas as pd
+
+    series = sorted(set(series))
+    start = as_utc(start) if start else None
+    end = as_utc(end) if end else None
+    site_ids = sorted({site_id for site_id, _ in series})
+    query = (
+        select(
+            Channel.site_id,
+            Channel.parameter,
+            TimeSeriesRaw.timestamp,
+            TimeSeriesRaw.value,
+            TimeSeriesRaw.qc_flag,
+        )
+        .join(Channel, TimeSeriesRaw.channel_id == Channel.id)
+        .where(tuple_(Channel.site_id, Channel.parameter).in_(series))
+    )
+    if start:
+        query = query.where(TimeSeriesRaw.timestamp >= start)
+    if end:
+        query = query.where(TimeSeriesRaw.timestamp < end)
+    keys = ["site_id", "parameter"]
+    frame = _hot_frame((await session.execute(query)).all(), keys)
+
+    partitions = select(ArchivePartition.path).where(ArchivePartition.site_id.in_(site_ids))
+    if start:
+        partitions = partitions.where(ArchivePartition.last_timestamp >= start)
+    if end:
+        partitions = partitions.where(ArchivePartition.first_timestamp < end)
+    paths = [archive_root() / p for p in await session.scalars(partitions)]
+    if paths:
+        parameters = {parameter for _, parameter in series}
+        table = await asyncio.get_running_loop().run_in_executor(
+            None, partial(read_partitions, paths, parameters, start, end, with_site=True)
+        )
+        # The scan filters on parameter alone; keep only the requested pairs.
+        wanted = pd.DataFrame(series, columns=keys).astype({"parameter": "string"})
+        cold = table.to_pandas().astype({"parameter": "string"}).merge(wanted, on=keys)
+        frame = _merge_cold(cold, frame, keys)
+    return frame.sort_values(["timestamp", *keys], kind="stable", ignore_index=True)
+
+
+def _hot_frame(rows: list, keys: list[str]) -> "pd.DataFrame":
+    """Database rows as a frame with ``keys``, then timestamp, value and qc_flag."""
+    import pandas as pd
+
+    data = {}
+    if "site_id" in keys:
+        data["site_id"] = pd.array([r.site_id for r in rows], dtype="int64")
+    return pd.DataFrame(
+        {
+            **data,
+            "parameter": pd.array([r.parameter for r in rows], dtype="string"),
+            "timestamp": pd.to_datetime([r.timestamp for r in rows], utc=True).as_unit("us"),
+            "value": pd.array([r.value for r in rows], dtype="Float64").astype("float64"),
+            "qc_flag": pd.array([r.qc_flag for r in rows], dtype="string"),
+        }
+    )
+
+
+def _merge_cold(cold: "pd.DataFrame", hot: "pd.DataFrame", keys: list[str]) -> "pd.DataFrame":
+    """Archived rows plus database rows; the database wins on duplicate keys."""
+    import pandas as pd
+
+    frame = pd.concat([cold[hot.columns].astype(hot.dtypes.to_dict()), hot], ignore_index=True)
+    return frame.drop_duplicates([*keys, "timestamp"], keep="last")
+
+
+async def read_raw(
+    session: AsyncSession,
+    site_id: int,
+    parameter: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[RawPoint]:
+    """Raw samples in [start, end) from the database and the archive, ordered by time."""
+    frame = await read_raw_frame(session, site_id, parameter, start, end)
+    channels = select(Channel.parameter, Channel.unit).where(Channel.site_id == site_id)
+    units = dict((await session.execute(channels)).all())
+    values = frame["value"].astype(object).where(frame["value"].notna(), None)
+    flags = frame["qc_flag"].astype(object).where(frame["qc_flag"].notna(), None)
+    return [
+        RawPoint(ts.to_pydatetime(), p, value, units.get(p), flag)
+        for p, ts, value, flag in zip(frame["parameter"], frame["timestamp"], values, flags)
+    ]
+
+
+async def resample_cold(
+    session: AsyncSession,
+    site_id: int,
+    interval_s: int,
+    aggregations: dict[str, float | None],
+    parameter: str | None,
+    start: datetime | None,
+    end: datetime,
+) -> list[dict]:
+    """Resample archive + database rows in [start, end) window by window.
+
+    Windows are whole buckets spanning about RESAMPLE_WINDOW, so no bucket is
+    split and memory is bounded by one window rather than the full history.
+    """
+    from app.services.aggregation import EPOCH, resample_frame
+
+    if start is None:
+        archived = await session.scalar(
+            select(func.min(ArchivePartition.first_timestamp)).where(
+                ArchivePartition.site_id == site_id
+            )
+        )
+        stored = await session.scalar(
+            select(func.min(TimeSeriesRaw.timestamp))
+            .join(Channel, TimeSeriesRaw.channel_id == Channel.id)
+            .where(Channel.site_id == site_id)
+        )
+        firsts = [as_utc(ts) for ts in (archived, stored) if ts is not None]
+        if not firsts:
+            return []
+        start = min(firsts)
+    step = timedelta(seconds=interval_s * max(1, -(-int(RESAMPLE_WINDOW.total_seconds()) // interval_s)))
+    rows: list[dict] = []
+    window_start = as_utc(start)
+    while window_start < end:
+        offset = (window_start - EPOCH) % timedelta(seconds=interval_s)
+        window_end = min(window_start - offset + step, end)
+        frame = await read_raw_frame(session, site_id, parameter, window_start, window_end)
+        rows += resample_frame(frame, interval_s, aggregations)
+        window_start = window_end
+    return rows
@@ -0,0 +1,150 @@
+"""Streaming exports of processed time series (CSV, SWMM, ZIP).
+
+Every generator reads ``TimeSeriesProcessed`` through a server-side cursor in
+``EXPORT_CHUNK_SIZE`` partitions and yields encoded bytes as it goes, so the
+response starts immediately and memory stays flat regardless of project size.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models.core import Site, TimeSeriesProcessed
+
+EXPORT_CHUNK_SIZE = 5000
+CSV_HEADER = ["timestamp", "parameter", "value", "unit", "qc_summary"]
+
+
+def site_label(site: Site) -> str:
+    """SWMM-safe identifier for a site (no whitespace), used for node and file names."""
+    label = re.sub(r"[^A-Za-z0-9_.-]+", "_", site.code or site.name or "").strip("_")
+    return label or f"SITE{site.id}"
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+async def iter_processed_rows(
+    session: AsyncSession, site_id: int, parameter: str | None = None
+) -> AsyncIterator[list]:
+    """Yield ordered partitions of processed rows without materializing the result."""
+    query = select(
+        TimeSeriesProcessed.timestamp,
+        TimeSeriesProcessed.parameter,
+        TimeSeriesProcessed.value,
+        TimeSeriesProcessed.unit,
+        TimeSeriesProcessed.qc_summary,
+    ).where(TimeSeriesProcessed.site_id == site_id)
+    if parameter:
+        query = query.where(TimeSeriesProcessed.parameter == parameter)
+    query = query.order_by(TimeSeriesProcessed.timestamp, TimeSeriesProcessed.parameter)
+    result = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    async for partition in result.partitions():
+        yield partition
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+async def iter_csv(
+    session: AsyncSession, site_id: int, parameter: str | None = None
+) -> AsyncIterator[bytes]:
+    # csv.writer quotes user-supplied parameter names, units and QC text as needed.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    yield _drain(buffer)
+    async for partition in iter_processed_rows(session, site_id, parameter):
+        writer.writerows(
+            (_utc(r.timestamp).isoformat(), r.parameter, r.value, r.unit, r.qc_summary)
+            for r in partition
+        )
+        yield _drain(buffer)
+
+
+def swmm_inflows_section(sites: list[Site], parameter: str) -> str:
+    lines = [
+        "[INFLOWS]",
+        ";;Node            Constituent      Time Series      Type     Mfactor  Sfactor",
+    ]
+    for site in sites:
+        label = site_label(site)
+        lines.append(f"{label:<17} FLOW             {label}_{parameter:<10} FLOW     1.0      1.0")
+    return "\n".join(lines) + "\n\n"
+
+
+async def iter_swmm_timeseries(
+    session: AsyncSession, sites: list[Site], parameter: str = "flow"
+) -> AsyncIterator[bytes]:
+    """SWMM [TIMESERIES] lines ("Name Date Time Value") for each site in turn."""
+    yield b"[TIMESERIES]\n;;Name           Date       Time       Value\n"
+    for site in sites:
+        name = f"{site_label(site)}_{parameter}"
+        async for partition in iter_processed_rows(session, site.id, parameter):
+            yield "".join(
+                f"{name} {_utc(r.timestamp):%m/%d/%Y %H:%M} {r.value}\n"
+                for r in partition
+                if r.value is not None
+            ).encode()
+        yield b";\n"
+
+
+async def iter_swmm(
+    session: AsyncSession, sites: list[Site], parameter: str = "flow"
+) -> AsyncIterator[bytes]:
+    # INFLOWS only needs site metadata, so it goes first and bytes flow before any data query.
+    yield swmm_inflows_section(sites, parameter).encode()
+    async for chunk in iter_swmm_timeseries(session, sites, parameter):
+        yield chunk
+
+
+class _ZipSink:
+    """Write-only, non-seekable buffer that ZipFile streams into."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def iter_project_zip(
+    session: AsyncSession, sites: list[Site], parameter: str = "flow"
+) -> AsyncIterator[bytes]:
+    """ZIP with one cleaned CSV per site plus a project SWMM inflow file, streamed member by member."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for site in sites:
+            member_name = f"{site.id}-{site_label(site)}/cleaned.csv"
+            with archive.open(member_name, mode="w", force_zip64=True) as member:
+                async for chunk in iter_csv(session, site.id):
+                    member.write(chunk)
+                    yield sink.drain()
+        with archive.open("swmm_inflows.inp", mode="w", force_zip64=True) as member:
+            async for chunk in iter_swmm(session, sites, parameter):
+                member.write(chunk)
+                yield sink.drain()
+    yield sink.drain()
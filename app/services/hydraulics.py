@@ -2,6 +2,9 @@
 
 import math
 
+import numpy as np
+from app.services.series import TimeSeriesBlock
+
 
 def circular_area(diameter_mm: float, depth_mm: float) -> float:
     """Calculate flow area in circular pipe given diameter and depth (mm). Returns area in m²."""
@@ -19,6 +22,33 @@ def circular_area(diameter_mm: float, depth_mm: float) -> float:
     return area
 
 
+def circular_area_array(diameter_mm: float, depth_mm: np.ndarray) -> np.ndarray:
+    """Vectorized circular_area over an array of depths (mm). Returns areas in m²."""
+    D = diameter_mm / 1000.0
+    d = np.clip(np.asarray(depth_mm, dtype=np.float64) / 1000.0, 0.0, D)
+    if D <= 0:
+        return np.zeros_like(d)
+    r = D / 2
+    theta = 2 * np.arccos((r - d) / r)
+    return (r**2 / 2) * (theta - np.sin(theta))
+
+
+def rating_curve_flow(coefficients: dict, depth_mm: np.ndarray) -> np.ndarray:
+    """Flow (m³/s) from depth (mm) through a stored depth-flow rating curve.
+
+    ``coefficients`` is either a power law ``{"a", "b", "h0"}`` giving
+    Q = a * (h - h0)^b with h in metres (h0 defaults to 0), or a table
+    ``{"depth_mm": [...], "flow_m3_s": [...]}`` interpolated linearly.
+    """
+    depth_mm = np.asarray(depth_mm, dtype=np.float64)
+    if "depth_mm" in coefficients and "flow_m3_s" in coefficients:
+        return np.interp(depth_mm, coefficients["depth_mm"], coefficients["flow_m3_s"])
+    if "a" in coefficients and "b" in coefficients:
+        head = np.clip(depth_mm / 1000.0 - coefficients.get("h0", 0.0), 0.0, None)
+        return coefficients["a"] * head ** coefficients["b"]
+    raise ValueError("Rating curve needs 'a'/'b' power-law or 'depth_mm'/'flow_m3_s' table coefficients")
+
+
 def compute_flow(area_m2: float, velocity_m_s: float) -> float:
     """Compute flow Q = A * V (m³/s)."""
     return area_m2 * velocity_m_s
@@ -29,3 +59,23 @@ def compute_velocity(flow_m3_s: float, area_m2: float) -> float:
     if area_m2 <= 0:
         return 0.0
     return flow_m3_s / area_m2
+
+
+def flow_from_blocks(
+    depth: TimeSeriesBlock, velocity: TimeSeriesBlock, diameter_mm: float
+) -> TimeSeriesBlock:
+    """Flow series (m³/s) at timestamps where both depth (mm) and velocity (m/s) exist.
+
+    Samples flagged by QC in either input carry a non-OK flag into the result.
+    """
+    common, di, vi = np.intersect1d(depth.timestamps, velocity.timestamps, return_indices=True)
+    area = circular_area_array(diameter_mm, depth.values[di])
+    flags = np.where(depth.flags[di] != 0, depth.flags[di], velocity.flags[vi])
+    return TimeSeriesBlock(
+        common,
+        area * velocity.values[vi],
+        flags,
+        site_id=depth.site_id,
+        parameter="flow",
+        unit="m3/s",
+    )
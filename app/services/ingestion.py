@@ -1,10 +1,16 @@
+import re
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
-from typing import Iterable
+from typing import IO, Iterable, Mapping
+import numpy as np
 import pandas as pd
+from app.services.series import TimeSeriesBlock
 
 
-def load_timeseries_from_csv(path: str | Path, timestamp_col: str = "timestamp") -> pd.DataFrame:
+def load_timeseries_from_csv(
+    path: str | Path | IO[bytes], timestamp_col: str = "timestamp"
+) -> pd.DataFrame:
     """Load CSV and parse timestamps; raises if missing timestamp column."""
     df = pd.read_csv(path)
     if timestamp_col not in df.columns:
@@ -13,23 +19,118 @@ def load_timeseries_from_csv(path: str | Path, timestamp_col: str = "timestamp")
     return df
 
 
-def summarize_timeseries(df: pd.DataFrame, value_columns: Iterable[str]) -> dict:
-    """Return basic summary stats for quick validation."""
-    summaries = {}
-    for col in value_columns:
-        if col not in df.columns:
+_UNIT_HEADER_RE = re.compile(r"^\s*(.+?)\s*[(\[]\s*([^)\]]+?)\s*[)\]]\s*$")
+
+
+def split_unit(column: str) -> tuple[str, str | None]:
+    """Split a header such as 'depth (mm)' or 'velocity [m/s]' into parameter and unit."""
+    match = _UNIT_HEADER_RE.match(column)
+    if not match:
+        return column.strip(), None
+    return match.group(1), match.group(2)
+
+
+def split_unit_headers(
+    df: pd.DataFrame, timestamp_col: str = "timestamp"
+) -> tuple[pd.DataFrame, dict[str, str | None]]:
+    """Rename value columns to bare parameter names; returns the frame and each parameter's unit.
+
+    Raises ValueError when two headers name the same parameter, such as
+    'depth (mm)' next to 'depth', rather than merging them into one channel.
+    """
+    renames: dict = {}
+    units: dict[str, str | None] = {}
+    for col in df.columns:
+        if col == timestamp_col:
             continue
-        series = df[col].dropna()
-        summaries[col] = {
-            "count": int(series.count()),
-            "min": float(series.min()) if not series.empty else None,
-            "max": float(series.max()) if not series.empty else None,
-            "mean": float(series.mean()) if not series.empty else None,
-        }
-    time_min = df["timestamp"].min() if "timestamp" in df else None
-    time_max = df["timestamp"].max() if "timestamp" in df else None
+        parameter, unit = split_unit(str(col))
+        if parameter in units or parameter == timestamp_col:
+            raise ValueError(f"Column '{col}' repeats parameter '{parameter}'")
+        renames[col] = parameter
+        units[parameter] = unit
+    return df.rename(columns=renames), units
+
+
+def to_long_format(
+    df: pd.DataFrame, value_columns: Iterable[str], timestamp_col: str = "timestamp"
+) -> pd.DataFrame:
+    """Melt wide parameter columns into (timestamp, parameter, value) rows without NaNs."""
+    long_df = df.melt(
+        id_vars=[timestamp_col], value_vars=list(value_columns), var_name="parameter", value_name="value"
+    )
+    long_df["value"] = pd.to_numeric(long_df["value"], errors="coerce")
+    long_df = long_df.dropna(subset=["value"])
+    return long_df.rename(columns={timestamp_col: "timestamp"}).reset_index(drop=True)
+
+
+def parse_upload(content: bytes) -> tuple[pd.DataFrame, dict, dict[str, str | None]]:
+    """Parse an uploaded CSV into long-format records, its summary and units.
+
+    Runs inside the worker pool, so it takes and returns only picklable values.
+    """
+    df, units = split_unit_headers(load_timeseries_from_csv(BytesIO(content)))
+    param_cols = list(units)
+    long_df = to_long_format(df, param_cols)
+    return long_df, summarize_timeseries(df, param_cols), units
+
+
+def to_blocks(
+    df: pd.DataFrame, value_columns: Iterable[str], site_id: int | None = None
+) -> dict[str, TimeSeriesBlock]:
+    """Split a wide upload frame into one compact block per parameter column."""
+    return {
+        col: TimeSeriesBlock.from_frame(df, col, site_id=site_id)
+        for col in value_columns
+        if col in df.columns
+    }
+
+
+def _value_summary(values: np.ndarray) -> dict:
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {"count": 0, "min": None, "max": None, "mean": None}
+    return {
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean(dtype=np.float64)),
+    }
+
+
+def _iso_range(time_min, time_max) -> list:
     if isinstance(time_min, (pd.Timestamp, datetime)):
         time_min = time_min.isoformat()
     if isinstance(time_max, (pd.Timestamp, datetime)):
         time_max = time_max.isoformat()
-    return {"columns": summaries, "time_range": [time_min, time_max]}
+    return [time_min, time_max]
+
+
+def summarize_timeseries(
+    df: pd.DataFrame | Mapping[str, TimeSeriesBlock], value_columns: Iterable[str] | None = None
+) -> dict:
+    """Return basic summary stats for quick validation.
+
+    Accepts a wide DataFrame plus the value columns to summarize, or a mapping of
+    parameter name to TimeSeriesBlock (as produced by ``to_blocks``).
+    """
+    if not isinstance(df, pd.DataFrame):
+        blocks = {name: block for name, block in df.items() if len(block)}
+        summaries = {name: _value_summary(block.values) for name, block in df.items()}
+        if not blocks:
+            return {"columns": summaries, "time_range": [None, None]}
+        start = min(int(block.timestamps[0]) for block in blocks.values())
+        end = max(int(block.timestamps[-1]) for block in blocks.values())
+        return {
+            "columns": summaries,
+            "time_range": _iso_range(pd.Timestamp(start, tz="UTC"), pd.Timestamp(end, tz="UTC")),
+        }
+
+    summaries = {}
+    for col in value_columns or []:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        summaries[col] = _value_summary(values)
+    time_min = df["timestamp"].min() if "timestamp" in df else None
+    time_max = df["timestamp"].max() if "timestamp" in df else None
+    return {"columns": summaries, "time_range": _iso_range(time_min, time_max)}
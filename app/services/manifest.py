@@ -0,0 +1,284 @@
+"""Ingestion manifest: per-upload statistics and the coverage answered from them.
+
+Each ingested file records one IngestionManifest row plus one
+ManifestChannelStats row per channel it wrote. Telemetry is folded into one
+manifest per site, device and UTC day, so manifests grow with uploads and
+days rather than with flushes. Statistics cover the samples an ingestion
+actually stored, read back from the upsert: a sample skipped as a duplicate
+is not counted again, and the values an ``update`` overwrote are recorded
+as ``replaced_*`` and subtracted by coverage. They are kept as
+count/min/max/sum/M2 (squared deviations from their own mean), so any number
+of manifests combine exactly with the parallel-variance formula, and coverage
+questions aggregate manifest rows instead of scanning raw samples. Min and
+max bound every value ever stored, including values later overwritten.
+"""
+
+import math
+from datetime import datetime, timezone
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.services.storage import SampleStats, UpsertCounts
+from db.models.core import Channel, IngestionManifest, ManifestChannelStats, Site
+
+TELEMETRY = "telemetry"
+
+
+def _utc(ts: datetime | None) -> datetime | None:
+    if ts is None:
+        return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def _channel_stats(channel_id: int, stored: SampleStats, replaced: SampleStats) -> ManifestChannelStats:
+    return ManifestChannelStats(
+        channel_id=channel_id,
+        count=stored.count,
+        min=stored.min,
+        max=stored.max,
+        sum=stored.sum,
+        m2=stored.m2,
+        first_timestamp=stored.first_timestamp,
+        last_timestamp=stored.last_timestamp,
+        replaced_count=replaced.count,
+        replaced_sum=replaced.sum,
+        replaced_m2=replaced.m2,
+    )
+
+
+def _time_range(counts: UpsertCounts) -> tuple[datetime | None, datetime | None]:
+    stored = [s for s in counts.stored.values() if s.count]
+    return (
+        min((s.first_timestamp for s in stored), default=None),
+        max((s.last_timestamp for s in stored), default=None),
+    )
+
+
+async def record_manifest(
+    session: AsyncSession,
+    site_id: int,
+    kind: str,
+    counts: UpsertCounts,
+    row_count: int,
+    source_id: int | None = None,
+    on_conflict: str | None = None,
+) -> IngestionManifest:
+    """Add a manifest for one ingested file in the caller's transaction; caller commits."""
+    first, last = _time_range(counts)
+    manifest = IngestionManifest(
+        site_id=site_id,
+        source_id=source_id,
+        kind=kind,
+        on_conflict=on_conflict,
+        row_count=row_count,
+        inserted=counts.inserted,
+        updated=counts.updated,
+        skipped=counts.skipped,
+        first_timestamp=first,
+        last_timestamp=last,
+        stats=[
+            _channel_stats(channel_id, stored, counts.replaced.get(channel_id, SampleStats()))
+            for channel_id, stored in counts.stored.items()
+        ],
+    )
+    session.add(manifest)
+    await session.flush()
+    return manifest
+
+
+async def record_telemetry(
+    session: AsyncSession,
+    site_id: int,
+    source_id: int | None,
+    counts: UpsertCounts,
+    row_count: int,
+) -> IngestionManifest:
+    """Fold one telemetry write into its site/device/day manifest; caller commits.
+
+    The day's manifest is created by its first write and merged into after
+    that, its statistics combined with the parallel-variance formula.
+    """
+    day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    manifest = await session.scalar(
+        select(IngestionManifest)
+        .where(
+            IngestionManifest.site_id == site_id,
+            IngestionManifest.kind == TELEMETRY,
+            IngestionManifest.source_id.is_(None)
+            if source_id is None
+            else IngestionManifest.source_id == source_id,
+            IngestionManifest.created_at >= day,
+        )
+        .options(selectinload(IngestionManifest.stats))
+        .order_by(IngestionManifest.id.desc())
+        .limit(1)
+        .with_for_update()
+    )
+    if manifest is None:
+        return await record_manifest(
+            session, site_id, TELEMETRY, counts, row_count, source_id=source_id, on_conflict="skip"
+        )
+
+    manifest.row_count += row_count
+    manifest.inserted += counts.inserted
+    manifest.updated += counts.updated
+    manifest.skipped += counts.skipped
+    first, last = _time_range(counts)
+    if first is not None:
+        earlier = _utc(manifest.first_timestamp)
+        later = _utc(manifest.last_timestamp)
+        manifest.first_timestamp = first if earlier is None else min(earlier, first)
+        manifest.last_timestamp = last if later is None else max(later, last)
+    existing = {row.channel_id: row for row in manifest.stats}
+    for channel_id, stored in counts.stored.items():
+        row = existing.get(channel_id)
+        if row is None:
+            manifest.stats.append(
+                _channel_stats(channel_id, stored, counts.replaced.get(channel_id, SampleStats()))
+            )
+            continue
+        merged = SampleStats(
+            count=row.count,
+            min=row.min,
+            max=row.max,
+            sum=row.sum,
+            m2=row.m2,
+            first_timestamp=_utc(row.first_timestamp),
+            last_timestamp=_utc(row.last_timestamp),
+        )
+        merged.merge(stored)
+        row.count, row.min, row.max, row.sum, row.m2 = (
+            merged.count,
+            merged.min,
+            merged.max,
+            merged.sum,
+            merged.m2,
+        )
+        row.first_timestamp, row.last_timestamp = merged.first_timestamp, merged.last_timestamp
+    await session.flush()
+    return manifest
+
+
+def _parameter_coverage(row) -> dict:
+    mean = row.sum / row.count if row.count else None
+    std = math.sqrt(max(row.m2 / row.count, 0.0)) if row.count else None
+    return {
+        "parameter": row.parameter,
+        "unit": row.unit,
+        "uploads": row.uploads,
+        "samples": row.count,
+        "min": row.min,
+        "max": row.max,
+        "mean": mean,
+        "std": std,
+        "first_timestamp": _utc(row.first_timestamp),
+        "last_timestamp": _utc(row.last_timestamp),
+    }
+
+
+async def sites_coverage(session: AsyncSession, site_ids: list[int]) -> list[dict]:
+    """Coverage per site, each with per-parameter statistics, from manifests alone."""
+    totals = await session.execute(
+        select(
+            IngestionManifest.site_id,
+            func.count().label("uploads"),
+            func.sum(IngestionManifest.row_count).label("rows"),
+            func.sum(IngestionManifest.inserted).label("inserted"),
+            func.sum(IngestionManifest.updated).label("updated"),
+            func.sum(IngestionManifest.skipped).label("skipped"),
+            func.min(IngestionManifest.first_timestamp).label("first_timestamp"),
+            func.max(IngestionManifest.last_timestamp).label("last_timestamp"),
+        )
+        .where(IngestionManifest.site_id.in_(site_ids))
+        .group_by(IngestionManifest.site_id)
+    )
+    coverage = {
+        site_id: {
+            "site_id": site_id,
+            "uploads": 0,
+            "rows": 0,
+            "inserted": 0,
+            "updated": 0,
+            "skipped": 0,
+            "first_timestamp": None,
+            "last_timestamp": None,
+            "parameters": [],
+        }
+        for site_id in site_ids
+    }
+    for row in totals:
+        coverage[row.site_id].update(
+            {
+                **row._asdict(),
+                "first_timestamp": _utc(row.first_timestamp),
+                "last_timestamp": _utc(row.last_timestamp),
+            }
+        )
+
+    # Parallel variance: M2 = sum(M2_i + n_i * (mean_i - mean)^2) over the stored
+    # sets, minus the same terms for the replaced ones, with the grand mean of
+    # the samples now stored from a first pass, so no large, nearly equal terms
+    # are subtracted.
+    stats = ManifestChannelStats
+    site_channels = select(Channel.id).where(Channel.site_id.in_(site_ids))
+    grand = (
+        select(
+            stats.channel_id,
+            (
+                (func.sum(stats.sum) - func.sum(stats.replaced_sum))
+                / func.nullif(func.sum(stats.count) - func.sum(stats.replaced_count), 0)
+            ).label("mean"),
+        )
+        .where(stats.channel_id.in_(site_channels))
+        .group_by(stats.channel_id)
+        .subquery()
+    )
+
+    def between(count, total):
+        deviation = total / func.nullif(count, 0) - grand.c.mean
+        return func.coalesce(count * deviation * deviation, 0.0)
+
+    parameters = await session.execute(
+        select(
+            Channel.site_id,
+            Channel.parameter,
+            Channel.unit,
+            func.count().label("uploads"),
+            (func.sum(stats.count) - func.sum(stats.replaced_count)).label("count"),
+            func.min(stats.min).label("min"),
+            func.max(stats.max).label("max"),
+            (func.sum(stats.sum) - func.sum(stats.replaced_sum)).label("sum"),
+            func.sum(
+                stats.m2
+                + between(stats.count, stats.sum)
+                - stats.replaced_m2
+                - between(stats.replaced_count, stats.replaced_sum)
+            ).label("m2"),
+            func.min(stats.first_timestamp).label("first_timestamp"),
+            func.max(stats.last_timestamp).label("last_timestamp"),
+        )
+        .join(Channel, stats.channel_id == Channel.id)
+        .join(grand, grand.c.channel_id == stats.channel_id)
+        .where(Channel.site_id.in_(site_ids))
+        .group_by(Channel.id, Channel.site_id, Channel.parameter, Channel.unit)
+        .order_by(Channel.site_id, Channel.parameter)
+    )
+    for row in parameters:
+        coverage[row.site_id]["parameters"].append(_parameter_coverage(row))
+    return [coverage[site_id] for site_id in site_ids]
+
+
+async def project_coverage(session: AsyncSession, project_id: int) -> dict:
+    site_ids = list(
+        await session.scalars(select(Site.id).where(Site.project_id == project_id).order_by(Site.id))
+    )
+    sites = await sites_coverage(session, site_ids) if site_ids else []
+    firsts = [s["first_timestamp"] for s in sites if s["first_timestamp"]]
+    lasts = [s["last_timestamp"] for s in sites if s["last_timestamp"]]
+    return {
+        "project_id": project_id,
+        "uploads": sum(s["uploads"] for s in sites),
+        "first_timestamp": min(firsts, default=None),
+        "last_timestamp": max(lasts, default=None),
+        "sites": sites,
+    }
@@ -0,0 +1,78 @@
+"""Minimal PDF writer for text and line-chart reports (built-in Helvetica, no dependencies)."""
+
+PAGE_WIDTH = 595  # A4 in points
+PAGE_HEIGHT = 842
+
+
+def _escape(text: str) -> str:
+    text = text.encode("latin-1", errors="replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class SimplePdf:
+    """Accumulates drawing operators per page and serializes a valid PDF 1.4 file."""
+
+    def __init__(self) -> None:
+        self._pages: list[list[str]] = []
+
+    def add_page(self) -> None:
+        self._pages.append([])
+
+    def _ops(self) -> list[str]:
+        if not self._pages:
+            self.add_page()
+        return self._pages[-1]
+
+    def text(self, x: float, y: float, text: str, size: int = 10, bold: bool = False) -> None:
+        font = "F2" if bold else "F1"
+        self._ops().append(f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET")
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5) -> None:
+        self._ops().append(f"{width} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+    def rect(self, x: float, y: float, w: float, h: float, width: float = 0.5) -> None:
+        self._ops().append(f"{width} w {x:.2f} {y:.2f} {w:.2f} {h:.2f} re S")
+
+    def polyline(self, points: list[tuple[float, float]], width: float = 0.8) -> None:
+        if len(points) < 2:
+            return
+        path = [f"{points[0][0]:.2f} {points[0][1]:.2f} m"]
+        path += [f"{x:.2f} {y:.2f} l" for x, y in points[1:]]
+        self._ops().append(f"{width} w " + " ".join(path) + " S")
+
+    def to_bytes(self) -> bytes:
+        if not self._pages:
+            self.add_page()
+        n_pages = len(self._pages)
+        # Object layout: 1 catalog, 2 page tree, 3-4 fonts, then (page, content) pairs.
+        page_ids = [5 + 2 * i for i in range(n_pages)]
+        objects: list[str | bytes] = [
+            "<< /Type /Catalog /Pages 2 0 R >>",
+            f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {n_pages} >>",
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>",
+        ]
+        for page_id, ops in zip(page_ids, self._pages):
+            stream = "\n".join(ops).encode("latin-1")
+            objects.append(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_id + 1} 0 R >>"
+            )
+            objects.append(
+                f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream"
+            )
+
+        out = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f"{number} 0 obj\n".encode("latin-1")
+            out += body if isinstance(body, bytes) else body.encode("latin-1")
+            out += b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+        out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+        out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode(
+            "latin-1"
+        )
+        return bytes(out)
@@ -0,0 +1,295 @@
+"""Incremental raw → processed pipeline.
+
+Every raw channel is QC-flagged into TimeSeriesProcessed, and flow is derived
+from depth and velocity using the site's pipe diameter. A per-channel
+watermark records the highest raw id already processed, and samples
+overwritten in place by an ``update`` upsert are queued in ``raw_changes``;
+a run only touches the days that received new or changed raw samples since
+the previous run, and drains the queue. Each touched day is recomputed in
+full, with a short lookback and lookahead so windowed checks see the
+neighbouring samples, and its processed rows are upserted.
+
+Spike statistics are computed per day, so a day's flags are the same whether
+it was processed alone or within a longer span. Flat-line flags for the last
+samples of a day use the next day's samples when they exist at processing
+time; if that day arrives later, they are refreshed by ``full=True``.
+
+Raw ids are assumed to grow with commit order; a sample committed with a
+lower id after a run has read past it is only picked up by ``full=True``.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.aggregation import bucket_expression, bucket_start
+from app.services.alignment import to_epoch_ns
+from app.services.hydraulics import flow_from_blocks
+from app.services.qc import flatline_mask, range_mask, spike_mask
+from app.services.series import FLAG_NAMES, QCFlag, TimeSeriesBlock
+from app.services.storage import dialect_insert, upsert_processed_rows
+from db.models.core import Channel, ProcessingWatermark, RawChange, Site, TimeSeriesRaw
+from db.session import new_session
+
+DEPTH, VELOCITY, FLOW = "depth", "velocity", "flow"
+# Raw data is reprocessed in whole days; adjacent touched days merge into one span.
+PROCESS_CHUNK_S = 86400
+MAX_SPAN = timedelta(days=31)
+# Samples either side of a span that windowed QC checks may look at.
+QC_LOOKBACK = timedelta(hours=6)
+# (min, max) accepted per parameter; parameters not listed skip the range check.
+QC_RANGES: dict[str, tuple[float, float]] = {DEPTH: (0.0, 10_000.0), VELOCITY: (-5.0, 10.0)}
+
+
+@dataclass
+class ProcessingResult:
+    site_id: int
+    spans: int = 0
+    written: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _Loaded:
+    """Raw rows of one channel over a span (plus lookback), QC-flagged."""
+
+    ids: np.ndarray
+    timestamps: list[datetime]
+    values: list[float | None]
+    block: TimeSeriesBlock
+
+
+def merge_spans(buckets: list[datetime]) -> list[tuple[datetime, datetime]]:
+    """Collapse touched bucket starts into contiguous [start, end) spans of at most MAX_SPAN."""
+    chunk = timedelta(seconds=PROCESS_CHUNK_S)
+    spans: list[tuple[datetime, datetime]] = []
+    for start in sorted(set(buckets)):
+        if spans and spans[-1][1] == start and start + chunk - spans[-1][0] <= MAX_SPAN:
+            spans[-1] = (spans[-1][0], start + chunk)
+        else:
+            spans.append((start, start + chunk))
+    return spans
+
+
+def flag_values(parameter: str, timestamps_ns: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """QC codes for one parameter's time-ordered samples; samples without a value are MISSING.
+
+    Same precedence as ``qc.qc_flags`` (RANGE < SPIKE < FLAT), but the spike
+    z-score is taken within each processing day rather than over the whole array.
+    """
+    flags = np.zeros(values.shape, dtype=np.uint8)
+    low, high = QC_RANGES.get(parameter, (None, None))
+    if low is not None:
+        flags[range_mask(values, low, high)] = QCFlag.RANGE
+    days = timestamps_ns // (PROCESS_CHUNK_S * 1_000_000_000)
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1, [values.size]))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        day_flags = flags[lo:hi]
+        day_flags[spike_mask(values[lo:hi])] = QCFlag.SPIKE
+    flags[flatline_mask(values)] = QCFlag.FLAT
+    flags[np.isnan(values)] = QCFlag.MISSING
+    return flags
+
+
+async def _load(
+    session: AsyncSession, channel_id: int, parameter: str, start: datetime, end: datetime
+) -> _Loaded:
+    query = (
+        select(TimeSeriesRaw.id, TimeSeriesRaw.timestamp, TimeSeriesRaw.value)
+        .where(
+            TimeSeriesRaw.channel_id == channel_id,
+            TimeSeriesRaw.timestamp >= start - QC_LOOKBACK,
+            TimeSeriesRaw.timestamp < end + QC_LOOKBACK,
+        )
+        .order_by(TimeSeriesRaw.timestamp)
+    )
+    rows = (await session.execute(query)).all()
+    values = np.array([np.nan if r.value is None else r.value for r in rows], dtype=np.float32)
+    timestamps_ns = to_epoch_ns(r.timestamp for r in rows)
+    block = TimeSeriesBlock(timestamps_ns, values, parameter=parameter)
+    return _Loaded(
+        ids=np.fromiter((r.id for r in rows), np.int64, len(rows)),
+        timestamps=[r.timestamp for r in rows],
+        values=[r.value for r in rows],
+        block=block.with_flags(flag_values(parameter, timestamps_ns, values)),
+    )
+
+
+def _processed_rows(
+    site_id: int, parameter: str, unit: str | None, loaded: _Loaded, start_ns: int, end_ns: int
+) -> list[dict]:
+    first, stop = np.searchsorted(loaded.block.timestamps, [start_ns, end_ns])
+    names = FLAG_NAMES[loaded.block.flags[first:stop]]
+    return [
+        {
+            "site_id": site_id,
+            "parameter": parameter,
+            "timestamp": ts,
+            "value": value,
+            "unit": unit,
+            "qc_summary": name,
+            "source_raw_id": int(raw_id),
+        }
+        for ts, value, name, raw_id in zip(
+            loaded.timestamps[first:stop], loaded.values[first:stop], names, loaded.ids[first:stop]
+        )
+    ]
+
+
+def _flow_rows(
+    site_id: int, depth: _Loaded, velocity: _Loaded, diameter_mm: float, start_ns: int, end_ns: int
+) -> list[dict]:
+    flow = flow_from_blocks(depth.block, velocity.block, diameter_mm)
+    flow = flow.between(start_ns, end_ns)
+    # Flow inherits the depth sample's timestamp and raw id.
+    at_depth = np.searchsorted(depth.block.timestamps, flow.timestamps)
+    names = FLAG_NAMES[flow.flags]
+    return [
+        {
+            "site_id": site_id,
+            "parameter": FLOW,
+            "timestamp": depth.timestamps[i],
+            "value": None if np.isnan(value) else float(value),
+            "unit": flow.unit,
+            "qc_summary": name,
+            "source_raw_id": int(depth.ids[i]),
+        }
+        for i, value, name in zip(at_depth, flow.values, names)
+    ]
+
+
+async def process_site(session: AsyncSession, site_id: int, full: bool = False) -> ProcessingResult:
+    """Bring TimeSeriesProcessed up to date for one site; caller commits.
+
+    ``full`` ignores the watermarks and reprocesses every day holding raw data.
+    """
+    result = ProcessingResult(site_id=site_id)
+    site = await session.get(Site, site_id)
+    if site is None:
+        raise LookupError(f"Site {site_id} not found")
+    channels = {
+        c.id: c
+        for c in await session.scalars(select(Channel).where(Channel.site_id == site_id))
+    }
+    if not channels:
+        return result
+
+    # Snapshot the newest raw id per channel; rows arriving mid-run wait for the next run.
+    # Each is one seek on (channel_id, id) rather than a scan of the channel's history.
+    newest = (
+        select(func.max(TimeSeriesRaw.id))
+        .where(TimeSeriesRaw.channel_id == Channel.id)
+        .scalar_subquery()
+    )
+    highs = {
+        channel_id: high
+        for channel_id, high in (
+            await session.execute(select(Channel.id, newest).where(Channel.id.in_(channels)))
+        ).all()
+        if high is not None
+    }
+    if not highs:
+        return result
+
+    watermarks = {} if full else dict(
+        (
+            await session.execute(
+                select(ProcessingWatermark.channel_id, ProcessingWatermark.last_raw_id).where(
+                    ProcessingWatermark.channel_id.in_(channels)
+                )
+            )
+        ).all()
+    )
+    # One id range per channel, so the (channel_id, id) index bounds what is read.
+    ranges = [
+        and_(
+            TimeSeriesRaw.channel_id == channel_id,
+            TimeSeriesRaw.id > watermarks.get(channel_id, 0),
+            TimeSeriesRaw.id <= high,
+        )
+        for channel_id, high in highs.items()
+        if high > watermarks.get(channel_id, 0)
+    ]
+    bucket = bucket_expression(
+        session.bind.dialect.name, TimeSeriesRaw.timestamp, PROCESS_CHUNK_S
+    ).label("bucket")
+    touched: dict[datetime, set[int]] = defaultdict(set)
+    if ranges:
+        touched_query = select(TimeSeriesRaw.channel_id, bucket).where(or_(*ranges)).distinct()
+        for channel_id, value in (await session.execute(touched_query)).all():
+            touched[bucket_start(value)].add(channel_id)
+
+    # Samples overwritten in place since the last run; drained below.
+    last_change = await session.scalar(
+        select(func.max(RawChange.id)).where(RawChange.channel_id.in_(channels))
+    )
+    if last_change is not None and not full:
+        change_bucket = bucket_expression(
+            session.bind.dialect.name, RawChange.timestamp, PROCESS_CHUNK_S
+        ).label("bucket")
+        changed_query = (
+            select(RawChange.channel_id, change_bucket)
+            .where(RawChange.channel_id.in_(channels), RawChange.id <= last_change)
+            .distinct()
+        )
+        for channel_id, value in (await session.execute(changed_query)).all():
+            touched[bucket_start(value)].add(channel_id)
+
+    by_parameter = {c.parameter: c for c in channels.values()}
+    derive_flow = (
+        site.pipe_diameter_mm is not None and DEPTH in by_parameter and VELOCITY in by_parameter
+    )
+    flow_inputs = {by_parameter[DEPTH].id, by_parameter[VELOCITY].id} if derive_flow else set()
+
+    for start, end in merge_spans(list(touched)):
+        span_channels = set().union(*(touched[b] for b in touched if start <= b < end))
+        outputs = set(span_channels)
+        if span_channels & flow_inputs:
+            outputs |= flow_inputs
+        loaded = {
+            channel_id: await _load(session, channel_id, channels[channel_id].parameter, start, end)
+            for channel_id in outputs
+        }
+        start_ns, end_ns = (int(ns) for ns in to_epoch_ns([start, end]))
+        rows: list[dict] = []
+        for channel_id in span_channels:
+            channel = channels[channel_id]
+            rows += _processed_rows(
+                site_id, channel.parameter, channel.unit, loaded[channel_id], start_ns, end_ns
+            )
+        if span_channels & flow_inputs:
+            depth, velocity = by_parameter[DEPTH].id, by_parameter[VELOCITY].id
+            rows += _flow_rows(
+                site_id, loaded[depth], loaded[velocity], site.pipe_diameter_mm, start_ns, end_ns
+            )
+        await upsert_processed_rows(session, rows)
+        result.spans += 1
+        for row in rows:
+            result.written[row["parameter"]] = result.written.get(row["parameter"], 0) + 1
+
+    stmt = dialect_insert(session, ProcessingWatermark)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["channel_id"],
+        set_={"last_raw_id": stmt.excluded.last_raw_id, "updated_at": func.now()},
+    )
+    await session.execute(
+        stmt, [{"channel_id": cid, "last_raw_id": high} for cid, high in highs.items()]
+    )
+    if last_change is not None:
+        await session.execute(
+            delete(RawChange).where(
+                RawChange.channel_id.in_(channels), RawChange.id <= last_change
+            )
+        )
+    return result
+
+
+async def process_sites(site_ids: list[int], full: bool = False) -> list[ProcessingResult]:
+    """Process several sites, committing each one separately."""
+    results = []
+    for site_id in site_ids:
+        async with new_session() as session:
+            results.append(await process_site(session, site_id, full=full))
+            await session.commit()
+    return results
@@ -2,6 +2,7 @@
 
 import pandas as pd
 import numpy as np
+from app.services.series import FLAG_NAMES, QCFlag, TimeSeriesBlock
 
 
 def check_range(series: pd.Series, min_val: float, max_val: float) -> pd.Series:
@@ -36,27 +37,75 @@ def check_missing(df: pd.DataFrame, timestamp_col: str = "timestamp", freq: str
     return {"missing_count": len(missing), "missing_timestamps": [ts.isoformat() for ts in missing[:100]]}
 
 
-def run_qc_checks(
-    df: pd.DataFrame,
-    parameter: str,
+def range_mask(values: np.ndarray, min_val: float, max_val: float) -> np.ndarray:
+    """Array form of check_range; NaN is never flagged."""
+    return (values < min_val) | (values > max_val)
+
+
+def spike_mask(values: np.ndarray, threshold: float = 3.0) -> np.ndarray:
+    """Array form of check_spike (z-score against the NaN-skipping mean and sample std)."""
+    finite = ~np.isnan(values)
+    if values.size < 3 or finite.sum() < 2:
+        return np.zeros(values.shape, dtype=bool)
+    mean = np.nanmean(values, dtype=np.float64)
+    std = np.nanstd(values, ddof=1, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.abs((values - mean) / std) > threshold
+
+
+# Rows per sliding-window pass; bounds the (rows x window) temporary.
+_FLATLINE_CHUNK = 100_000
+
+
+def flatline_mask(values: np.ndarray, window: int = 10, tolerance: float = 0.001) -> np.ndarray:
+    """Array form of check_flatline: centered rolling std below tolerance."""
+    mask = np.zeros(values.shape, dtype=bool)
+    if values.size < window:
+        return mask
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    offset = window // 2
+    for start in range(0, windows.shape[0], _FLATLINE_CHUNK):
+        chunk = windows[start : start + _FLATLINE_CHUNK]
+        std = chunk.std(axis=1, ddof=1, dtype=np.float64)
+        mask[offset + start : offset + start + chunk.shape[0]] = std < tolerance
+    return mask
+
+
+def qc_flags(
+    values: np.ndarray,
     min_val: float | None = None,
     max_val: float | None = None,
     spike_threshold: float = 3.0,
     flatline_window: int = 10,
-) -> pd.DataFrame:
-    """Run all QC checks on a time series parameter and return flagged DataFrame."""
-    df = df.copy()
-    flags = pd.Series(["OK"] * len(df), index=df.index)
-
+) -> np.ndarray:
+    """uint8 QCFlag codes for a value array; later checks take precedence (RANGE < SPIKE < FLAT)."""
+    flags = np.zeros(values.shape, dtype=np.uint8)
     if min_val is not None and max_val is not None:
-        range_flags = check_range(df[parameter], min_val, max_val)
-        flags[range_flags] = "RANGE"
+        flags[range_mask(values, min_val, max_val)] = QCFlag.RANGE
+    flags[spike_mask(values, threshold=spike_threshold)] = QCFlag.SPIKE
+    flags[flatline_mask(values, window=flatline_window)] = QCFlag.FLAT
+    return flags
 
-    spike_flags = check_spike(df[parameter], threshold=spike_threshold)
-    flags[spike_flags] = "SPIKE"
 
-    flat_flags = check_flatline(df[parameter], window=flatline_window)
-    flags[flat_flags] = "FLAT"
+def run_qc_checks(
+    df: pd.DataFrame | TimeSeriesBlock,
+    parameter: str | None = None,
+    min_val: float | None = None,
+    max_val: float | None = None,
+    spike_threshold: float = 3.0,
+    flatline_window: int = 10,
+) -> pd.DataFrame | TimeSeriesBlock:
+    """Run all QC checks on a time series parameter and return it flagged.
+
+    A TimeSeriesBlock comes back as a block sharing its arrays with uint8 flags;
+    a DataFrame comes back with a ``qc_flag`` string column added.
+    """
+    if isinstance(df, TimeSeriesBlock):
+        return df.with_flags(
+            qc_flags(df.values, min_val, max_val, spike_threshold, flatline_window)
+        )
 
-    df["qc_flag"] = flags
-    return df
+    values = pd.to_numeric(df[parameter], errors="coerce")
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    flags = qc_flags(values, min_val, max_val, spike_threshold, flatline_window)
+    return df.assign(qc_flag=FLAG_NAMES[flags])
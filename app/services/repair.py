@@ -0,0 +1,312 @@
+"""Vectorized gap filling for processed series.
+
+Holes in the sampling interval and QC-flagged points are grouped into gaps, and
+each series is filled in one pass with a method chosen by gap length: short
+interior gaps are interpolated linearly; longer ones take the rating-curve flow
+(flow series at sites with a depth-flow RatingCurve and good depth) or else a
+dry-weather-flow (DWF) diurnal profile built from the series' own good data.
+Gaps longer than ``max_gap_s`` are left alone. Filled points are written to
+TimeSeriesProcessed flagged REPAIRED, with provenance in ``record_metadata``.
+
+The fill itself is a pure function over TimeSeriesBlock arrays so project
+batches run it in the shared process pool.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import timedelta
+from enum import IntEnum
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.services.aggregation import EPOCH
+from app.services.alignment import to_epoch_ns
+from app.services.hydraulics import rating_curve_flow
+from app.services.processing import DEPTH, FLOW
+from app.services.series import FLAG_NAMES, QCFlag, TimeSeriesBlock
+from app.services.storage import upsert_processed_rows
+from app.services.workers import get_worker_pool
+from db.models.core import RatingCurve, TimeSeriesProcessed
+from db.session import get_engine, new_session
+
+_NS = 1_000_000_000
+_DAY_NS = 86_400 * _NS
+_FLAG_CODES = {name: code for code, name in enumerate(FLAG_NAMES)}
+
+
+class RepairMethod(IntEnum):
+    NONE = 0
+    LINEAR = 1
+    DWF = 2
+    RATING = 3
+
+
+@dataclass
+class RepairLimits:
+    linear_max_s: int = 3600
+    max_gap_s: int = 7 * 86_400
+    # Resolution of the DWF diurnal profile; coarser than the samples so slots fill up.
+    profile_step_s: int = 900
+
+
+@dataclass
+class RepairResult:
+    """Filled points only, in timestamp order."""
+
+    timestamps: np.ndarray
+    values: np.ndarray
+    methods: np.ndarray
+    original_values: np.ndarray
+    original_flags: np.ndarray
+    gap_s: np.ndarray
+    unfilled: int = 0
+
+    def counts(self) -> dict[str, int]:
+        codes = np.bincount(self.methods, minlength=len(RepairMethod))
+        return {RepairMethod(c).name.lower(): int(n) for c, n in enumerate(codes) if c and n}
+
+
+@dataclass
+class SiteRepairResult:
+    site_id: int
+    repaired: dict[str, dict[str, int]] = field(default_factory=dict)
+    unfilled: dict[str, int] = field(default_factory=dict)
+
+
+def sample_step(timestamps: np.ndarray) -> int:
+    """Nominal sampling interval (ns): the most common spacing, so holes do not skew it."""
+    if timestamps.size < 2:
+        return 0
+    spacings, counts = np.unique(np.diff(timestamps), return_counts=True)
+    return int(spacings[np.argmax(counts)])
+
+
+def expand_missing(block: TimeSeriesBlock, step_ns: int) -> TimeSeriesBlock:
+    """Insert MISSING samples at the expected instants inside holes wider than one step."""
+    ts = block.timestamps
+    if ts.size < 2 or step_ns <= 0:
+        return block
+    missing = np.maximum(np.rint(np.diff(ts) / step_ns).astype(np.int64) - 1, 0)
+    total = int(missing.sum())
+    if not total:
+        return block
+    owner = np.repeat(np.arange(missing.size), missing)
+    offset = np.arange(total) - np.repeat(np.cumsum(missing) - missing, missing) + 1
+    inserted = ts[owner] + offset * step_ns
+    order = np.argsort(np.concatenate([ts, inserted]), kind="stable")
+    return TimeSeriesBlock(
+        np.concatenate([ts, inserted])[order],
+        np.concatenate([block.values, np.full(total, np.nan, np.float32)])[order],
+        np.concatenate([block.flags, np.full(total, QCFlag.MISSING, np.uint8)])[order],
+        site_id=block.site_id,
+        parameter=block.parameter,
+        unit=block.unit,
+    )
+
+
+def dwf_profile(timestamps: np.ndarray, values: np.ndarray, step_s: int) -> tuple[np.ndarray, int]:
+    """Mean diurnal profile, split weekday/weekend; returns (profile, slots per day).
+
+    Weekday and weekend slots without data fall back to the all-days mean.
+    """
+    step_ns = step_s * _NS
+    slots = -(-_DAY_NS // step_ns)
+    slot = (timestamps % _DAY_NS) // step_ns
+    # Epoch day 0 was a Thursday; Monday is weekday 0.
+    weekend = ((timestamps // _DAY_NS) + 3) % 7 >= 5
+    key = weekend * slots + slot
+    sums = np.bincount(key, weights=values, minlength=2 * slots)
+    counts = np.bincount(key, minlength=2 * slots)
+    all_days = sums.reshape(2, slots).sum(axis=0)
+    all_counts = counts.reshape(2, slots).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        profile = (sums / counts).reshape(2, slots)
+        fallback = all_days / all_counts
+    profile = np.where(counts.reshape(2, slots) > 0, profile, fallback)
+    return profile, int(slots)
+
+
+def repair_block(
+    block: TimeSeriesBlock,
+    limits: RepairLimits | None = None,
+    reference: TimeSeriesBlock | None = None,
+) -> RepairResult:
+    """Fill gaps and flagged points of one series.
+
+    ``reference`` carries substitute values (rating-curve flow) at its own
+    timestamps; NaN there means no substitute for that instant.
+    """
+    limits = limits or RepairLimits()
+    step_ns = sample_step(block.timestamps)
+    series = expand_missing(block, step_ns)
+    ts = series.timestamps
+    values = series.values.astype(np.float64)
+    bad = np.isnan(values) | ~np.isin(series.flags, (QCFlag.OK, QCFlag.REPAIRED))
+    good = ~bad
+
+    # Gap runs over the bad mask: per-point gap length and whether both sides are good.
+    edges = np.diff(np.concatenate(([0], bad.view(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    run_len = ends - starts
+    gap_s = np.repeat(run_len * (step_ns // _NS), run_len)
+    interior = np.repeat((starts > 0) & (ends < ts.size), run_len)
+    idx = np.flatnonzero(bad)
+    within = gap_s <= limits.max_gap_s
+
+    methods = np.zeros(idx.size, dtype=np.uint8)
+    filled = np.full(idx.size, np.nan)
+
+    linear = interior & (gap_s <= limits.linear_max_s) & (good.sum() >= 2)
+    if linear.any():
+        filled[linear] = np.interp(ts[idx[linear]], ts[good], values[good])
+        methods[linear] = RepairMethod.LINEAR
+
+    if reference is not None and len(reference):
+        pos = np.clip(np.searchsorted(reference.timestamps, ts[idx]), 0, len(reference) - 1)
+        hit = reference.timestamps[pos] == ts[idx]
+        substitute = np.where(hit, reference.values[pos].astype(np.float64), np.nan)
+        rating = ~linear & within & ~np.isnan(substitute)
+        filled[rating] = substitute[rating]
+        methods[rating] = RepairMethod.RATING
+
+    if good.any():
+        profile, _ = dwf_profile(ts[good], values[good], limits.profile_step_s)
+        pending = (methods == RepairMethod.NONE) & within
+        t = ts[idx[pending]]
+        weekend = (((t // _DAY_NS) + 3) % 7 >= 5).astype(np.int64)
+        slot = (t % _DAY_NS) // (limits.profile_step_s * _NS)
+        dwf = profile[weekend, slot]
+        usable = ~np.isnan(dwf)
+        pending[np.flatnonzero(pending)[~usable]] = False
+        filled[pending] = dwf[usable]
+        methods[pending] = RepairMethod.DWF
+
+    done = methods != RepairMethod.NONE
+    chosen = idx[done]
+    return RepairResult(
+        timestamps=ts[chosen],
+        values=filled[done],
+        methods=methods[done],
+        original_values=values[chosen],
+        original_flags=series.flags[chosen],
+        gap_s=gap_s[done],
+        unfilled=int(idx.size - done.sum()),
+    )
+
+
+async def load_processed(session: AsyncSession, site_id: int, parameter: str) -> TimeSeriesBlock:
+    query = (
+        select(TimeSeriesProcessed.timestamp, TimeSeriesProcessed.value, TimeSeriesProcessed.qc_summary)
+        .where(TimeSeriesProcessed.site_id == site_id, TimeSeriesProcessed.parameter == parameter)
+        .order_by(TimeSeriesProcessed.timestamp)
+    )
+    rows = (await session.execute(query)).all()
+    unit = await session.scalar(
+        select(TimeSeriesProcessed.unit)
+        .where(TimeSeriesProcessed.site_id == site_id, TimeSeriesProcessed.parameter == parameter)
+        .limit(1)
+    )
+    return TimeSeriesBlock(
+        to_epoch_ns(r.timestamp for r in rows),
+        np.array([np.nan if r.value is None else r.value for r in rows], dtype=np.float32),
+        np.array([_FLAG_CODES.get(r.qc_summary, QCFlag.OK) for r in rows], dtype=np.uint8),
+        site_id=site_id,
+        parameter=parameter,
+        unit=unit,
+    )
+
+
+async def rating_reference(session: AsyncSession, site_id: int) -> TimeSeriesBlock | None:
+    """Flow implied by good depth samples through the site's latest depth-flow rating curve."""
+    curve = await session.scalar(
+        select(RatingCurve)
+        .where(RatingCurve.site_id == site_id, RatingCurve.curve_type == "depth-flow")
+        .order_by(RatingCurve.id.desc())
+        .limit(1)
+    )
+    if curve is None:
+        return None
+    depth = await load_processed(session, site_id, DEPTH)
+    usable = np.isin(depth.flags, (QCFlag.OK, QCFlag.REPAIRED)) & ~np.isnan(depth.values)
+    flow = np.where(usable, rating_curve_flow(curve.coefficients, depth.values), np.nan)
+    return TimeSeriesBlock(depth.timestamps, flow, site_id=site_id, parameter=FLOW, unit="m3/s")
+
+
+def repair_rows(block: TimeSeriesBlock, result: RepairResult) -> list[dict]:
+    original_names = FLAG_NAMES[result.original_flags]
+    return [
+        {
+            "site_id": block.site_id,
+            "parameter": block.parameter,
+            "timestamp": EPOCH + timedelta(microseconds=int(ts) // 1000),
+            "value": float(value),
+            "unit": block.unit,
+            "qc_summary": QCFlag.REPAIRED.name,
+            "source_raw_id": None,
+            "record_metadata": {
+                "repair": RepairMethod(method).name.lower(),
+                "original_flag": flag,
+                "original_value": None if np.isnan(original) else float(original),
+                "gap_s": int(gap),
+            },
+        }
+        for ts, value, method, flag, original, gap in zip(
+            result.timestamps,
+            result.values,
+            result.methods,
+            original_names,
+            result.original_values,
+            result.gap_s,
+        )
+    ]
+
+
+async def repair_sites(
+    site_ids: list[int], parameters: list[str] | None = None, limits: RepairLimits | None = None
+) -> list[SiteRepairResult]:
+    """Repair every processed parameter (or just ``parameters``) of each site.
+
+    Series are filled in the process pool; each site commits separately.
+    """
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    pool = get_worker_pool()
+    # Bound how many sites' arrays are in memory; SQLite serializes writers anyway.
+    compute_slots = asyncio.Semaphore(settings.worker_processes)
+    sqlite = get_engine().dialect.name == "sqlite"
+    write_slots = asyncio.Semaphore(1 if sqlite else settings.ingest_max_concurrency)
+
+    async def repair_site(site_id: int) -> SiteRepairResult:
+        summary = SiteRepairResult(site_id=site_id)
+        async with compute_slots:
+            async with new_session() as session:
+                names = parameters or list(
+                    await session.scalars(
+                        select(TimeSeriesProcessed.parameter)
+                        .where(TimeSeriesProcessed.site_id == site_id)
+                        .distinct()
+                    )
+                )
+                blocks = [await load_processed(session, site_id, name) for name in names]
+                reference = await rating_reference(session, site_id) if FLOW in names else None
+            futures = [
+                loop.run_in_executor(
+                    pool, repair_block, block, limits, reference if block.parameter == FLOW else None
+                )
+                for block in blocks
+                if len(block)
+            ]
+            results = await asyncio.gather(*futures)
+
+        rows: list[dict] = []
+        for block, result in zip([b for b in blocks if len(b)], results):
+            summary.repaired[block.parameter] = result.counts()
+            summary.unfilled[block.parameter] = result.unfilled
+            rows += repair_rows(block, result)
+        async with write_slots, new_session() as session:
+            await upsert_processed_rows(session, rows)
+            await session.commit()
+        return summary
+
+    return list(await asyncio.gather(*(repair_site(site_id) for site_id in site_ids)))
@@ -0,0 +1,197 @@
+"""Render cached report artifacts to PDF or Excel."""
+
+import re
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any
+import numpy as np
+from app.services.pdf import PAGE_HEIGHT, PAGE_WIDTH, SimplePdf
+
+REPORT_TITLES = {
+    "site": "Site Summary Report",
+    "qc": "QC Report",
+    "hydraulics": "Hydraulic Analysis Report",
+}
+STAT_COLUMNS = ["count", "min", "max", "mean", "std", "p05", "p50", "p95"]
+MARGIN = 50
+# Excel sheet titles: at most 31 characters, none of these, unique ignoring case.
+SHEET_TITLE_MAX = 31
+SHEET_TITLE_INVALID = re.compile(r"[\\/?*\[\]:]")
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return "" if value is None else str(value)
+
+
+def _sheet_title(title: str, taken: set[str]) -> str:
+    """A valid Excel sheet title for ``title``, numbered when truncation collides."""
+    base = SHEET_TITLE_INVALID.sub("_", title)[:SHEET_TITLE_MAX]
+    candidate, n = base, 1
+    while candidate.lower() in taken:
+        n += 1
+        suffix = f" ({n})"
+        candidate = base[: SHEET_TITLE_MAX - len(suffix)] + suffix
+    taken.add(candidate.lower())
+    return candidate
+
+
+def _by_prefix(artifacts: dict[str, Any], prefix: str) -> dict[str, Any]:
+    return {name.split(".", 1)[1]: art for name, art in artifacts.items() if name.startswith(prefix)}
+
+
+class _PdfLayout:
+    """Top-down cursor over SimplePdf pages."""
+
+    def __init__(self) -> None:
+        self.pdf = SimplePdf()
+        self.pdf.add_page()
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure(self, height: float) -> None:
+        if self.y - height < MARGIN:
+            self.pdf.add_page()
+            self.y = PAGE_HEIGHT - MARGIN
+
+    def line(self, text: str, size: int = 10, bold: bool = False, x: float = MARGIN) -> None:
+        self.ensure(size + 4)
+        self.pdf.text(x, self.y, text, size=size, bold=bold)
+        self.y -= size + 4
+
+    def row(self, cells: list[str], widths: list[int], bold: bool = False) -> None:
+        self.ensure(14)
+        x = MARGIN
+        for cell, width in zip(cells, widths):
+            self.pdf.text(x, self.y, cell, size=8, bold=bold)
+            x += width
+        self.y -= 12
+
+    def chart(self, chart: dict) -> None:
+        height, width = 150, PAGE_WIDTH - 2 * MARGIN
+        self.ensure(height + 30)
+        self.line(chart["title"], size=10, bold=True)
+        bottom = self.y - height
+        self.pdf.rect(MARGIN, bottom, width, height)
+        x, y = np.asarray(chart["x"], dtype=np.float64), np.asarray(chart["y"], dtype=np.float64)
+        if x.size > 1:
+            x_span = (x.max() - x.min()) or 1.0
+            y_min, y_max = float(y.min()), float(y.max())
+            y_span = (y_max - y_min) or 1.0
+            px = MARGIN + (x - x.min()) / x_span * width
+            py = bottom + (y - y_min) / y_span * (height - 10) + 5
+            self.pdf.polyline(list(zip(px.tolist(), py.tolist())))
+            self.pdf.text(MARGIN + 2, bottom + height - 10, f"max {_fmt(y_max)}", size=7)
+            self.pdf.text(MARGIN + 2, bottom + 3, f"min {_fmt(y_min)}", size=7)
+        self.y = bottom - 16
+
+
+def render_pdf(kind: str, site: dict, artifacts: dict[str, Any]) -> bytes:
+    layout = _PdfLayout()
+    layout.line(f"{REPORT_TITLES[kind]} - {site['name']}", size=16, bold=True)
+    layout.line(f"Generated {datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC", size=9)
+    layout.line(
+        f"Site code: {site['code'] or '-'}   Pipe: {site['pipe_material'] or '-'} "
+        f"{_fmt(site['pipe_diameter_mm'])} mm",
+        size=9,
+    )
+    layout.y -= 10
+
+    stats = _by_prefix(artifacts, "stats.")
+    if stats:
+        layout.line("Data quality statistics", size=12, bold=True)
+        widths = [80] + [50] * len(STAT_COLUMNS) + [80]
+        layout.row(["parameter", *STAT_COLUMNS, "qc flags"], widths, bold=True)
+        for parameter, stat in stats.items():
+            flags = ", ".join(f"{k}={v}" for k, v in stat["qc_flags"].items() if k != "OK")
+            layout.row([parameter, *(_fmt(stat.get(c)) for c in STAT_COLUMNS), flags or "-"], widths)
+        layout.y -= 10
+
+    if "hydraulics" in artifacts:
+        layout.line("Hydraulics", size=12, bold=True)
+        for name, value in artifacts["hydraulics"]["summary"].items():
+            layout.line(f"{name}: {_fmt(value)}", size=9)
+        layout.y -= 10
+
+    if "ii_events" in artifacts:
+        events = artifacts["ii_events"]
+        layout.line("Inflow / infiltration events", size=12, bold=True)
+        layout.line(f"Dry-weather baseline: {_fmt(events['baseline'])}", size=9)
+        widths = [150, 150, 60, 60, 80]
+        layout.row(["start", "end", "hours", "peak", "excess volume"], widths, bold=True)
+        for event in events["events"]:
+            numbers = (_fmt(event[k]) for k in ("duration_h", "peak", "excess_volume"))
+            layout.row([event["start"], event["end"], *numbers], widths)
+        layout.y -= 10
+
+    for chart in _by_prefix(artifacts, "chart.").values():
+        layout.chart(chart)
+    if "hydraulics" in artifacts and artifacts["hydraulics"]["flow"].size:
+        hydraulics = artifacts["hydraulics"]
+        step = max(1, hydraulics["flow"].size // 500)
+        layout.chart(
+            {
+                "title": "derived flow (m3/s)",
+                "x": hydraulics["timestamps"][::step],
+                "y": hydraulics["flow"][::step],
+            }
+        )
+    return layout.pdf.to_bytes()
+
+
+def render_xlsx(kind: str, site: dict, artifacts: dict[str, Any]) -> bytes:
+    from openpyxl import Workbook
+    from openpyxl.chart import LineChart, Reference
+
+    wb = Workbook()
+    summary = wb.active
+    summary.title = "Summary"
+    summary.append([REPORT_TITLES[kind]])
+    for key in ("name", "code", "pipe_material", "pipe_diameter_mm"):
+        summary.append([key, site[key]])
+    summary.append(["generated", datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")])
+
+    stats = _by_prefix(artifacts, "stats.")
+    if stats:
+        sheet = wb.create_sheet("QC Stats")
+        sheet.append(["parameter", *STAT_COLUMNS, "start", "end", "qc_flags"])
+        for parameter, stat in stats.items():
+            flags = ", ".join(f"{k}={v}" for k, v in stat["qc_flags"].items())
+            values = [stat.get(c) for c in STAT_COLUMNS]
+            sheet.append([parameter, *values, stat.get("start"), stat.get("end"), flags])
+
+    if "hydraulics" in artifacts:
+        sheet = wb.create_sheet("Hydraulics")
+        for name, value in artifacts["hydraulics"]["summary"].items():
+            sheet.append([name, value])
+
+    if "ii_events" in artifacts:
+        sheet = wb.create_sheet("I-I Events")
+        sheet.append(["baseline", artifacts["ii_events"]["baseline"]])
+        sheet.append(["start", "end", "duration_h", "peak", "excess_volume"])
+        for event in artifacts["ii_events"]["events"]:
+            sheet.append([event[k] for k in ("start", "end", "duration_h", "peak", "excess_volume")])
+
+    taken = {sheet.title.lower() for sheet in wb.worksheets}
+    for parameter, chart in _by_prefix(artifacts, "chart.").items():
+        sheet = wb.create_sheet(_sheet_title(f"Chart {parameter}", taken))
+        sheet.append(["timestamp", parameter])
+        instants = np.asarray(chart["x"]).view("datetime64[ns]").astype("datetime64[us]").astype(object)
+        for ts, value in zip(instants, np.asarray(chart["y"]).tolist()):
+            sheet.append([ts, value])
+        line = LineChart()
+        line.title = chart["title"]
+        data = Reference(sheet, min_col=2, min_row=1, max_row=sheet.max_row)
+        line.add_data(data, titles_from_data=True)
+        line.set_categories(Reference(sheet, min_col=1, min_row=2, max_row=sheet.max_row))
+        sheet.add_chart(line, "D2")
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def render_report(fmt: str, kind: str, site: dict, artifacts: dict[str, Any]) -> bytes:
+    if fmt == "xlsx":
+        return render_xlsx(kind, site, artifacts)
+    return render_pdf(kind, site, artifacts)
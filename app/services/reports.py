@@ -0,0 +1,464 @@
+"""Report job pipeline with per-stage artifact caching.
+
+A report is assembled from independent stages (per-parameter statistics and
+charts, hydraulics, I/I events). Each stage result is cached on disk under a key
+derived from the data version of exactly the inputs it reads, so regenerating a
+report after new data arrives for one parameter only recomputes the stages that
+read that parameter. Stages run in the shared process pool; rendering is cheap
+and happens in the event loop.
+
+Job state is kept in memory and mirrored to ``<report_dir>/jobs/<id>.json`` so
+any worker process sharing the report directory can answer status and
+download requests. Finished jobs and their outputs are removed after
+``report_job_ttl_s``.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import pickle
+import re
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.schemas import ReportFormat, ReportKind
+from app.services.archive import read_raw_frame
+from app.services.hydraulics import flow_from_blocks
+from app.services.processing import DEPTH, FLOW, VELOCITY
+from app.services.qc import run_qc_checks
+from app.services.report_render import render_report
+from app.services.series import QCFlag, TimeSeriesBlock
+from app.services.workers import get_worker_pool
+from db.models.core import ArchivePartition, Channel, Site, TimeSeriesRaw
+from db.session import new_session
+
+logger = logging.getLogger(__name__)
+
+# Bump a stage's version when its output changes so stale artifacts are ignored.
+STAGE_VERSIONS = {"stats": 1, "chart": 1, "hydraulics": 2, "ii_events": 1}
+CHART_POINTS = 500
+
+
+# Stage functions run in worker processes: arrays in, plain picklable results out.
+
+
+def _iso(ns: int | np.integer) -> str:
+    return pd.Timestamp(int(ns), tz="UTC").isoformat()
+
+
+def _trapezoid(y: np.ndarray, x: np.ndarray) -> float:
+    return float(np.sum((y[1:] + y[:-1]) * np.diff(x)) / 2) if y.size > 1 else 0.0
+
+
+def compute_stats(block: TimeSeriesBlock) -> dict:
+    """Descriptive statistics plus QC flag counts for one parameter."""
+    if len(block) == 0:
+        return {"count": 0, "qc_flags": {}}
+    flagged = run_qc_checks(block)
+    values = block.values.astype(np.float64)
+    p05, p50, p95 = np.percentile(values, [5, 50, 95])
+    flag_counts = np.bincount(flagged.flags, minlength=len(QCFlag))
+    return {
+        "count": len(block),
+        "start": _iso(block.timestamps[0]),
+        "end": _iso(block.timestamps[-1]),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "p05": float(p05),
+        "p50": float(p50),
+        "p95": float(p95),
+        "qc_flags": {QCFlag(code).name: int(n) for code, n in enumerate(flag_counts) if n},
+    }
+
+
+def compute_chart(block: TimeSeriesBlock, title: str) -> dict:
+    """Evenly decimated series small enough to embed in a report."""
+    positions = np.linspace(0, max(len(block) - 1, 0), min(len(block), CHART_POINTS))
+    idx = np.unique(positions.astype(int))
+    return {"title": title, "x": block.timestamps[idx], "y": block.values[idx]}
+
+
+def compute_hydraulics(depth: TimeSeriesBlock, velocity: TimeSeriesBlock, diameter_mm: float) -> dict:
+    """Flow from depth and velocity at coincident timestamps, with a summary."""
+    flow_block = flow_from_blocks(depth, velocity, diameter_mm)
+    flow = flow_block.values.astype(np.float64)
+    summary: dict[str, Any] = {"samples": int(flow.size), "pipe_diameter_mm": diameter_mm}
+    if flow.size:
+        seconds = (flow_block.timestamps - flow_block.timestamps[0]) / 1e9
+        # Only depth samples with a coincident velocity contribute, as for the flow itself.
+        coincident = np.searchsorted(depth.timestamps, flow_block.timestamps)
+        summary.update(
+            {
+                "mean_flow_l_s": float(flow.mean() * 1000),
+                "peak_flow_l_s": float(flow.max() * 1000),
+                "min_flow_l_s": float(flow.min() * 1000),
+                "volume_m3": _trapezoid(flow, seconds),
+                "peak_depth_ratio": float(depth.values[coincident].max() / diameter_mm),
+            }
+        )
+    return {"timestamps": flow_block.timestamps, "flow": flow_block.values, "summary": summary}
+
+
+def detect_ii_events(
+    block: TimeSeriesBlock, threshold: float = 0.5, min_duration_s: float = 3600.0
+) -> dict:
+    """Screen for inflow/infiltration events: sustained runs above the median (dry-weather) flow."""
+    timestamps_ns, flow = block.timestamps, block.values.astype(np.float64)
+    if flow.size == 0:
+        return {"baseline": None, "events": []}
+    baseline = float(np.median(flow))
+    above = np.concatenate(([0], (flow > baseline * (1 + threshold)).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(above))
+    events = []
+    for start, stop in zip(edges[::2], edges[1::2]):
+        duration_s = (timestamps_ns[stop - 1] - timestamps_ns[start]) / 1e9
+        if duration_s < min_duration_s:
+            continue
+        seconds = (timestamps_ns[start:stop] - timestamps_ns[start]) / 1e9
+        events.append(
+            {
+                "start": _iso(timestamps_ns[start]),
+                "end": _iso(timestamps_ns[stop - 1]),
+                "duration_h": round(duration_s / 3600, 2),
+                "peak": float(flow[start:stop].max()),
+                "excess_volume": _trapezoid(flow[start:stop] - baseline, seconds),
+            }
+        )
+    return {"baseline": baseline, "events": events}
+
+
+def stage_filename(stage: str) -> str:
+    """Filesystem- and glob-safe name for a stage; stage names embed user-supplied parameters."""
+    safe = re.sub(r"[^A-Za-z0-9_]+", "_", stage)[:40]
+    return f"{safe}.{hashlib.sha256(stage.encode()).hexdigest()[:12]}"
+
+
+class ArtifactCache:
+    """Pickled stage artifacts under ``<root>/site_<id>/<stage file name>-<key>.pkl``."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _path(self, site_id: int, stage: str, key: str) -> Path:
+        return self.root / f"site_{site_id}" / f"{stage_filename(stage)}-{key}.pkl"
+
+    def load(self, site_id: int, stage: str, key: str) -> Any | None:
+        path = self._path(site_id, stage, key)
+        if not path.exists():
+            return None
+        with path.open("rb") as fh:
+            return pickle.load(fh)
+
+    def store(self, site_id: int, stage: str, key: str, artifact: Any) -> None:
+        path = self._path(site_id, stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Older versions of this stage can never be hit again once superseded.
+        for stale in path.parent.glob(f"{stage_filename(stage)}-*.pkl"):
+            stale.unlink(missing_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as fh:
+            pickle.dump(artifact, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+
+def stage_key(kind: str, *inputs: Any) -> str:
+    digest = hashlib.sha256(repr((kind, STAGE_VERSIONS[kind], inputs)).encode())
+    return digest.hexdigest()[:24]
+
+
+async def parameter_versions(session: AsyncSession, site_id: int) -> dict[str, str]:
+    """Cheap per-parameter fingerprint that changes whenever samples are added, edited or removed.
+
+    Archived samples are covered by the site's partition catalog, so archiving or
+    re-archiving a month changes every parameter's fingerprint.
+    """
+    archive = (
+        await session.execute(
+            select(
+                func.count(),
+                func.sum(ArchivePartition.row_count),
+                func.max(ArchivePartition.updated_at),
+            ).where(ArchivePartition.site_id == site_id)
+        )
+    ).one()
+    query = (
+        select(
+            Channel.parameter,
+            func.count(TimeSeriesRaw.id),
+            func.max(TimeSeriesRaw.id),
+            func.max(TimeSeriesRaw.updated_at),
+            func.sum(TimeSeriesRaw.value),
+        )
+        .outerjoin(TimeSeriesRaw, TimeSeriesRaw.channel_id == Channel.id)
+        .where(Channel.site_id == site_id)
+        .group_by(Channel.parameter)
+    )
+    result = await session.execute(query)
+    return {
+        row[0]: ":".join(str(v) for v in (*row[1:], *archive))
+        for row in result
+        if row[1] or archive[0]
+    }
+
+
+async def load_series(session: AsyncSession, site_id: int, parameter: str) -> TimeSeriesBlock:
+    frame = await read_raw_frame(session, site_id, parameter)
+    frame = frame[frame["value"].notna()]
+    values = frame["value"].to_numpy(np.float32)
+    timestamps = frame["timestamp"].to_numpy("datetime64[ns]").astype(np.int64)
+    return TimeSeriesBlock(timestamps, values, site_id=site_id, parameter=parameter)
+
+
+@dataclass
+class StageSpec:
+    name: str
+    key: str
+    func: Callable[..., Any]
+    make_args: Callable[[], Awaitable[tuple]]
+
+
+@dataclass
+class ReportJob:
+    site_id: int
+    kind: ReportKind
+    format: ReportFormat
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    stages: dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+    output_path: Path | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: datetime | None = None
+
+
+_jobs: dict[str, ReportJob] = {}
+_tasks: set[asyncio.Task] = set()
+_JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def _jobs_dir() -> Path:
+    return Path(get_settings().report_dir) / "jobs"
+
+
+def _save_job(job: ReportJob) -> None:
+    path = _jobs_dir() / f"{job.id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(job), default=str))
+    tmp.replace(path)
+
+
+def _load_job(path: Path) -> ReportJob | None:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    for name in ("created_at", "finished_at"):
+        data[name] = data[name] and datetime.fromisoformat(data[name])
+    data["output_path"] = data["output_path"] and Path(data["output_path"])
+    return ReportJob(**data)
+
+
+def evict_expired_jobs(now: datetime | None = None) -> int:
+    """Drop finished jobs older than the TTL with their rendered outputs; returns how many."""
+    now = now or datetime.now(timezone.utc)
+    ttl = get_settings().report_job_ttl_s
+    evicted = 0
+    for path in _jobs_dir().glob("*.json"):
+        job = _load_job(path)
+        if job is None or job.finished_at is None:
+            continue
+        if (now - job.finished_at).total_seconds() <= ttl:
+            continue
+        if job.output_path is not None:
+            job.output_path.unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+        _jobs.pop(job.id, None)
+        evicted += 1
+    return evicted
+
+
+def submit_report_job(site_id: int, kind: ReportKind, fmt: ReportFormat) -> ReportJob:
+    evict_expired_jobs()
+    job = ReportJob(site_id=site_id, kind=kind, format=fmt)
+    _jobs[job.id] = job
+    _save_job(job)
+    task = asyncio.create_task(run_report_job(job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def get_report_job(job_id: str) -> ReportJob | None:
+    """A job from this process, or one another worker recorded in the report directory."""
+    job = _jobs.get(job_id)
+    if job is None and _JOB_ID_RE.fullmatch(job_id):
+        job = _load_job(_jobs_dir() / f"{job_id}.json")
+    return job
+
+
+async def cancel_report_jobs() -> None:
+    """Cancel jobs still running in this process; called at shutdown."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+async def _run_stages(
+    job: ReportJob, cache: ArtifactCache, specs: list[StageSpec]
+) -> dict[str, Any]:
+    """Serve stages from cache; submit misses to the pool as soon as their inputs are loaded."""
+    loop = asyncio.get_running_loop()
+    pool = get_worker_pool()
+    results: dict[str, Any] = {}
+    pending = []
+    for spec in specs:
+        cached = cache.load(job.site_id, spec.name, spec.key)
+        if cached is not None:
+            results[spec.name] = cached
+            job.stages[spec.name] = "cached"
+            continue
+        args = await spec.make_args()
+        job.stages[spec.name] = "running"
+        pending.append((spec, loop.run_in_executor(pool, spec.func, *args)))
+    for spec, future in pending:
+        results[spec.name] = await future
+        cache.store(job.site_id, spec.name, spec.key, results[spec.name])
+        job.stages[spec.name] = "computed"
+    return results
+
+
+async def _build_artifacts(
+    job: ReportJob, session: AsyncSession, site: Site, cache: ArtifactCache
+) -> dict[str, Any]:
+    versions = await parameter_versions(session, site.id)
+    loaded: dict[str, TimeSeriesBlock] = {}
+
+    def series(parameter: str) -> Callable[[], Awaitable[tuple[TimeSeriesBlock]]]:
+        async def load() -> tuple[TimeSeriesBlock]:
+            if parameter not in loaded:
+                loaded[parameter] = await load_series(session, site.id, parameter)
+            return (loaded[parameter],)
+
+        return load
+
+    def args_of(
+        *loaders: Callable[[], Awaitable[tuple]], extra: tuple = ()
+    ) -> Callable[[], Awaitable[tuple]]:
+        async def make() -> tuple:
+            args: tuple = ()
+            for loader in loaders:
+                args += await loader()
+            return args + extra
+
+        return make
+
+    specs: list[StageSpec] = []
+    if job.kind in ("site", "qc"):
+        for parameter, version in sorted(versions.items()):
+            specs.append(
+                StageSpec(
+                    f"stats.{parameter}",
+                    stage_key("stats", version),
+                    compute_stats,
+                    args_of(series(parameter)),
+                )
+            )
+            specs.append(
+                StageSpec(
+                    f"chart.{parameter}",
+                    stage_key("chart", version),
+                    compute_chart,
+                    args_of(series(parameter), extra=(parameter,)),
+                )
+            )
+
+    hydraulics_key = None
+    if job.kind in ("site", "hydraulics"):
+        if DEPTH in versions and VELOCITY in versions and site.pipe_diameter_mm:
+            hydraulics_key = stage_key(
+                "hydraulics", versions[DEPTH], versions[VELOCITY], site.pipe_diameter_mm
+            )
+            specs.append(
+                StageSpec(
+                    "hydraulics",
+                    hydraulics_key,
+                    compute_hydraulics,
+                    args_of(series(DEPTH), series(VELOCITY), extra=(site.pipe_diameter_mm,)),
+                )
+            )
+        else:
+            job.stages["hydraulics"] = "skipped"
+
+    artifacts = await _run_stages(job, cache, specs)
+
+    if job.kind in ("site", "hydraulics"):
+        # Measured flow wins; otherwise events are screened on the derived hydrograph.
+        if FLOW in versions:
+            flow_key = stage_key("ii_events", versions[FLOW])
+            spec = StageSpec("ii_events", flow_key, detect_ii_events, args_of(series(FLOW)))
+        elif hydraulics_key:
+            derived = artifacts["hydraulics"]
+
+            async def derived_flow() -> tuple:
+                flow = TimeSeriesBlock(derived["timestamps"], derived["flow"], site_id=site.id, parameter=FLOW)
+                return (flow,)
+
+            spec = StageSpec(
+                "ii_events", stage_key("ii_events", hydraulics_key), detect_ii_events, derived_flow
+            )
+        else:
+            spec = None
+            job.stages["ii_events"] = "skipped"
+        if spec:
+            artifacts.update(await _run_stages(job, cache, [spec]))
+    return artifacts
+
+
+async def run_report_job(job: ReportJob) -> None:
+    job.status = "running"
+    _save_job(job)
+    try:
+        settings = get_settings()
+        report_dir = Path(settings.report_dir)
+        cache = ArtifactCache(report_dir / "cache")
+        async with new_session() as session:
+            site = await session.get(Site, job.site_id)
+            if site is None:
+                raise ValueError(f"Site {job.site_id} not found")
+            artifacts = await _build_artifacts(job, session, site, cache)
+            site_info = {
+                "id": site.id,
+                "name": site.name,
+                "code": site.code,
+                "pipe_material": site.pipe_material,
+                "pipe_diameter_mm": site.pipe_diameter_mm,
+            }
+        content = render_report(job.format, job.kind, site_info, artifacts)
+        output_dir = report_dir / "output"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        job.output_path = output_dir / f"{job.id}.{job.format}"
+        job.output_path.write_bytes(content)
+        job.status = "done"
+    except asyncio.CancelledError:
+        job.status = "failed"
+        job.error = "Cancelled at shutdown"
+        raise
+    except Exception as e:
+        logger.exception("Report job %s failed", job.id)
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        _save_job(job)
@@ -0,0 +1,140 @@
+"""Compact NumPy-backed container for a single site/parameter series."""
+
+import json
+from enum import IntEnum
+from pathlib import Path
+from typing import TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class QCFlag(IntEnum):
+    OK = 0
+    RANGE = 1
+    SPIKE = 2
+    FLAT = 3
+    MISSING = 4
+    REPAIRED = 5
+
+
+FLAG_NAMES = np.array([flag.name for flag in QCFlag], dtype=object)
+
+
+class TimeSeriesBlock:
+    """Parallel arrays of int64 epoch-ns timestamps, float32 values and uint8 QC flags.
+
+    Timestamps are expected sorted ascending. Slicing returns views that share
+    memory with the parent, and blocks saved with ``save`` can be reopened
+    memory-mapped so large series are paged in on demand.
+    """
+
+    __slots__ = ("site_id", "parameter", "unit", "timestamps", "values", "flags")
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+        flags: np.ndarray | None = None,
+        site_id: int | None = None,
+        parameter: str | None = None,
+        unit: str | None = None,
+    ) -> None:
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.flags = (
+            np.zeros(self.values.shape, dtype=np.uint8)
+            if flags is None
+            else np.asarray(flags, dtype=np.uint8)
+        )
+        if not (self.timestamps.shape == self.values.shape == self.flags.shape):
+            raise ValueError("timestamps, values and flags must have the same length")
+        self.site_id = site_id
+        self.parameter = parameter
+        self.unit = unit
+
+    def __len__(self) -> int:
+        return self.values.size
+
+    def __repr__(self) -> str:
+        return (
+            f"TimeSeriesBlock(site_id={self.site_id}, parameter={self.parameter!r}, "
+            f"n={len(self)}, nbytes={self.nbytes})"
+        )
+
+    def __getitem__(self, key: slice | np.ndarray) -> "TimeSeriesBlock":
+        # Slices give views; boolean or index arrays necessarily copy.
+        return self._derive(self.timestamps[key], self.values[key], self.flags[key])
+
+    def _derive(
+        self, timestamps: np.ndarray, values: np.ndarray, flags: np.ndarray
+    ) -> "TimeSeriesBlock":
+        return TimeSeriesBlock(timestamps, values, flags, self.site_id, self.parameter, self.unit)
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.values.nbytes + self.flags.nbytes
+
+    def between(self, start_ns: int | None = None, end_ns: int | None = None) -> "TimeSeriesBlock":
+        """Zero-copy view of samples with start <= t < end."""
+        lo = 0 if start_ns is None else int(np.searchsorted(self.timestamps, start_ns, side="left"))
+        hi = len(self) if end_ns is None else int(np.searchsorted(self.timestamps, end_ns, side="left"))
+        return self[lo:hi]
+
+    def with_flags(self, flags: np.ndarray) -> "TimeSeriesBlock":
+        """New block sharing timestamps and values with replaced flags."""
+        return self._derive(self.timestamps, self.values, flags)
+
+    def valid(self) -> np.ndarray:
+        """Mask of samples that have a value and passed QC."""
+        return (self.flags == QCFlag.OK) & ~np.isnan(self.values)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: "pd.DataFrame",
+        column: str,
+        timestamp_col: str = "timestamp",
+        site_id: int | None = None,
+        unit: str | None = None,
+    ) -> "TimeSeriesBlock":
+        """Build a block from one value column of a wide frame with UTC timestamps."""
+        import pandas as pd
+
+        ordered = df.sort_values(timestamp_col) if not df[timestamp_col].is_monotonic_increasing else df
+        timestamps = pd.DatetimeIndex(ordered[timestamp_col]).as_unit("ns").asi8
+        values = pd.to_numeric(ordered[column], errors="coerce")
+        values = values.to_numpy(dtype=np.float32, na_value=np.nan)
+        return cls(timestamps, values, site_id=site_id, parameter=column, unit=unit)
+
+    def to_frame(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(self.timestamps, utc=True),
+                self.parameter or "value": self.values,
+                "qc_flag": FLAG_NAMES[self.flags],
+            }
+        )
+
+    def save(self, directory: str | Path) -> Path:
+        """Write arrays as .npy files plus metadata so ``open`` can memory-map them."""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("timestamps", "values", "flags"):
+            np.save(path / f"{name}.npy", getattr(self, name))
+        meta = {"site_id": self.site_id, "parameter": self.parameter, "unit": self.unit}
+        (path / "meta.json").write_text(json.dumps(meta))
+        return path
+
+    @classmethod
+    def open(cls, directory: str | Path, mmap_mode: str | None = "r") -> "TimeSeriesBlock":
+        path = Path(directory)
+        meta = json.loads((path / "meta.json").read_text())
+        arrays = [
+            np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in ("timestamps", "values", "flags")
+        ]
+        return cls(*arrays, **meta)
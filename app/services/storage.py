@@ -0,0 +1,279 @@
+"""Bulk write helpers for time series tables."""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterable, Literal, Mapping
+from sqlalchemy import func, insert, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models.core import Channel, DataSource, RawChange, TimeSeriesProcessed, TimeSeriesRaw
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Rows per INSERT; keeps each statement well under SQLite's bound-parameter limit.
+INSERT_CHUNK_SIZE = 2000
+
+ConflictMode = Literal["skip", "update"]
+# Dialects with ON CONFLICT upserts, and the only ones the services support.
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+
+@dataclass
+class SampleStats:
+    """Count, range, sum, M2 and time range of a set of samples.
+
+    M2 is the sum of squared deviations from the set's own mean, so two sets
+    merge exactly with the parallel-variance formula.
+    """
+
+    count: int = 0
+    min: float | None = None
+    max: float | None = None
+    sum: float = 0.0
+    m2: float = 0.0
+    first_timestamp: datetime | None = None
+    last_timestamp: datetime | None = None
+
+    @classmethod
+    def of(cls, samples: Iterable[tuple[datetime, float | None]]) -> "SampleStats":
+        pairs = [(ts, value) for ts, value in samples if value is not None]
+        if not pairs:
+            return cls()
+        values = [value for _, value in pairs]
+        total = math.fsum(values)
+        mean = total / len(values)
+        return cls(
+            count=len(values),
+            min=min(values),
+            max=max(values),
+            sum=total,
+            m2=math.fsum((v - mean) ** 2 for v in values),
+            first_timestamp=min(ts for ts, _ in pairs),
+            last_timestamp=max(ts for ts, _ in pairs),
+        )
+
+    def merge(self, other: "SampleStats") -> None:
+        if not other.count:
+            return
+        if self.count:
+            delta = other.sum / other.count - self.sum / self.count
+            self.m2 += other.m2 + delta * delta * self.count * other.count / (self.count + other.count)
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self.first_timestamp = min(self.first_timestamp, other.first_timestamp)
+            self.last_timestamp = max(self.last_timestamp, other.last_timestamp)
+        else:
+            self.m2, self.min, self.max = other.m2, other.min, other.max
+            self.first_timestamp, self.last_timestamp = other.first_timestamp, other.last_timestamp
+        self.count += other.count
+        self.sum += other.sum
+
+
+@dataclass
+class UpsertCounts:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    # Per channel id: the values this write left stored, and those it overwrote.
+    stored: dict[int, SampleStats] = field(default_factory=dict)
+    replaced: dict[int, SampleStats] = field(default_factory=dict)
+
+    def add(self, target: dict[int, SampleStats], samples: Iterable[tuple]) -> None:
+        """Merge (channel_id, timestamp, value) samples into ``stored`` or ``replaced``."""
+        by_channel: dict[int, list[tuple]] = {}
+        for channel_id, ts, value in samples:
+            by_channel.setdefault(channel_id, []).append((ts, value))
+        for channel_id, pairs in by_channel.items():
+            target.setdefault(channel_id, SampleStats()).merge(SampleStats.of(pairs))
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+
+def raw_rows_from_long(
+    long_df: "pd.DataFrame", channel_ids: dict[str, int], source_id: int | None
+) -> list[dict]:
+    """Build TimeSeriesRaw insert parameters from a long-format frame."""
+    timestamps = long_df["timestamp"].dt.to_pydatetime()
+    return [
+        {
+            "channel_id": channel_ids[parameter],
+            "timestamp": ts,
+            "value": float(value),
+            "source_id": source_id,
+        }
+        for ts, parameter, value in zip(timestamps, long_df["parameter"], long_df["value"])
+    ]
+
+
+def require_supported_dialect(dialect: str) -> None:
+    """Raise ValueError for databases other than PostgreSQL and SQLite."""
+    if dialect not in SUPPORTED_DIALECTS:
+        raise ValueError(
+            f"Database dialect '{dialect}' is not supported; use PostgreSQL or SQLite"
+        )
+
+
+def dialect_insert(session: AsyncSession, table):
+    """Return the dialect-specific INSERT construct that supports ON CONFLICT."""
+    dialect = session.bind.dialect.name
+    require_supported_dialect(dialect)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+async def resolve_channels(
+    session: AsyncSession,
+    site_id: int,
+    parameters: Iterable[str],
+    units: Mapping[str, str | None] | None = None,
+) -> dict[str, int]:
+    """Map parameter names to channel ids for a site, creating missing channels.
+
+    A unit given for a parameter is stored on its channel; None keeps the current unit.
+    """
+    wanted = set(parameters)
+    if not wanted:
+        return {}
+    units = units or {}
+    stmt = dialect_insert(session, Channel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["site_id", "parameter"],
+        set_={"unit": stmt.excluded.unit, "updated_at": func.now()},
+        where=stmt.excluded.unit.is_not(None) & Channel.unit.is_distinct_from(stmt.excluded.unit),
+    )
+    await session.execute(
+        stmt, [{"site_id": site_id, "parameter": p, "unit": units.get(p)} for p in wanted]
+    )
+    result = await session.execute(
+        select(Channel.parameter, Channel.id).where(
+            Channel.site_id == site_id, Channel.parameter.in_(wanted)
+        )
+    )
+    return dict(result.all())
+
+
+async def resolve_source(session: AsyncSession, name: str | None) -> int | None:
+    """Id of the data source with this name, creating it if needed."""
+    if not name:
+        return None
+    stmt = dialect_insert(session, DataSource).on_conflict_do_nothing(index_elements=["name"])
+    await session.execute(stmt, [{"name": name}])
+    result = await session.execute(select(DataSource.id).where(DataSource.name == name))
+    return result.scalar_one()
+
+
+def _dedupe(rows: list[dict]) -> list[dict]:
+    """Collapse repeated natural keys within one payload, keeping the last value."""
+    unique = {(r["channel_id"], r["timestamp"]): r for r in rows}
+    return list(unique.values())
+
+
+def _key(channel_id: int, ts: datetime) -> tuple[int, datetime]:
+    """Natural key with an aware UTC timestamp; SQLite reads timestamps back naive."""
+    ts = ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+    return channel_id, ts
+
+
+async def _stored_values(session: AsyncSession, rows: list[dict]) -> dict[tuple, float | None]:
+    """Current value of each of these rows' natural keys that is already stored."""
+    keys = [(r["channel_id"], r["timestamp"]) for r in rows]
+    query = select(TimeSeriesRaw.channel_id, TimeSeriesRaw.timestamp, TimeSeriesRaw.value).where(
+        tuple_(TimeSeriesRaw.channel_id, TimeSeriesRaw.timestamp).in_(keys)
+    )
+    return {_key(c, ts): value for c, ts, value in (await session.execute(query)).all()}
+
+
+async def upsert_raw_rows(
+    session: AsyncSession, rows: list[dict], on_conflict: ConflictMode = "skip"
+) -> UpsertCounts:
+    """Write rows keyed on (channel_id, timestamp); caller commits.
+
+    ``skip`` leaves existing samples untouched (ON CONFLICT DO NOTHING); ``update``
+    overwrites samples whose value changed and queues them as RawChange rows for
+    reprocessing. Rows that change nothing count as skipped. The returned
+    counts carry per-channel statistics of the values actually written and of
+    the values they overwrote, read back through RETURNING.
+    """
+    counts = UpsertCounts()
+    unique_rows = _dedupe(rows)
+    counts.skipped += len(rows) - len(unique_rows)
+
+    keys = (TimeSeriesRaw.channel_id, TimeSeriesRaw.timestamp)
+    for start in range(0, len(unique_rows), INSERT_CHUNK_SIZE):
+        chunk = unique_rows[start : start + INSERT_CHUNK_SIZE]
+        stmt = dialect_insert(session, TimeSeriesRaw)
+        if on_conflict == "update":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["channel_id", "timestamp"],
+                set_={
+                    "value": stmt.excluded.value,
+                    "source_id": stmt.excluded.source_id,
+                    "updated_at": func.now(),
+                },
+                where=TimeSeriesRaw.value.is_distinct_from(stmt.excluded.value),
+            )
+            # Values about to be overwritten leave the manifest statistics. Writers
+            # are serialized on SQLite, so nothing lands between this read and the write.
+            previous = await _stored_values(session, chunk)
+            if session.bind.dialect.name == "postgresql":
+                # xmax is 0 only on tuples this statement inserted.
+                returned = await session.execute(
+                    stmt.returning(*keys, literal_column("xmax = 0")), chunk
+                )
+                written_flags = {_key(c, ts): inserted for c, ts, inserted in returned.all()}
+                written = set(written_flags)
+                updated = {key for key, inserted in written_flags.items() if not inserted}
+            else:
+                # SQLite RETURNING cannot tell the two apart; the read above can.
+                returned = await session.execute(stmt.returning(*keys), chunk)
+                written = {_key(c, ts) for c, ts in returned.all()}
+                updated = written & previous.keys()
+            if updated:
+                # Updated samples keep their id, so the processing watermark cannot see them.
+                await session.execute(
+                    insert(RawChange), [{"channel_id": c, "timestamp": ts} for c, ts in updated]
+                )
+                counts.add(
+                    counts.replaced,
+                    ((c, ts, previous[(c, ts)]) for c, ts in updated if (c, ts) in previous),
+                )
+            counts.inserted += len(written) - len(updated)
+            counts.updated += len(updated)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["channel_id", "timestamp"])
+            returned = await session.execute(stmt.returning(*keys), chunk)
+            written = {_key(c, ts) for c, ts in returned.all()}
+            counts.inserted += len(written)
+        by_key = {_key(r["channel_id"], r["timestamp"]): r for r in chunk}
+        counts.add(counts.stored, ((c, ts, by_key[(c, ts)]["value"]) for c, ts in written))
+        counts.skipped += len(chunk) - len(written)
+    return counts
+
+
+async def upsert_processed_rows(session: AsyncSession, rows: list[dict]) -> int:
+    """Write derived rows keyed on (site_id, parameter, timestamp), replacing earlier output.
+
+    Rows without ``record_metadata`` clear any metadata left by an earlier write.
+    Returns the number of distinct rows written; caller commits.
+    """
+    unique_rows = list({(r["site_id"], r["parameter"], r["timestamp"]): r for r in rows}.values())
+    for start in range(0, len(unique_rows), INSERT_CHUNK_SIZE):
+        stmt = dialect_insert(session, TimeSeriesProcessed)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["site_id", "parameter", "timestamp"],
+            set_={
+                "value": stmt.excluded.value,
+                "unit": stmt.excluded.unit,
+                "qc_summary": stmt.excluded.qc_summary,
+                "source_raw_id": stmt.excluded.source_raw_id,
+                "record_metadata": stmt.excluded.record_metadata,
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt, unique_rows[start : start + INSERT_CHUNK_SIZE])
+    return len(unique_rows)
@@ -0,0 +1,238 @@
+"""In-process write buffer that micro-batches live telemetry into TimeSeriesRaw.
+
+Producers (HTTP batches, WebSocket messages) append readings; a single flusher
+drains them whenever ``batch_size`` readings are waiting or ``flush_interval_s``
+has passed, with one bulk upsert per site in its own transaction. When the
+database falls behind, pending plus in-flight readings reach ``max_pending``
+and producers wait (then get ``BufferFull``) instead of growing memory without
+bound. Written readings are folded into one ingestion manifest per site,
+device and day, so coverage includes telemetry without a row per flush.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from sqlalchemy import select
+from app.config import Settings
+from app.services.manifest import record_telemetry
+from app.services.storage import resolve_channels, resolve_source, upsert_raw_rows
+from db.models.core import Site
+from db.session import new_session
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Raised when readings cannot be accepted before the put timeout."""
+
+
+class TelemetryBuffer:
+    def __init__(
+        self,
+        batch_size: int = 5000,
+        flush_interval_s: float = 1.0,
+        max_pending: int = 100_000,
+        put_timeout_s: float = 5.0,
+        max_retries: int = 3,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self.put_timeout_s = put_timeout_s
+        self.max_retries = max_retries
+        self.known_sites: set[int] = set()
+        self.stats = {"accepted": 0, "flushed": 0, "inserted": 0, "dropped": 0, "failed_flushes": 0}
+        self._pending: list[dict] = []
+        self._in_flight = 0
+        self._failures = 0
+        self._cond = asyncio.Condition()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        # Id caches survive between flushes; only committed ids are ever stored.
+        self._channels: dict[tuple[int, str], int] = {}
+        self._sources: dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TelemetryBuffer":
+        return cls(
+            batch_size=settings.telemetry_batch_size,
+            flush_interval_s=settings.telemetry_flush_interval_s,
+            max_pending=settings.telemetry_max_pending,
+            put_timeout_s=settings.telemetry_put_timeout_s,
+        )
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending) + self._in_flight
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out whatever is still buffered.
+
+        Failing readings are retried up to ``max_retries`` times and then
+        dropped with a logged count, so stopping always drains the buffer.
+        """
+        if self._task is not None:
+            # Let an in-progress flush finish rather than cancelling it mid-write.
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        while self._pending:
+            await self.flush()
+
+    async def put(self, readings: list[dict]) -> int:
+        """Queue readings, waiting for room up to ``put_timeout_s``; returns the pending count."""
+        if not readings:
+            return self.pending
+        async with self._cond:
+            try:
+                # An oversized batch is still admitted once the buffer is empty.
+                await asyncio.wait_for(
+                    self._cond.wait_for(
+                        lambda: self.pending + len(readings) <= self.max_pending or self.pending == 0
+                    ),
+                    self.put_timeout_s,
+                )
+            except TimeoutError:
+                raise BufferFull(f"{self.pending} readings pending") from None
+            self._pending.extend(readings)
+            self.stats["accepted"] += len(readings)
+            if len(self._pending) >= self.batch_size and not self._failures:
+                self._wake.set()
+            return self.pending
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            delay = self.flush_interval_s * 2**self._failures if self._failures else self.flush_interval_s
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(30.0, delay))
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._stopping:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """Write one batch; returns how many readings left the buffer.
+
+        Each site is written in its own transaction, so one failing site
+        cannot hold back or drop other devices' readings. A site that no
+        longer exists has its readings dropped at once; other failures are
+        retried up to ``max_retries`` times.
+        """
+        async with self._flush_lock:
+            async with self._cond:
+                batch = self._pending[: self.batch_size]
+                del self._pending[: self.batch_size]
+                self._in_flight = len(batch)
+            if not batch:
+                return 0
+            by_site: dict[int, list[dict]] = defaultdict(list)
+            for r in batch:
+                by_site[r["site_id"]].append(r)
+
+            inserted = 0
+            failed: dict[int, list[dict]] = {}
+            for site_id, readings in by_site.items():
+                try:
+                    inserted += await self._write(site_id, readings)
+                except Exception:
+                    logger.exception(
+                        "Telemetry write of %d readings for site %d failed", len(readings), site_id
+                    )
+                    failed[site_id] = readings
+            self.stats["flushed"] += len(batch) - sum(len(r) for r in failed.values())
+            self.stats["inserted"] += inserted
+
+            retry: list[dict] = []
+            if failed:
+                self.stats["failed_flushes"] += 1
+                self._sources.clear()
+                self._channels = {k: v for k, v in self._channels.items() if k[0] not in failed}
+                deleted = await self._deleted_sites(set(failed))
+                for site_id in deleted:
+                    self.known_sites.discard(site_id)
+                    self.stats["dropped"] += len(failed[site_id])
+                    logger.warning(
+                        "Dropping %d telemetry readings for deleted site %d",
+                        len(failed[site_id]),
+                        site_id,
+                    )
+                retry = [r for site_id, rs in failed.items() if site_id not in deleted for r in rs]
+
+            async with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+                if not retry:
+                    self._failures = 0
+                    return len(batch)
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    self._pending[:0] = retry
+                    logger.warning("Retrying %d telemetry readings", len(retry))
+                    return len(batch) - len(retry)
+                self.stats["dropped"] += len(retry)
+                self._failures = 0
+            logger.error(
+                "Dropping %d telemetry readings after %d failed flushes", len(retry), self.max_retries
+            )
+            return len(batch)
+
+    async def _deleted_sites(self, site_ids: set[int]) -> set[int]:
+        """Which of ``site_ids`` no longer exist; none when that cannot be checked."""
+        try:
+            async with new_session() as session:
+                found = set(await session.scalars(select(Site.id).where(Site.id.in_(site_ids))))
+        except Exception:
+            logger.exception("Could not re-check telemetry sites %s", sorted(site_ids))
+            return set()
+        return site_ids - found
+
+    async def _write(self, site_id: int, readings: list[dict]) -> int:
+        """Write one site's readings and manifests in one transaction; returns rows inserted."""
+        async with new_session() as session:
+            channels = {
+                p: self._channels[(site_id, p)]
+                for p in {r["parameter"] for r in readings}
+                if (site_id, p) in self._channels
+            }
+            sources = dict(self._sources)
+            # Units are stored when a channel is first seen by this buffer.
+            units: dict[str, str | None] = {}
+            for r in readings:
+                if r["parameter"] not in channels:
+                    units[r["parameter"]] = units.get(r["parameter"]) or r.get("unit")
+            if units:
+                channels.update(await resolve_channels(session, site_id, units, units))
+            for name in {r["source"] for r in readings} - sources.keys():
+                sources[name] = await resolve_source(session, name)
+
+            by_source: dict[int | None, list[dict]] = defaultdict(list)
+            for r in readings:
+                by_source[sources[r["source"]]].append(r)
+            inserted = 0
+            for source_id, source_readings in by_source.items():
+                rows = [
+                    {
+                        "channel_id": channels[r["parameter"]],
+                        "timestamp": r["timestamp"],
+                        "value": r["value"],
+                        "source_id": source_id,
+                    }
+                    for r in source_readings
+                ]
+                counts = await upsert_raw_rows(session, rows, "skip")
+                await record_telemetry(session, site_id, source_id, counts, len(rows))
+                inserted += counts.inserted
+            await session.commit()
+        # Only ids from a committed transaction are cached.
+        self._channels.update({(site_id, p): channel_id for p, channel_id in channels.items()})
+        self._sources = sources
+        return inserted
@@ -0,0 +1,22 @@
+"""Shared process pool for CPU-bound parsing and analysis work."""
+
+from concurrent.futures import ProcessPoolExecutor
+from app.config import get_settings
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=get_settings().worker_processes)
+    return _pool
+
+
+def shutdown_worker_pool() -> None:
+    """Stop the shared pool; a new one is created on the next request."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,44 @@
+"""raw natural key
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the earliest copy of each duplicated sample before enforcing uniqueness.
+    op.execute(
+        sa.text(
+            "DELETE FROM time_series_raw WHERE id NOT IN ("
+            " SELECT keep_id FROM ("
+            "  SELECT MIN(id) AS keep_id FROM time_series_raw"
+            "  GROUP BY site_id, parameter, timestamp"
+            " ) AS survivors"
+            ")"
+        )
+    )
+    op.create_index(
+        'uq_raw_site_parameter_timestamp',
+        'time_series_raw',
+        ['site_id', 'parameter', 'timestamp'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_raw_site_parameter_timestamp', table_name='time_series_raw')
@@ -0,0 +1,112 @@
+"""channel and source dimension tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:20:07.402215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('channels',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('site_id', sa.Integer(), nullable=False),
+    sa.Column('parameter', sa.String(length=100), nullable=False),
+    sa.Column('unit', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['site_id'], ['sites.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('site_id', 'parameter', name='uq_channel_site_parameter')
+    )
+    op.create_table('data_sources',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+    # Populate the dimensions from the existing free-text columns, then point rows at them.
+    op.execute(
+        "INSERT INTO channels (site_id, parameter, unit) "
+        "SELECT site_id, parameter, MAX(unit) FROM time_series_raw GROUP BY site_id, parameter"
+    )
+    op.execute(
+        "INSERT INTO data_sources (name) "
+        "SELECT DISTINCT source FROM time_series_raw WHERE source IS NOT NULL"
+    )
+    with op.batch_alter_table('time_series_raw') as batch_op:
+        batch_op.add_column(sa.Column('channel_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('source_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE time_series_raw SET "
+        "channel_id = (SELECT c.id FROM channels c WHERE c.site_id = time_series_raw.site_id "
+        "AND c.parameter = time_series_raw.parameter), "
+        "source_id = (SELECT s.id FROM data_sources s WHERE s.name = time_series_raw.source)"
+    )
+
+    op.drop_index('uq_raw_site_parameter_timestamp', table_name='time_series_raw')
+    op.drop_index('ix_raw_site_timestamp', table_name='time_series_raw')
+    op.drop_index(op.f('ix_time_series_raw_timestamp'), table_name='time_series_raw')
+    with op.batch_alter_table('time_series_raw') as batch_op:
+        batch_op.alter_column('channel_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key(
+            'fk_raw_channel', 'channels', ['channel_id'], ['id'], ondelete='CASCADE'
+        )
+        batch_op.create_foreign_key(
+            'fk_raw_source', 'data_sources', ['source_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.drop_column('site_id')
+        batch_op.drop_column('parameter')
+        batch_op.drop_column('unit')
+        batch_op.drop_column('source')
+    op.create_index('uq_raw_channel_timestamp', 'time_series_raw', ['channel_id', 'timestamp'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_raw_channel_timestamp', table_name='time_series_raw')
+    with op.batch_alter_table('time_series_raw') as batch_op:
+        batch_op.add_column(sa.Column('site_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('parameter', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('unit', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('source', sa.String(length=100), nullable=True))
+    op.execute(
+        "UPDATE time_series_raw SET "
+        "site_id = (SELECT c.site_id FROM channels c WHERE c.id = time_series_raw.channel_id), "
+        "parameter = (SELECT c.parameter FROM channels c WHERE c.id = time_series_raw.channel_id), "
+        "unit = (SELECT c.unit FROM channels c WHERE c.id = time_series_raw.channel_id), "
+        "source = (SELECT s.name FROM data_sources s WHERE s.id = time_series_raw.source_id)"
+    )
+    with op.batch_alter_table('time_series_raw') as batch_op:
+        batch_op.drop_constraint('fk_raw_source', type_='foreignkey')
+        batch_op.drop_constraint('fk_raw_channel', type_='foreignkey')
+        batch_op.drop_column('source_id')
+        batch_op.drop_column('channel_id')
+        batch_op.alter_column('site_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('parameter', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_foreign_key('time_series_raw_site_id_fkey', 'sites', ['site_id'], ['id'], ondelete='CASCADE')
+    op.create_index(op.f('ix_time_series_raw_timestamp'), 'time_series_raw', ['timestamp'], unique=False)
+    op.create_index('ix_raw_site_timestamp', 'time_series_raw', ['site_id', 'timestamp'], unique=False)
+    op.create_index(
+        'uq_raw_site_parameter_timestamp',
+        'time_series_raw',
+        ['site_id', 'parameter', 'timestamp'],
+        unique=True,
+    )
+    op.drop_table('data_sources')
+    op.drop_table('channels')
@@ -0,0 +1,53 @@
+"""processing watermarks and processed natural key
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:41:55.630127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('processing_watermarks',
+    sa.Column('channel_id', sa.Integer(), nullable=False),
+    sa.Column('last_raw_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('channel_id')
+    )
+    # Keep the latest copy of each duplicated processed sample before enforcing uniqueness.
+    op.execute(
+        sa.text(
+            "DELETE FROM time_series_processed WHERE id NOT IN ("
+            " SELECT keep_id FROM ("
+            "  SELECT MAX(id) AS keep_id FROM time_series_processed"
+            "  GROUP BY site_id, parameter, timestamp"
+            " ) AS survivors"
+            ")"
+        )
+    )
+    op.create_index(
+        'uq_processed_site_parameter_timestamp',
+        'time_series_processed',
+        ['site_id', 'parameter', 'timestamp'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_processed_site_parameter_timestamp', table_name='time_series_processed')
+    op.drop_table('processing_watermarks')
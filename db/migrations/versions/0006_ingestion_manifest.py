@@ -0,0 +1,173 @@
+"""ingestion manifest
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:32:48.201954
+
+"""
+import logging
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingestion_manifests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('site_id', sa.Integer(), nullable=False),
+    sa.Column('source_id', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('on_conflict', sa.String(length=20), nullable=True),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('inserted', sa.Integer(), nullable=False),
+    sa.Column('updated', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('first_timestamp', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_timestamp', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['site_id'], ['sites.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['source_id'], ['data_sources.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ingestion_manifests_site_id'), 'ingestion_manifests', ['site_id'], unique=False)
+    op.create_table('ingestion_manifest_stats',
+    sa.Column('manifest_id', sa.Integer(), nullable=False),
+    sa.Column('channel_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('min', sa.Float(), nullable=True),
+    sa.Column('max', sa.Float(), nullable=True),
+    sa.Column('sum', sa.Float(), nullable=False),
+    sa.Column('m2', sa.Float(), nullable=False),
+    sa.Column('first_timestamp', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_timestamp', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['manifest_id'], ['ingestion_manifests.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('manifest_id', 'channel_id')
+    )
+
+    # Summarize samples ingested before the manifest existed as one 'backfill' entry per site.
+    op.execute(
+        "INSERT INTO ingestion_manifests "
+        "(site_id, kind, row_count, inserted, updated, skipped, first_timestamp, last_timestamp) "
+        "SELECT c.site_id, 'backfill', COUNT(*), COUNT(*), 0, 0, MIN(r.timestamp), MAX(r.timestamp) "
+        "FROM time_series_raw r JOIN channels c ON c.id = r.channel_id GROUP BY c.site_id"
+    )
+    op.execute(
+        "INSERT INTO ingestion_manifest_stats "
+        "(manifest_id, channel_id, count, min, max, sum, m2, first_timestamp, last_timestamp) "
+        "SELECT m.id, c.id, COUNT(r.value), MIN(r.value), MAX(r.value), "
+        "COALESCE(SUM(r.value), 0), COALESCE(SUM((r.value - a.mean) * (r.value - a.mean)), 0), "
+        "MIN(r.timestamp), MAX(r.timestamp) "
+        "FROM time_series_raw r "
+        "JOIN channels c ON c.id = r.channel_id "
+        "JOIN (SELECT channel_id, AVG(value) AS mean FROM time_series_raw GROUP BY channel_id) a "
+        "ON a.channel_id = r.channel_id "
+        "JOIN ingestion_manifests m ON m.site_id = c.site_id AND m.kind = 'backfill' "
+        "GROUP BY m.id, c.id"
+    )
+    _backfill_archive(op.get_bind())
+
+
+def _backfill_archive(conn) -> None:
+    """One 'backfill' manifest per archived Parquet month, read from the files themselves."""
+    partitions = conn.execute(
+        sa.text("SELECT site_id, path, row_count FROM archive_partitions ORDER BY site_id, month")
+    ).all()
+    if not partitions:
+        return
+
+    import pandas as pd
+    import pyarrow.parquet as pq
+    from app.config import get_settings
+
+    root = Path(get_settings().archive_dir)
+    manifests = sa.table(
+        'ingestion_manifests',
+        *(sa.column(name) for name in (
+            'id', 'site_id', 'kind', 'row_count', 'inserted', 'updated', 'skipped',
+        )),
+        sa.column('first_timestamp', sa.DateTime(timezone=True)),
+        sa.column('last_timestamp', sa.DateTime(timezone=True)),
+    )
+    stats = sa.table(
+        'ingestion_manifest_stats',
+        *(sa.column(name) for name in (
+            'manifest_id', 'channel_id', 'count', 'min', 'max', 'sum', 'm2',
+        )),
+        sa.column('first_timestamp', sa.DateTime(timezone=True)),
+        sa.column('last_timestamp', sa.DateTime(timezone=True)),
+    )
+    for site_id, path, row_count in partitions:
+        file = root / path
+        if not file.exists():
+            logger.warning("Archive file %s is missing; its samples are not in the manifest", file)
+            continue
+        frame = pq.read_table(file, columns=["parameter", "timestamp", "value"]).to_pandas()
+        channels = dict(
+            conn.execute(
+                sa.text("SELECT parameter, id FROM channels WHERE site_id = :site_id"),
+                {"site_id": site_id},
+            ).all()
+        )
+        mean = frame.groupby("parameter")["value"].transform("mean")
+        grouped = frame.assign(dev_sq=(frame["value"] - mean) ** 2).groupby("parameter")
+        summary = grouped.agg(
+            count=("value", "count"),
+            min=("value", "min"),
+            max=("value", "max"),
+            sum=("value", "sum"),
+            m2=("dev_sq", "sum"),
+            first_timestamp=("timestamp", "min"),
+            last_timestamp=("timestamp", "max"),
+        )
+        manifest_id = conn.execute(
+            manifests.insert()
+            .values(
+                site_id=site_id,
+                kind='backfill',
+                row_count=row_count,
+                inserted=row_count,
+                updated=0,
+                skipped=0,
+                first_timestamp=frame["timestamp"].min().to_pydatetime(),
+                last_timestamp=frame["timestamp"].max().to_pydatetime(),
+            )
+            .returning(manifests.c.id)
+        ).scalar_one()
+        rows = [
+            {
+                "manifest_id": manifest_id,
+                "channel_id": channels[parameter],
+                "count": int(row["count"]),
+                "min": None if pd.isna(row["min"]) else float(row["min"]),
+                "max": None if pd.isna(row["max"]) else float(row["max"]),
+                "sum": float(row["sum"]),
+                "m2": float(row["m2"]),
+                "first_timestamp": row["first_timestamp"].to_pydatetime(),
+                "last_timestamp": row["last_timestamp"].to_pydatetime(),
+            }
+            for parameter, row in summary.iterrows()
+            if parameter in channels
+        ]
+        if rows:
+            conn.execute(stats.insert(), rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ingestion_manifest_stats')
+    op.drop_index(op.f('ix_ingestion_manifests_site_id'), table_name='ingestion_manifests')
+    op.drop_table('ingestion_manifests')
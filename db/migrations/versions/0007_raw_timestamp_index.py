@@ -0,0 +1,28 @@
+"""raw timestamp index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 17:04:12.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_time_series_raw_timestamp'), 'time_series_raw', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_time_series_raw_timestamp'), table_name='time_series_raw')
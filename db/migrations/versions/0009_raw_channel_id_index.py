@@ -0,0 +1,28 @@
+"""raw channel id index
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 19:12:40.731529
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_raw_channel_id', 'time_series_raw', ['channel_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_raw_channel_id', table_name='time_series_raw')
@@ -0,0 +1,34 @@
+"""manifest replaced stats
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 20:41:07.304518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ingestion_manifest_stats') as batch_op:
+        batch_op.add_column(sa.Column('replaced_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('replaced_sum', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('replaced_m2', sa.Float(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ingestion_manifest_stats') as batch_op:
+        batch_op.drop_column('replaced_m2')
+        batch_op.drop_column('replaced_sum')
+        batch_op.drop_column('replaced_count')
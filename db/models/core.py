@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, Text, Float, Index
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, Text, Float, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from db.session import Base
@@ -39,31 +39,64 @@ class Site(Base, TimestampMixin):
     pipe_diameter_mm: Mapped[float | None] = mapped_column(Float)
 
     project: Mapped[Project] = relationship(back_populates="sites")
-    raw_series: Mapped[list["TimeSeriesRaw"]] = relationship(back_populates="site", cascade="all, delete")
+    channels: Mapped[list["Channel"]] = relationship(back_populates="site", cascade="all, delete")
     processed_series: Mapped[list["TimeSeriesProcessed"]] = relationship(back_populates="site", cascade="all, delete")
     rating_curves: Mapped[list["RatingCurve"]] = relationship(back_populates="site", cascade="all, delete")
 
 
-class TimeSeriesRaw(Base, TimestampMixin):
-    __tablename__ = "time_series_raw"
-    __table_args__ = (Index("ix_raw_site_timestamp", "site_id", "timestamp"),)
+class Channel(Base, TimestampMixin):
+    """One measured quantity at a site; raw samples reference it by integer id."""
+
+    __tablename__ = "channels"
+    __table_args__ = (UniqueConstraint("site_id", "parameter", name="uq_channel_site_parameter"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     site_id: Mapped[int] = mapped_column(ForeignKey("sites.id", ondelete="CASCADE"))
     parameter: Mapped[str] = mapped_column(String(100), nullable=False)
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
-    value: Mapped[float | None] = mapped_column(Float)
     unit: Mapped[str | None] = mapped_column(String(50))
-    source: Mapped[str | None] = mapped_column(String(100))
+
+    site: Mapped[Site] = relationship(back_populates="channels")
+    samples: Mapped[list["TimeSeriesRaw"]] = relationship(back_populates="channel", cascade="all, delete")
+
+
+class DataSource(Base, TimestampMixin):
+    """Distinct ingestion origin (uploaded filename, telemetry device)."""
+
+    __tablename__ = "data_sources"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+
+
+class TimeSeriesRaw(Base, TimestampMixin):
+    __tablename__ = "time_series_raw"
+    __table_args__ = (
+        # Natural key: re-ingesting an overlapping window must not duplicate samples.
+        Index("uq_raw_channel_timestamp", "channel_id", "timestamp", unique=True),
+        # Incremental processing seeks each channel's ids above its watermark.
+        Index("ix_raw_channel_id", "channel_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel_id: Mapped[int] = mapped_column(ForeignKey("channels.id", ondelete="CASCADE"), nullable=False)
+    # Cross-channel time scans (archive cutoffs, retention) do not lead with channel_id.
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    value: Mapped[float | None] = mapped_column(Float)
+    source_id: Mapped[int | None] = mapped_column(ForeignKey("data_sources.id", ondelete="SET NULL"))
     qc_flag: Mapped[str | None] = mapped_column(String(50))
     record_metadata: Mapped[dict | None] = mapped_column(JSON)
 
-    site: Mapped[Site] = relationship(back_populates="raw_series")
+    channel: Mapped[Channel] = relationship(back_populates="samples")
+    source: Mapped[DataSource | None] = relationship()
 
 
 class TimeSeriesProcessed(Base, TimestampMixin):
     __tablename__ = "time_series_processed"
-    __table_args__ = (Index("ix_processed_site_timestamp", "site_id", "timestamp"),)
+    __table_args__ = (
+        Index("ix_processed_site_timestamp", "site_id", "timestamp"),
+        # Reprocessing a window replaces its earlier output instead of appending.
+        Index("uq_processed_site_parameter_timestamp", "site_id", "parameter", "timestamp", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     site_id: Mapped[int] = mapped_column(ForeignKey("sites.id", ondelete="CASCADE"))
@@ -79,6 +112,99 @@ class TimeSeriesProcessed(Base, TimestampMixin):
     source_raw: Mapped[TimeSeriesRaw | None] = relationship(foreign_keys=[source_raw_id])
 
 
+class IngestionManifest(Base, TimestampMixin):
+    """One ingested file, or one day of a device's telemetry for a site: its site
+    and source, what it covered and what it wrote."""
+
+    __tablename__ = "ingestion_manifests"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    site_id: Mapped[int] = mapped_column(ForeignKey("sites.id", ondelete="CASCADE"), index=True)
+    source_id: Mapped[int | None] = mapped_column(ForeignKey("data_sources.id", ondelete="SET NULL"))
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    on_conflict: Mapped[str | None] = mapped_column(String(20))
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    inserted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_timestamp: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_timestamp: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    stats: Mapped[list["ManifestChannelStats"]] = relationship(
+        back_populates="manifest", cascade="all, delete"
+    )
+    source: Mapped[DataSource | None] = relationship()
+
+
+class ManifestChannelStats(Base):
+    """Per-channel statistics of the samples one ingestion stored.
+
+    ``m2`` is the sum of squared deviations from these samples' own mean, so
+    variances combine across uploads without cancellation. The ``replaced_*``
+    columns describe earlier values this ingestion overwrote, which coverage
+    subtracts again.
+    """
+
+    __tablename__ = "ingestion_manifest_stats"
+
+    manifest_id: Mapped[int] = mapped_column(
+        ForeignKey("ingestion_manifests.id", ondelete="CASCADE"), primary_key=True
+    )
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True
+    )
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+    min: Mapped[float | None] = mapped_column(Float)
+    max: Mapped[float | None] = mapped_column(Float)
+    sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    m2: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    first_timestamp: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_timestamp: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    replaced_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    replaced_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    replaced_m2: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+
+    manifest: Mapped[IngestionManifest] = relationship(back_populates="stats")
+
+
+class ProcessingWatermark(Base, TimestampMixin):
+    """Highest raw sample id per channel already carried into TimeSeriesProcessed."""
+
+    __tablename__ = "processing_watermarks"
+
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True
+    )
+    last_raw_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class RawChange(Base):
+    """A raw sample overwritten in place (same id); queued until processing picks it up."""
+
+    __tablename__ = "raw_changes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ArchivePartition(Base, TimestampMixin):
+    """One Parquet file holding a site's archived raw samples for a calendar month."""
+
+    __tablename__ = "archive_partitions"
+    __table_args__ = (UniqueConstraint("site_id", "month", name="uq_archive_site_month"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    site_id: Mapped[int] = mapped_column(ForeignKey("sites.id", ondelete="CASCADE"))
+    month: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    path: Mapped[str] = mapped_column(String(500), nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    first_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
 class RatingCurve(Base, TimestampMixin):
     __tablename__ = "rating_curves"
 
@@ -1,5 +1,5 @@
 from collections.abc import AsyncIterator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import MetaData
 from app.config import get_settings
@@ -9,11 +9,42 @@ class Base(DeclarativeBase):
     metadata = MetaData()
 
 
-settings = get_settings()
-engine = create_async_engine(settings.database_url, echo=settings.debug)
-SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+# Created on first use (or by the app lifespan) so importing models and routers
+# never opens a pool, and tests can point each run at their own database.
+_engine: AsyncEngine | None = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def init_engine(database_url: str | None = None, **engine_kwargs) -> AsyncEngine:
+    """Create the engine and session factory, replacing any existing ones (not disposed)."""
+    global _engine, _sessionmaker
+    settings = get_settings()
+    _engine = create_async_engine(
+        database_url or settings.database_url, echo=settings.debug, **engine_kwargs
+    )
+    _sessionmaker = async_sessionmaker(bind=_engine, expire_on_commit=False, class_=AsyncSession)
+    return _engine
+
+
+def get_engine() -> AsyncEngine:
+    return _engine if _engine is not None else init_engine()
+
+
+async def dispose_engine() -> None:
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
+
+
+def new_session() -> AsyncSession:
+    """Session outside request scope (background jobs, streaming bodies)."""
+    if _sessionmaker is None:
+        init_engine()
+    return _sessionmaker()
 
 
 async def get_session() -> AsyncIterator[AsyncSession]:
-    async with SessionLocal() as session:
+    async with new_session() as session:
         yield session
@@ -0,0 +1,23 @@
+"""Move raw samples older than the configured age into the Parquet archive for every site."""
+
+import argparse
+import asyncio
+from sqlalchemy import select
+from app.services.archive import archive_sites
+from db.models.core import Site
+from db.session import dispose_engine, new_session
+
+
+async def main(older_than_days: int | None) -> None:
+    async with new_session() as session:
+        site_ids = list(await session.scalars(select(Site.id).order_by(Site.id)))
+    for result in await archive_sites(site_ids, older_than_days):
+        if result.months:
+            print(f"site {result.site_id}: {result.rows_archived} rows in {', '.join(result.months)}")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--older-than-days", type=int, help="override APP_ARCHIVE_AFTER_DAYS")
+    asyncio.run(main(parser.parse_args().older_than_days))
@@ -0,0 +1,22 @@
+"""Bring processed series up to date for every site (e.g. from a nightly cron)."""
+
+import argparse
+import asyncio
+from sqlalchemy import select
+from app.services.processing import process_sites
+from db.models.core import Site
+from db.session import dispose_engine, new_session
+
+
+async def main(full: bool) -> None:
+    async with new_session() as session:
+        site_ids = list(await session.scalars(select(Site.id).order_by(Site.id)))
+    for result in await process_sites(site_ids, full=full):
+        print(f"site {result.site_id}: {result.spans} span(s), {result.written}")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--full", action="store_true", help="ignore watermarks and reprocess everything")
+    asyncio.run(main(parser.parse_args().full))
@@ -1,12 +1,14 @@
 """Placeholder script for seeding demo data."""
 
 import asyncio
-from db.session import engine, Base
+from db.session import Base, dispose_engine, get_engine
+from db.models import core  # noqa: F401  # ensures models are imported
 
 
 async def main() -> None:
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await dispose_engine()
     print("Initialized database with metadata (demo).")
 
 
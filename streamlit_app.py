@@ -10,6 +10,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+import time
 import requests
 
 # Configuration - API URL with fallback for demo mode
@@ -21,6 +22,9 @@ except:
 # Demo mode flag
 DEMO_MODE = API_URL is None
 
+# Give up waiting on a report job after this many seconds
+REPORT_TIMEOUT_S = 300
+
 st.set_page_config(page_title="Sewer Flow Modelling", layout="wide")
 
 # Add demo mode banner
@@ -278,6 +282,26 @@ elif page == "Data Cleaning":
         
         if st.button("Fit Curve", type="primary"):
             st.success("✅ Rating curve fitted: y = 2.34x^0.67 (R² = 0.95)")
+        
+        st.subheader("Gap Filling")
+        st.markdown("Fill gaps and flagged points: linear for short gaps, rating curve or dry-weather profile for longer ones.")
+        repair_site_id = st.number_input("Site ID", min_value=1, value=1, step=1, key="repair_site_id")
+        
+        if st.button("Repair Data", type="primary"):
+            if DEMO_MODE:
+                st.success("✅ Repaired 42 points (linear: 30, dwf: 12)")
+            else:
+                try:
+                    response = requests.post(f"{API_URL}/data/repair/{int(repair_site_id)}", timeout=120)
+                    if response.status_code == 200:
+                        summary = response.json()
+                        for param, counts in summary["repaired"].items():
+                            detail = ", ".join(f"{method}: {n}" for method, n in counts.items()) or "nothing to fill"
+                            st.write(f"**{param}** — {detail}; {summary['unfilled'][param]} left unfilled")
+                    else:
+                        st.error(f"API Error: {response.text}")
+                except Exception as e:
+                    st.error(f"Connection error: {e}")
 
 # Hydraulics Page
 elif page == "Hydraulics":
@@ -339,25 +363,94 @@ elif page == "Reports":
     )
     
     output_format = st.radio("Output Format", ["PDF", "Word Document", "Excel"])
+    report_site_id = st.number_input("Site ID", min_value=1, value=1, step=1)
     
     if st.button("Generate Report", type="primary"):
-        st.success(f"✅ {report_type} generated successfully!")
-        st.download_button(
-            label=f"Download {report_type}",
-            data=b"Sample report content",
-            file_name=f"report_{datetime.now().strftime('%Y%m%d')}.pdf",
-            mime="application/pdf"
-        )
+        if DEMO_MODE:
+            st.success(f"✅ {report_type} generated successfully!")
+            st.download_button(
+                label=f"Download {report_type}",
+                data=b"Sample report content",
+                file_name=f"report_{datetime.now().strftime('%Y%m%d')}.pdf",
+                mime="application/pdf"
+            )
+        elif report_type == "Project Summary Report" or output_format == "Word Document":
+            st.error("Project summaries and Word output are not available yet; choose a site report as PDF or Excel.")
+        else:
+            kind = {"Site Summary Report": "site", "QC Report": "qc", "Hydraulic Analysis Report": "hydraulics"}[report_type]
+            fmt = "xlsx" if output_format == "Excel" else "pdf"
+            try:
+                response = requests.post(
+                    f"{API_URL}/reports/sites/{int(report_site_id)}",
+                    params={"kind": kind, "format": fmt},
+                    timeout=5,
+                )
+                if response.status_code != 202:
+                    st.error(f"API Error: {response.text}")
+                else:
+                    job = response.json()
+                    deadline = time.monotonic() + REPORT_TIMEOUT_S
+                    with st.spinner("Computing report stages..."):
+                        while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+                            time.sleep(1)
+                            status = requests.get(f"{API_URL}/reports/jobs/{job['id']}", timeout=5)
+                            if status.status_code != 200:
+                                job = {**job, "status": "failed", "error": status.json().get("detail")}
+                                break
+                            job = status.json()
+                    if job["status"] in ("queued", "running"):
+                        st.warning(f"Report {job['id']} is still running; check again later.")
+                    elif job["status"] == "done":
+                        report = requests.get(f"{API_URL}/reports/jobs/{job['id']}/download", timeout=60)
+                        reused = sum(1 for status in job["stages"].values() if status == "cached")
+                        st.success(f"✅ {report_type} generated ({reused} cached stages reused)")
+                        st.download_button(
+                            label=f"Download {report_type}",
+                            data=report.content,
+                            file_name=f"report_{datetime.now().strftime('%Y%m%d')}.{fmt}",
+                            mime=report.headers.get("content-type", "application/octet-stream"),
+                        )
+                    else:
+                        st.error(f"Report failed: {job['error']}")
+            except Exception as e:
+                st.error(f"Connection error: {e}")
     
     st.subheader("Export Data")
     
     export_type = st.selectbox(
         "Export Type",
-        ["Cleaned Time Series (CSV)", "Hydrograph (Excel)", "SWMM Input File", "All Data (ZIP)"]
+        ["Cleaned Time Series (CSV)", "SWMM Input File", "All Data (ZIP)"]
     )
+    st.caption("For a hydrograph workbook, generate a Hydraulic Analysis Report as Excel.")
+    if export_type == "All Data (ZIP)":
+        export_id = st.number_input("Project ID", min_value=1, value=1, step=1, key="export_project_id")
+        export_path = f"/exports/projects/{int(export_id)}/zip"
+    else:
+        export_id = st.number_input("Site ID", min_value=1, value=1, step=1, key="export_site_id")
+        suffix = "csv" if export_type == "Cleaned Time Series (CSV)" else "swmm"
+        export_path = f"/exports/sites/{int(export_id)}/{suffix}"
     
     if st.button("Export", type="primary"):
-        st.success(f"✅ {export_type} ready for download!")
+        if DEMO_MODE:
+            st.info("Exports need the API; add API_URL to Streamlit secrets.")
+        else:
+            try:
+                with st.spinner("Preparing export..."):
+                    response = requests.get(f"{API_URL}{export_path}", timeout=REPORT_TIMEOUT_S)
+                if response.status_code != 200:
+                    st.error(f"API Error: {response.text}")
+                else:
+                    disposition = response.headers.get("content-disposition", "")
+                    file_name = disposition.split("filename=")[-1].strip('"') or export_path.rsplit("/", 1)[-1]
+                    st.success(f"✅ {export_type} ready for download!")
+                    st.download_button(
+                        label=f"Download {file_name}",
+                        data=response.content,
+                        file_name=file_name,
+                        mime=response.headers.get("content-type", "application/octet-stream"),
+                    )
+            except Exception as e:
+                st.error(f"Connection error: {e}")
 
 # Footer
 st.sidebar.markdown("---")
@@ -0,0 +1,44 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Keep file outputs out of the working tree; settings are read on first use.
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="sewer-tests-"))
+os.environ.setdefault("APP_DEBUG", "false")
+os.environ.setdefault("APP_REPORT_DIR", str(_TMP_DIR / "reports"))
+os.environ.setdefault("APP_ARCHIVE_DIR", str(_TMP_DIR / "archive"))
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+
+@pytest.fixture
+async def client(tmp_path):
+    from app.main import app
+    from db.session import Base, dispose_engine, init_engine
+    from db.models import core  # noqa: F401  # ensures models are imported
+
+    # A fresh database per test; ASGITransport does not run the app lifespan.
+    engine = init_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+    # A buffer started on demand is bound to this test's event loop.
+    buffer = getattr(app.state, "telemetry", None)
+    if buffer is not None:
+        await buffer.stop()
+        del app.state.telemetry
+    await dispose_engine()
+
+
+@pytest.fixture
+async def site_id(client) -> int:
+    response = await client.post("/projects/", json={"name": "Test Project"})
+    project_id = response.json()["id"]
+    response = await client.post(
+        f"/projects/{project_id}/sites",
+        json={"project_id": project_id, "name": "Site A", "pipe_diameter_mm": 300},
+    )
+    return response.json()["id"]
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from app.config import get_settings
+from app.services.alignment import align_matrix, build_wide_matrix, grid_size, regular_grid
+
+MINUTE = 60 * 1_000_000_000
+
+
+def test_build_and_align_matrix():
+    timestamps = np.array([0, 10, 5, 20]) * MINUTE
+    grid, matrix = build_wide_matrix(timestamps, np.array([0, 0, 1, 1]), np.array([1.0, 2.0, 5.0, 7.0]), 2)
+    assert grid.tolist() == [0, 5 * MINUTE, 10 * MINUTE, 20 * MINUTE]
+    assert np.isnan(matrix[0, 1]) and matrix[1, 1] == 5.0
+
+    target = np.array([0, 10, 20]) * MINUTE
+    interp = align_matrix(grid, matrix, target, "interpolate", 5 * MINUTE)
+    assert interp[:, 0].tolist()[:2] == [1.0, 2.0]
+    assert np.isnan(interp[2, 0])  # no depth sample within tolerance of t=20
+    assert interp[1, 1] == pytest.approx(5.0 + 2.0 / 3.0)
+
+
+async def test_project_query_returns_wide_frame(client, site_id):
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    other = await client.post(
+        f"/projects/{project_id}/sites", json={"project_id": project_id, "name": "Site B"}
+    )
+    other_id = other.json()["id"]
+    await client.post(
+        f"/data/upload/{site_id}",
+        files={"file": ("a.csv", "timestamp,depth\n2024-01-01T00:00:00Z,1\n2024-01-01T00:15:00Z,2\n")},
+    )
+    await client.post(
+        f"/data/upload/{other_id}",
+        files={"file": ("b.csv", "timestamp,depth\n2024-01-01T00:14:00Z,9\n")},
+    )
+    series = [{"site_id": site_id, "parameter": "depth"}, {"site_id": other_id, "parameter": "depth"}]
+
+    raw = (await client.post(f"/projects/{project_id}/timeseries/query", json={"series": series})).json()
+    assert len(raw["timestamps"]) == 3
+    assert raw["values"][1] == [None, 9.0]
+
+    aligned = await client.post(
+        f"/projects/{project_id}/timeseries/query",
+        json={"series": series, "align": "nearest", "freq": "15min", "tolerance": "2min"},
+    )
+    body = aligned.json()
+    assert body["timestamps"] == ["2024-01-01T00:00:00Z", "2024-01-01T00:15:00Z"]
+    assert body["values"] == [[1.0, None], [2.0, 9.0]]
+
+
+def test_regular_grid_is_end_exclusive():
+    grid = regular_grid(1 * MINUTE, 30 * MINUTE, 15 * MINUTE)
+    assert grid.tolist() == [15 * MINUTE]
+    assert grid_size(1 * MINUTE, 30 * MINUTE, 15 * MINUTE) == 1
+    assert grid_size(0, 30 * MINUTE + 1, 15 * MINUTE) == 3
+
+
+async def test_project_query_limits_grid_and_excludes_end(client, site_id):
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    await client.post(
+        f"/data/upload/{site_id}",
+        files={"file": ("a.csv", "timestamp,depth\n2024-01-01T00:00:00Z,1\n2024-01-01T00:15:00Z,2\n")},
+    )
+    series = [{"site_id": site_id, "parameter": "depth"}]
+    window = {"series": series, "start": "2024-01-01T00:00:00Z", "end": "2024-01-01T00:15:00Z"}
+
+    raw = (await client.post(f"/projects/{project_id}/timeseries/query", json=window)).json()
+    assert raw["values"] == [[1.0]]
+    aligned = await client.post(
+        f"/projects/{project_id}/timeseries/query", json={**window, "align": "nearest"}
+    )
+    assert aligned.json()["timestamps"] == ["2024-01-01T00:00:00Z"]
+
+    too_wide = {**window, "end": "2030-01-01T00:00:00Z", "align": "nearest", "freq": "1s"}
+    response = await client.post(f"/projects/{project_id}/timeseries/query", json=too_wide)
+    assert response.status_code == 422
+
+
+async def test_project_query_caps_unaligned_rows(client, site_id, monkeypatch):
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    await client.post(
+        f"/data/upload/{site_id}",
+        files={"file": ("a.csv", "timestamp,depth\n2024-01-01T00:00:00Z,1\n2024-01-01T00:15:00Z,2\n")},
+    )
+    monkeypatch.setattr(get_settings(), "aligned_max_points", 1)
+    response = await client.post(
+        f"/projects/{project_id}/timeseries/query",
+        json={"series": [{"site_id": site_id, "parameter": "depth"}], "align": "none"},
+    )
+    assert response.status_code == 422
+
+
+async def test_project_query_rejects_foreign_site(client, site_id):
+    response = await client.post(
+        "/projects/999/timeseries/query", json={"series": [{"site_id": site_id, "parameter": "depth"}]}
+    )
+    assert response.status_code == 404
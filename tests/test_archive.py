@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import func, select
+
+from app.config import get_settings
+from app.services.archive import read_partitions
+from db.models.core import ArchivePartition, TimeSeriesRaw
+from db.session import new_session
+
+RECENT = (datetime.now(timezone.utc) - timedelta(days=1)).replace(microsecond=0)
+
+
+def _csv(points: list[tuple[str, float, float]]) -> str:
+    return "timestamp,depth,velocity\n" + "".join(f"{ts},{d},{v}\n" for ts, d, v in points)
+
+
+async def _upload(client, site_id, points):
+    response = await client.post(
+        f"/data/upload/{site_id}", files={"file": ("logger.csv", _csv(points), "text/csv")}
+    )
+    assert response.status_code == 200
+
+
+async def _raw_count() -> int:
+    async with new_session() as session:
+        return await session.scalar(select(func.count()).select_from(TimeSeriesRaw))
+
+
+async def test_archive_and_federated_reads(client, site_id):
+    await _upload(
+        client,
+        site_id,
+        [
+            ("2020-01-01T00:00:00Z", 10, 0.1),
+            ("2020-01-01T00:10:00Z", 20, 0.2),
+            ("2020-02-03T00:00:00Z", 30, 0.3),
+            (RECENT.isoformat(), 40, 0.4),
+        ],
+    )
+    response = await client.post(f"/data/archive/{site_id}", params={"older_than_days": 30})
+    assert response.status_code == 200
+    assert response.json() == {"site_id": site_id, "months": ["2020-01", "2020-02"], "rows_archived": 6}
+    assert await _raw_count() == 2
+
+    series = (await client.get(f"/data/timeseries/{site_id}", params={"parameter": "depth"})).json()
+    assert [p["value"] for p in series] == [10, 20, 30, 40]
+    assert series[0] == {
+        "timestamp": "2020-01-01T00:00:00+00:00",
+        "parameter": "depth",
+        "value": 10.0,
+        "unit": None,
+        "qc_flag": None,
+    }
+    window = await client.get(
+        f"/data/timeseries/{site_id}",
+        params={"start": "2020-01-01T00:05:00Z", "end": "2020-03-01T00:00:00Z"},
+    )
+    assert len(window.json()) == 4
+
+    resampled = await client.get(
+        f"/data/timeseries/{site_id}/resample",
+        params=[("interval", "1d"), ("agg", "mean"), ("agg", "count"), ("parameter", "depth")],
+    )
+    rows = resampled.json()
+    assert [(r["mean"], r["count"]) for r in rows] == [(15.0, 2), (30.0, 1), (40.0, 1)]
+    assert rows[0]["timestamp"] == "2020-01-01T00:00:00+00:00"
+
+    # Late data for an archived month is merged into the existing file.
+    await _upload(client, site_id, [("2020-01-15T00:00:00Z", 50, 0.5)])
+    response = await client.post(f"/data/archive/{site_id}", params={"older_than_days": 30})
+    assert response.json()["months"] == ["2020-01"]
+    async with new_session() as session:
+        partition = await session.scalar(
+            select(ArchivePartition).where(ArchivePartition.path.endswith("2020-01.parquet"))
+        )
+    assert partition.row_count == 6
+    series = (await client.get(f"/data/timeseries/{site_id}", params={"parameter": "depth"})).json()
+    assert [p["value"] for p in series] == [10, 20, 50, 30, 40]
+
+
+async def test_archived_files_prune_by_parameter_and_time(client, site_id):
+    await _upload(
+        client,
+        site_id,
+        [(f"2020-01-01T{h:02d}:00:00Z", h, h / 10) for h in range(24)],
+    )
+    await client.post(f"/data/archive/{site_id}", params={"older_than_days": 30})
+    path = Path(get_settings().archive_dir) / f"site_{site_id}" / "2020-01.parquet"
+
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_rows == 48
+    # Sorted by parameter, so row-group statistics can exclude a parameter outright.
+    assert pq.ParquetFile(path).schema_arrow.names[:3] == ["id", "parameter", "timestamp"]
+
+    table = read_partitions(
+        [path],
+        parameter="velocity",
+        start=datetime(2020, 1, 1, 6, tzinfo=timezone.utc),
+        end=datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+        columns=["timestamp", "value"],
+    )
+    assert table.column_names == ["timestamp", "value"]
+    assert table.column("value").to_pylist() == pytest.approx([0.6, 0.7, 0.8])
+
+
+async def test_cold_resample_windows_do_not_split_buckets(client, site_id, monkeypatch):
+    from app.services import archive
+
+    await _upload(client, site_id, [(f"2020-01-01T{h:02d}:00:00Z", h, 0.0) for h in range(24)])
+    await client.post(f"/data/archive/{site_id}", params={"older_than_days": 30})
+    # Late data stays in the database but falls inside the archived range.
+    await _upload(client, site_id, [("2020-01-01T05:30:00Z", 100, 0.0)])
+
+    params = [
+        ("interval", "3h"),
+        ("agg", "sum"),
+        ("agg", "count"),
+        ("parameter", "depth"),
+        ("start", "2020-01-01T01:00:00Z"),
+    ]
+    whole = (await client.get(f"/data/timeseries/{site_id}/resample", params=params)).json()
+    monkeypatch.setattr(archive, "RESAMPLE_WINDOW", timedelta(hours=4))
+    windowed = (await client.get(f"/data/timeseries/{site_id}/resample", params=params)).json()
+    assert windowed == whole
+    assert [(r["sum"], r["count"]) for r in whole[:3]] == [(3.0, 2), (112.0, 4), (21.0, 3)]
+
+
+async def test_archived_samples_reach_aligned_queries_and_reports(client, site_id):
+    from app.services.reports import load_series, parameter_versions
+
+    await _upload(client, site_id, [("2020-01-01T00:00:00Z", 10, 0.1), (RECENT.isoformat(), 40, 0.4)])
+    async with new_session() as session:
+        before = await parameter_versions(session, site_id)
+    await client.post(f"/data/archive/{site_id}", params={"older_than_days": 30})
+
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    frame = await client.post(
+        f"/projects/{project_id}/timeseries/query",
+        json={"series": [{"site_id": site_id, "parameter": "depth"}]},
+    )
+    assert frame.json()["values"] == [[10.0], [40.0]]
+
+    async with new_session() as session:
+        block = await load_series(session, site_id, "depth")
+        after = await parameter_versions(session, site_id)
+    assert block.values.tolist() == [10.0, 40.0]
+    assert after["depth"] != before["depth"]
+
+
+async def test_aligned_query_reads_all_sites_at_once(client, site_id):
+    from sqlalchemy import event
+    from db.session import get_engine
+
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    other = (
+        await client.post(
+            f"/projects/{project_id}/sites", json={"project_id": project_id, "name": "Site B"}
+        )
+    ).json()["id"]
+    await _upload(client, site_id, [("2020-01-01T00:00:00Z", 10, 0.1), (RECENT.isoformat(), 40, 0.4)])
+    await _upload(client, other, [("2020-01-01T00:00:00Z", 11, 0.2), (RECENT.isoformat(), 41, 0.5)])
+    for archived in (site_id, other):
+        await client.post(f"/data/archive/{archived}", params={"older_than_days": 30})
+
+    raw_selects = []
+
+    def count_raw_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM time_series_raw" in statement:
+            raw_selects.append(statement)
+
+    engine = get_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", count_raw_selects)
+    try:
+        frame = await client.post(
+            f"/projects/{project_id}/timeseries/query",
+            json={
+                "series": [
+                    {"site_id": site_id, "parameter": "depth"},
+                    {"site_id": other, "parameter": "velocity"},
+                ]
+            },
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count_raw_selects)
+    # Only the requested (site, parameter) pairs, from one query and one archive scan.
+    assert frame.json()["values"] == [[10.0, 0.2], [40.0, 0.5]]
+    assert len(raw_selects) == 1
+
@@ -0,0 +1,59 @@
+import csv
+import io
+import zipfile
+from datetime import datetime, timedelta, timezone
+from db.models.core import TimeSeriesProcessed
+from db.session import new_session
+
+
+async def _seed_processed(site_id: int, count: int = 3, parameter: str = "flow") -> None:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with new_session() as session:
+        session.add_all(
+            TimeSeriesProcessed(
+                site_id=site_id,
+                parameter=parameter,
+                timestamp=start + timedelta(minutes=15 * i),
+                value=0.01 * (i + 1),
+                unit="m3/s",
+            )
+            for i in range(count)
+        )
+        await session.commit()
+
+
+async def test_export_site_csv_and_swmm(client, site_id):
+    await _seed_processed(site_id)
+
+    csv = await client.get(f"/exports/sites/{site_id}/csv")
+    assert csv.status_code == 200
+    lines = csv.text.splitlines()
+    assert lines[0] == "timestamp,parameter,value,unit,qc_summary"
+    assert lines[1] == "2024-01-01T00:00:00+00:00,flow,0.01,m3/s,"
+    assert len(lines) == 4
+
+    swmm = (await client.get(f"/exports/sites/{site_id}/swmm")).text
+    assert swmm.startswith("[INFLOWS]")
+    assert "[TIMESERIES]" in swmm
+    assert "Site_A_flow 01/01/2024 00:15 0.02" in swmm
+
+
+async def test_export_csv_quotes_free_text(client, site_id):
+    await _seed_processed(site_id, count=1, parameter='depth, "raw"\nlogger')
+
+    response = await client.get(f"/exports/sites/{site_id}/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[1] == ["2024-01-01T00:00:00+00:00", 'depth, "raw"\nlogger', "0.01", "m3/s", ""]
+
+
+async def test_export_project_zip(client, site_id):
+    await _seed_processed(site_id)
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+
+    response = await client.get(f"/exports/projects/{project_id}/zip")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        assert f"{site_id}-Site_A/cleaned.csv" in names
+        assert "swmm_inflows.inp" in names
+        assert archive.read(names[0]).decode().count("\n") == 4
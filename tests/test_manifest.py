@@ -0,0 +1,138 @@
+import io
+import json
+import math
+import zipfile
+
+CSV_A = "timestamp,depth,velocity\n2024-01-01T00:00:00Z,100,0.5\n2024-01-01T00:15:00Z,110,\n"
+CSV_B = "timestamp,depth\n2024-01-01T00:15:00Z,110\n2024-01-02T00:00:00Z,130\n"
+
+
+def _zip(members: dict[str, str]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return buffer.getvalue()
+
+
+async def test_site_coverage_from_manifests(client, site_id):
+    empty = (await client.get(f"/data/coverage/{site_id}")).json()
+    assert empty["uploads"] == 0 and empty["parameters"] == []
+
+    response = await client.post(
+        f"/data/upload/{site_id}", files={"file": ("a.csv", CSV_A, "text/csv")}
+    )
+    assert response.json()["manifest_id"] is not None
+    response = await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", _zip({"b.csv": CSV_B}), "application/zip")},
+        data={"manifest": json.dumps({"b.csv": site_id})},
+    )
+    assert response.json()["files"][0]["manifest_id"] is not None
+
+    coverage = (await client.get(f"/data/coverage/{site_id}")).json()
+    assert coverage["uploads"] == 2
+    assert coverage["rows"] == 5
+    # The 00:15 depth sample was sent twice but stored once.
+    assert (coverage["inserted"], coverage["skipped"]) == (4, 1)
+    assert coverage["first_timestamp"] == "2024-01-01T00:00:00Z"
+    assert coverage["last_timestamp"] == "2024-01-02T00:00:00Z"
+
+    depth, velocity = coverage["parameters"]
+    # Statistics cover stored samples, so the skipped duplicate is not counted again.
+    assert (depth["parameter"], depth["uploads"], depth["samples"]) == ("depth", 2, 3)
+    assert (depth["min"], depth["max"]) == (100, 130)
+    values = [100, 110, 130]
+    mean = sum(values) / len(values)
+    assert math.isclose(depth["mean"], mean)
+    assert math.isclose(depth["std"], math.sqrt(sum((v - mean) ** 2 for v in values) / len(values)))
+    assert (velocity["parameter"], velocity["uploads"], velocity["samples"]) == ("velocity", 1, 1)
+    assert velocity["std"] == 0
+
+
+async def test_project_coverage(client, site_id):
+    await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", CSV_A, "text/csv")})
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+
+    coverage = (await client.get(f"/projects/{project_id}/coverage")).json()
+    assert coverage["uploads"] == 1
+    assert [s["site_id"] for s in coverage["sites"]] == [site_id]
+    assert coverage["last_timestamp"] == "2024-01-01T00:15:00Z"
+
+    assert (await client.get(f"/projects/{project_id + 1}/coverage")).status_code == 404
+    assert (await client.get(f"/data/coverage/{site_id + 1}")).status_code == 404
+
+
+async def test_coverage_ignores_skipped_and_replaced_values(client, site_id):
+    first = "timestamp,depth\n2024-01-01T00:00:00Z,2\n"
+    overlap = "timestamp,depth\n2024-01-01T00:00:00Z,1\n2024-01-01T00:05:00Z,4\n"
+    await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", first, "text/csv")})
+    await client.post(f"/data/upload/{site_id}", files={"file": ("b.csv", overlap, "text/csv")})
+    (depth,) = (await client.get(f"/data/coverage/{site_id}")).json()["parameters"]
+    # 00:00 keeps its first value, 2; only 00:05 was stored by the overlap.
+    assert (depth["samples"], depth["mean"]) == (2, 3.0)
+
+    corrected = "timestamp,depth\n2024-01-01T00:00:00Z,8\n2024-01-01T00:05:00Z,4\n"
+    await client.post(
+        f"/data/upload/{site_id}",
+        files={"file": ("c.csv", corrected, "text/csv")},
+        params={"on_conflict": "update"},
+    )
+    coverage = (await client.get(f"/data/coverage/{site_id}")).json()
+    assert (coverage["inserted"], coverage["updated"]) == (2, 1)
+    (depth,) = coverage["parameters"]
+    # Stored now: 8 and 4; the overwritten 2 is subtracted again.
+    assert (depth["samples"], depth["uploads"]) == (2, 3)
+    assert math.isclose(depth["mean"], 6.0)
+    assert math.isclose(depth["std"], 2.0)
+
+
+async def test_telemetry_recorded_in_manifest(client, site_id):
+    readings = [
+        {
+            "site_id": site_id,
+            "parameter": "depth",
+            "timestamp": f"2024-01-01T00:0{i}:00Z",
+            "value": 100.0 + i,
+        }
+        for i in range(3)
+    ]
+    await client.post("/telemetry/readings", json={"device": "logger-7", "readings": readings})
+    from app.main import app
+
+    buffer = app.state.telemetry
+    while buffer.pending:
+        await buffer.flush()
+    # Later flushes on the same day fold into the same manifest.
+    for i in range(3, 6):
+        reading = {**readings[0], "timestamp": f"2024-01-01T00:0{i}:00Z", "value": 100.0 + i}
+        await client.post("/telemetry/readings", json={"device": "logger-7", "readings": [reading]})
+        await buffer.flush()
+
+    coverage = (await client.get(f"/data/coverage/{site_id}")).json()
+    assert (coverage["uploads"], coverage["rows"], coverage["inserted"]) == (1, 6, 6)
+    assert coverage["last_timestamp"] == "2024-01-01T00:05:00Z"
+    (depth,) = coverage["parameters"]
+    assert (depth["samples"], depth["min"], depth["max"]) == (6, 100, 105)
+    assert math.isclose(depth["mean"], 102.5)
+    assert math.isclose(depth["std"], math.sqrt(sum((v - 2.5) ** 2 for v in range(6)) / 6))
+
+
+async def test_std_is_stable_for_large_values(client, site_id):
+    # Large readings with little spread: sum_sq / n - mean**2 cancels to noise here.
+    base = 1e9
+    first = "timestamp,depth\n" + "".join(
+        f"2024-01-01T00:{i:02d}:00Z,{base + v}\n" for i, v in enumerate([0.1, 0.2, 0.3])
+    )
+    second = "timestamp,depth\n" + "".join(
+        f"2024-01-02T00:{i:02d}:00Z,{base + v}\n" for i, v in enumerate([0.4, 0.5])
+    )
+    for name, text in (("a.csv", first), ("b.csv", second)):
+        await client.post(f"/data/upload/{site_id}", files={"file": (name, text, "text/csv")})
+
+    (depth,) = (await client.get(f"/data/coverage/{site_id}")).json()["parameters"]
+    offsets = [0.1, 0.2, 0.3, 0.4, 0.5]
+    mean = sum(offsets) / len(offsets)
+    expected = math.sqrt(sum((v - mean) ** 2 for v in offsets) / len(offsets))
+    assert depth["uploads"] == 2
+    assert math.isclose(depth["std"], expected, rel_tol=1e-5)
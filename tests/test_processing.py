@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.services.hydraulics import circular_area
+from app.services.processing import merge_spans
+from db.models.core import RawChange, TimeSeriesProcessed
+from db.session import new_session
+
+
+def _csv(day: int, depths: list[float], velocities: list[float]) -> str:
+    rows = [
+        f"2024-01-{day:02d}T{h:02d}:00:00Z,{d},{v}"
+        for h, (d, v) in enumerate(zip(depths, velocities))
+    ]
+    return "timestamp,depth,velocity\n" + "\n".join(rows) + "\n"
+
+
+async def _upload(client, site_id, text):
+    response = await client.post(
+        f"/data/upload/{site_id}", files={"file": ("logger.csv", text, "text/csv")}
+    )
+    assert response.status_code == 200
+
+
+async def _processed(site_id, parameter):
+    async with new_session() as session:
+        result = await session.scalars(
+            select(TimeSeriesProcessed)
+            .where(TimeSeriesProcessed.site_id == site_id, TimeSeriesProcessed.parameter == parameter)
+            .order_by(TimeSeriesProcessed.timestamp)
+        )
+        return list(result)
+
+
+def test_merge_spans():
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    spans = merge_spans([day, day + timedelta(days=1), day + timedelta(days=5)])
+    assert spans == [
+        (day, day + timedelta(days=2)),
+        (day + timedelta(days=5), day + timedelta(days=6)),
+    ]
+
+
+async def test_process_site_incremental(client, site_id):
+    await _upload(client, site_id, _csv(1, [100, 150, -5], [0.5, 0.6, 0.7]))
+
+    response = await client.post(f"/data/process/{site_id}")
+    assert response.status_code == 200
+    assert response.json() == {
+        "site_id": site_id,
+        "spans": 1,
+        "written": {"depth": 3, "velocity": 3, "flow": 3},
+    }
+
+    flow = await _processed(site_id, "flow")
+    assert flow[1].value == pytest.approx(circular_area(300, 150) * 0.6, rel=1e-6)
+    assert flow[1].unit == "m3/s"
+    assert flow[1].source_raw_id is not None
+    depth = await _processed(site_id, "depth")
+    assert [r.qc_summary for r in depth] == ["OK", "OK", "RANGE"]
+    assert flow[2].qc_summary == "RANGE"
+
+    # Nothing new since the last run.
+    response = await client.post(f"/data/process/{site_id}")
+    assert response.json()["spans"] == 0
+
+    # Only the day that received new raw data is reprocessed.
+    await _upload(client, site_id, _csv(3, [120], [0.4]))
+    response = await client.post(f"/data/process/{site_id}")
+    assert response.json()["written"] == {"depth": 1, "velocity": 1, "flow": 1}
+    assert len(await _processed(site_id, "flow")) == 4
+
+    # A full rerun rewrites in place rather than duplicating.
+    response = await client.post(f"/data/process/{site_id}", params={"full": "true"})
+    assert response.json()["spans"] == 2
+    assert len(await _processed(site_id, "depth")) == 4
+
+
+async def test_process_site_picks_up_updated_samples(client, site_id):
+    await _upload(client, site_id, _csv(1, [100, 150], [0.5, 0.6]))
+    await _upload(client, site_id, _csv(2, [110], [0.5]))
+    await client.post(f"/data/process/{site_id}")
+
+    corrected = "timestamp,depth\n2024-01-01T01:00:00Z,175\n"
+    response = await client.post(
+        f"/data/upload/{site_id}",
+        params={"on_conflict": "update"},
+        files={"file": ("fix.csv", corrected, "text/csv")},
+    )
+    assert response.json()["updated"] == 1
+
+    # Only the corrected day is reprocessed, including its derived flow.
+    response = await client.post(f"/data/process/{site_id}")
+    assert response.json()["written"] == {"depth": 2, "flow": 2}
+    assert [r.value for r in await _processed(site_id, "depth")] == [100, 175, 110]
+    flow = await _processed(site_id, "flow")
+    assert flow[1].value == pytest.approx(circular_area(300, 175) * 0.6, rel=1e-6)
+    async with new_session() as session:
+        assert await session.scalar(select(func.count()).select_from(RawChange)) == 0
+    assert (await client.post(f"/data/process/{site_id}")).json()["spans"] == 0
+
+
+async def test_spike_flags_do_not_depend_on_run(client, site_id):
+    quiet = [100 + (h % 4) * 0.5 for h in range(24)]
+    quiet[12] = 130
+    busy = [200 + (-1) ** h * 80 for h in range(24)]
+    await _upload(client, site_id, _csv(1, quiet, [0.5] * 24))
+    await client.post(f"/data/process/{site_id}")
+    await _upload(client, site_id, _csv(2, busy, [0.5] * 24))
+    await client.post(f"/data/process/{site_id}")
+    incremental = [r.qc_summary for r in await _processed(site_id, "depth")]
+    assert incremental[12] == "SPIKE"
+
+    await client.post(f"/data/process/{site_id}", params={"full": "true"})
+    assert [r.qc_summary for r in await _processed(site_id, "depth")] == incremental
+
+
+async def test_process_project(client, site_id):
+    await _upload(client, site_id, _csv(1, [100], [0.5]))
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    response = await client.post(f"/projects/{project_id}/process")
+    assert response.status_code == 200
+    assert response.json()[0]["written"]["flow"] == 1
+    assert (await client.post("/data/process/9999")).status_code == 404
+
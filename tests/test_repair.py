@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.services.repair import RepairLimits, RepairMethod, repair_block
+from app.services.series import QCFlag, TimeSeriesBlock
+from db.models.core import RatingCurve, TimeSeriesProcessed
+from db.session import new_session
+
+HOUR = 3600 * 10**9
+DAY = 24 * HOUR
+
+
+def _block(timestamps, values, flags=None, parameter="depth"):
+    return TimeSeriesBlock(np.array(timestamps), np.array(values), flags, site_id=1, parameter=parameter)
+
+
+def test_short_gap_is_interpolated():
+    ts = [0, HOUR, 3 * HOUR, 4 * HOUR]
+    flags = np.array([0, QCFlag.SPIKE, 0, 0], dtype=np.uint8)
+    result = repair_block(_block(ts, [1.0, 99.0, 4.0, 5.0], flags), RepairLimits(linear_max_s=2 * 3600))
+    # The spike and the hole at 2h form one two-step gap between 0h and 3h.
+    assert list(result.timestamps) == [HOUR, 2 * HOUR]
+    assert list(result.values) == pytest.approx([2.0, 3.0])
+    assert list(result.methods) == [RepairMethod.LINEAR] * 2
+    assert result.original_values[0] == 99.0 and np.isnan(result.original_values[1])
+
+
+def test_long_gap_uses_dwf_profile_and_max_gap():
+    # Two weekdays of hourly data following a diurnal pattern, then a 6h hole.
+    ts = np.arange(0, 2 * DAY, HOUR)
+    values = (ts % DAY) / HOUR
+    keep = ~((ts >= DAY + 10 * HOUR) & (ts < DAY + 16 * HOUR))
+    block = _block(ts[keep], values[keep])
+
+    result = repair_block(block, RepairLimits(linear_max_s=3600, profile_step_s=3600))
+    assert list(result.methods) == [RepairMethod.DWF] * 6
+    assert list(result.values) == pytest.approx([10, 11, 12, 13, 14, 15])
+
+    assert repair_block(block, RepairLimits(max_gap_s=5 * 3600)).unfilled == 6
+
+
+def test_rating_reference_preferred_for_long_flow_gaps():
+    ts = np.arange(0, 10 * HOUR, HOUR)
+    flags = np.zeros(ts.size, dtype=np.uint8)
+    flags[3:7] = QCFlag.FLAT
+    flow = _block(ts, np.ones(ts.size), flags, parameter="flow")
+    reference = _block(ts, np.full(ts.size, 2.0), parameter="flow")
+    result = repair_block(flow, RepairLimits(linear_max_s=3600), reference=reference)
+    assert list(result.methods) == [RepairMethod.RATING] * 4
+    assert list(result.values) == [2.0] * 4
+
+
+async def test_repair_endpoint_writes_provenance(client, site_id):
+    # Depth is missing at 6h; velocity is missing from 2h to 4h.
+    rows = "\n".join(
+        f"2024-01-01T{h:02d}:00:00Z,{100 + h},{'' if 2 <= h <= 4 else 0.5}" for h in range(8) if h != 6
+    )
+    await client.post(
+        f"/data/upload/{site_id}",
+        files={"file": ("logger.csv", f"timestamp,depth,velocity\n{rows}\n", "text/csv")},
+    )
+    await client.post(f"/data/process/{site_id}")
+    async with new_session() as session:
+        session.add(RatingCurve(site_id=site_id, coefficients={"a": 1.0, "b": 1.0}))
+        await session.commit()
+
+    response = await client.post(f"/data/repair/{site_id}")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["repaired"]["depth"] == {"linear": 1}
+    # The three-hour flow gap is too long to interpolate; depth there is good.
+    assert body["repaired"]["flow"] == {"rating": 3, "linear": 1}
+
+    csv = (await client.get(f"/exports/sites/{site_id}/csv", params={"parameter": "flow"})).text
+    repaired = [line.split(",") for line in csv.splitlines() if line.endswith("REPAIRED")]
+    assert [float(r[2]) for r in repaired[:3]] == pytest.approx([0.102, 0.103, 0.104])
+
+    async with new_session() as session:
+        depth = await session.scalar(
+            select(TimeSeriesProcessed).where(
+                TimeSeriesProcessed.site_id == site_id,
+                TimeSeriesProcessed.parameter == "depth",
+                TimeSeriesProcessed.qc_summary == "REPAIRED",
+            )
+        )
+    assert depth.value == pytest.approx(106.0)
+    assert depth.record_metadata == {
+        "repair": "linear",
+        "original_flag": "MISSING",
+        "original_value": None,
+        "gap_s": 3600,
+    }
+
+    # Repaired points are not repaired again.
+    again = (await client.post(f"/data/repair/{site_id}")).json()
+    assert again["repaired"]["depth"] == {}
@@ -0,0 +1,109 @@
+import asyncio
+import io
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import numpy as np
+from openpyxl import load_workbook
+from app.services import reports
+from app.services.report_render import render_xlsx
+from app.services.reports import ArtifactCache, compute_hydraulics, detect_ii_events
+from app.services.series import TimeSeriesBlock
+
+HOUR = 3600 * 1_000_000_000
+
+
+def _csv(hours: range, velocity: float) -> str:
+    rows = [f"2024-01-01T{h:02d}:00:00Z,{100 + h},{velocity}" for h in hours]
+    return "timestamp,depth,velocity\n" + "\n".join(rows) + "\n"
+
+
+async def _run(client, site_id: int, fmt: str = "pdf") -> dict:
+    job = (await client.post(f"/reports/sites/{site_id}", params={"format": fmt})).json()
+    for _ in range(200):
+        job = (await client.get(f"/reports/jobs/{job['id']}")).json()
+        if job["status"] in ("done", "failed"):
+            break
+        await asyncio.sleep(0.05)
+    assert job["status"] == "done", job
+    return job
+
+
+def test_detect_ii_events_finds_sustained_peak():
+    timestamps = np.arange(12) * HOUR
+    flow = np.array([1, 1, 1, 1, 3, 3, 3, 1, 1, 1, 2.0, 1])
+    result = detect_ii_events(TimeSeriesBlock(timestamps, flow))
+    assert result["baseline"] == 1.0
+    assert len(result["events"]) == 1  # the single-sample bump at hour 10 is too short
+    assert result["events"][0]["duration_h"] == 2.0
+
+
+async def test_report_reuses_unchanged_stages(client, site_id):
+    await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", _csv(range(6), 0.5))})
+
+    first = await _run(client, site_id)
+    assert set(first["stages"].values()) == {"computed"}
+    download = await client.get(f"/reports/jobs/{first['id']}/download")
+    assert download.content.startswith(b"%PDF-1.4")
+
+    # New velocity data only: depth stages come from cache, velocity-dependent ones rerun.
+    velocity_only = "timestamp,velocity\n2024-01-01T10:00:00Z,0.9\n"
+    await client.post(f"/data/upload/{site_id}", files={"file": ("b.csv", velocity_only)})
+    second = await _run(client, site_id, fmt="xlsx")
+    assert second["stages"]["stats.depth"] == "cached"
+    assert second["stages"]["chart.depth"] == "cached"
+    assert second["stages"]["stats.velocity"] == "computed"
+    assert second["stages"]["hydraulics"] == "computed"
+
+    third = await _run(client, site_id)
+    assert set(third["stages"].values()) == {"cached"}
+
+    download = await client.get(f"/reports/jobs/{second['id']}/download")
+    workbook = load_workbook(io.BytesIO(download.content))
+    assert {"Summary", "QC Stats", "Hydraulics", "I-I Events"} <= set(workbook.sheetnames)
+
+
+def test_peak_depth_ratio_uses_depth_coincident_with_velocity():
+    depth = TimeSeriesBlock(np.arange(3) * HOUR, np.array([100.0, 150.0, 290.0]))
+    velocity = TimeSeriesBlock(np.arange(2) * HOUR, np.array([0.5, 0.6]))
+    summary = compute_hydraulics(depth, velocity, 300.0)["summary"]
+    assert summary["samples"] == 2
+    assert summary["peak_depth_ratio"] == 0.5
+
+
+def test_xlsx_chart_sheets_accept_any_parameter_name():
+    chart = {"title": "t", "x": np.arange(2) * HOUR, "y": np.array([1.0, 2.0])}
+    names = ["flow [m3/s]", "a/b?c*d:e\\f", "x" * 40, "x" * 40 + "y"]
+    artifacts = {f"chart.{name}": chart for name in names}
+    site = {"name": "A", "code": None, "pipe_material": None, "pipe_diameter_mm": 300}
+    workbook = load_workbook(io.BytesIO(render_xlsx("site", site, artifacts)))
+    titles = workbook.sheetnames[1:]
+    assert titles[:2] == ["Chart flow _m3_s_", "Chart a_b_c_d_e_f"]
+    assert len(set(titles)) == 4 and all(len(t) <= 31 for t in titles)
+
+
+def test_artifact_cache_keeps_stage_files_inside_site_dir(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+    cache.store(1, "stats.depth", "k1", {"n": 1})
+    hostile = "stats.../../*"
+    cache.store(1, hostile, "k2", {"n": 2})
+    assert cache.load(1, "stats.depth", "k1") == {"n": 1}
+    assert cache.load(1, hostile, "k2") == {"n": 2}
+    assert {p.parent for p in (tmp_path / "cache").rglob("*.pkl")} == {tmp_path / "cache" / "site_1"}
+
+
+async def test_report_jobs_outlive_process_memory_until_ttl(client, site_id):
+    await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", _csv(range(3), 0.5))})
+    job = await _run(client, site_id)
+
+    # Another worker only sees the job through the report directory.
+    reports._jobs.clear()
+    status = await client.get(f"/reports/jobs/{job['id']}")
+    assert status.json()["status"] == "done"
+    assert (await client.get(f"/reports/jobs/{job['id']}/download")).status_code == 200
+    assert (await client.get("/reports/jobs/..%2F..%2Fetc")).status_code == 404
+
+    output = reports.get_report_job(job["id"]).output_path
+    later = datetime.now(timezone.utc) + timedelta(days=2)
+    assert reports.evict_expired_jobs(now=later) >= 1
+    assert not Path(output).exists()
+    assert (await client.get(f"/reports/jobs/{job['id']}")).status_code == 404
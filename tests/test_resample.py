@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import column
+
+from app.services.aggregation import bucket_expression, parse_aggregations, parse_interval
+
+CSV = "timestamp,depth\n" + "".join(
+    f"2024-01-01T00:{minute:02d}:00Z,{value}\n"
+    for minute, value in [(0, 10), (5, 20), (10, 30), (15, 40), (30, 100)]
+)
+
+
+def test_parse_interval_and_aggregations():
+    assert parse_interval("15min") == 900
+    assert parse_interval("1d") == 86400
+    assert parse_aggregations(["mean", "p95"]) == {"mean": None, "p95": 0.95}
+    with pytest.raises(ValueError):
+        parse_interval("15 fortnights")
+    with pytest.raises(ValueError):
+        parse_aggregations(["median"])
+    with pytest.raises(ValueError, match="not supported"):
+        bucket_expression("mysql", column("timestamp"), 900)
+
+
+async def test_resample_pushes_buckets_into_sql(client, site_id):
+    await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", CSV, "text/csv")})
+
+    response = await client.get(
+        f"/data/timeseries/{site_id}/resample",
+        params=[("interval", "15min"), ("agg", "mean"), ("agg", "max"), ("agg", "count"), ("agg", "p50")],
+    )
+    assert response.status_code == 200
+    rows = response.json()
+    assert [r["timestamp"] for r in rows] == [
+        "2024-01-01T00:00:00+00:00",
+        "2024-01-01T00:15:00+00:00",
+        "2024-01-01T00:30:00+00:00",
+    ]
+    assert rows[0]["mean"] == pytest.approx(20.0)
+    assert rows[0]["max"] == 30.0
+    assert rows[0]["count"] == 3
+    assert rows[0]["p50"] == pytest.approx(20.0)
+    assert rows[2]["p50"] == pytest.approx(100.0)
+
+
+async def test_resample_rejects_bad_interval(client, site_id):
+    response = await client.get(f"/data/timeseries/{site_id}/resample", params={"interval": "soon"})
+    assert response.status_code == 400
+
+
+async def test_resample_unknown_site(client, site_id):
+    response = await client.get(f"/data/timeseries/{site_id + 1}/resample")
+    assert response.status_code == 404
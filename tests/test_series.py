@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.hydraulics import flow_from_blocks
+from app.services.ingestion import summarize_timeseries, to_blocks
+from app.services.qc import run_qc_checks
+from app.services.series import QCFlag, TimeSeriesBlock
+
+MINUTE = 60 * 1_000_000_000
+
+
+def _frame(n: int = 40) -> pd.DataFrame:
+    depth = np.linspace(100, 140, n)
+    depth[10:25] = 120.0  # flat line
+    depth[30] = 900.0  # spike
+    return pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2024-01-01", periods=n, freq="1min", tz="UTC"),
+            "depth": depth,
+            "velocity": np.full(n, 0.5),
+        }
+    )
+
+
+def test_block_layout_and_zero_copy_slicing():
+    block = TimeSeriesBlock.from_frame(_frame(), "depth", site_id=7)
+    assert block.timestamps.dtype == np.int64
+    assert block.values.dtype == np.float32
+    assert block.flags.dtype == np.uint8
+    assert block.nbytes == len(block) * 13
+
+    window = block.between(5 * MINUTE + block.timestamps[0], 15 * MINUTE + block.timestamps[0])
+    assert len(window) == 10
+    assert np.shares_memory(window.values, block.values)
+    assert (window.site_id, window.parameter) == (7, "depth")
+
+
+def test_block_memory_mapped_roundtrip(tmp_path):
+    block = TimeSeriesBlock.from_frame(_frame(), "depth", site_id=7)
+    block.save(tmp_path / "depth")
+    reopened = TimeSeriesBlock.open(tmp_path / "depth")
+    assert isinstance(reopened.values.base, np.memmap) or isinstance(reopened.values, np.memmap)
+    assert np.array_equal(reopened.values, block.values)
+    assert reopened.parameter == "depth"
+
+
+def test_services_accept_blocks():
+    df = _frame()
+    blocks = to_blocks(df, ["depth", "velocity"], site_id=7)
+
+    flagged = run_qc_checks(blocks["depth"])
+    frame_flags = run_qc_checks(df, "depth")["qc_flag"].to_numpy()
+    assert list(flagged.to_frame()["qc_flag"]) == list(frame_flags)
+    assert flagged.flags[30] == QCFlag.SPIKE
+    assert np.shares_memory(flagged.values, blocks["depth"].values)
+
+    flow = flow_from_blocks(flagged, blocks["velocity"], diameter_mm=300)
+    assert flow.unit == "m3/s" and len(flow) == len(df)
+    assert flow.flags[30] == QCFlag.SPIKE
+
+    from_blocks = summarize_timeseries(blocks)
+    from_frame = summarize_timeseries(df, ["depth", "velocity"])
+    assert from_blocks["time_range"] == from_frame["time_range"]
+    assert from_blocks["columns"]["depth"]["count"] == 40
+    assert from_blocks["columns"]["depth"]["mean"] == pytest.approx(from_frame["columns"]["depth"]["mean"])
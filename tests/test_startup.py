@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Import + app construction + lifespan startup; the framework itself accounts for most of it.
+STARTUP_BUDGET_S = 1.0
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from app.main import create_app
+app = create_app()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(boot())
+print(json.dumps({
+    "elapsed": time.perf_counter() - start,
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def _probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_skips_numeric_stack_and_meets_budget():
+    # Best of three so a cold .pyc cache or a noisy neighbour does not fail the run.
+    runs = [_probe() for _ in range(3)]
+    assert runs[0]["heavy"] == []
+    assert min(r["elapsed"] for r in runs) < STARTUP_BUDGET_S
@@ -0,0 +1,163 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from sqlalchemy.exc import IntegrityError
+
+from app.config import Settings
+from app.services import telemetry
+from app.services.telemetry import BufferFull, TelemetryBuffer
+from db.models.core import Site
+from db.session import new_session
+
+
+def _batch(site_id: int, start_minute: int = 0, n: int = 3) -> dict:
+    return {
+        "device": "logger-7",
+        "readings": [
+            {
+                "site_id": site_id,
+                "parameter": "depth",
+                "timestamp": f"2024-01-01T00:{start_minute + i:02d}:00Z",
+                "value": 100.0 + i,
+                "unit": "mm",
+            }
+            for i in range(n)
+        ],
+    }
+
+
+async def test_post_readings_flushes_to_raw(client, site_id):
+    response = await client.post("/telemetry/readings", json=_batch(site_id))
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 3
+
+    # Re-sent readings are idempotent once written.
+    await client.post("/telemetry/readings", json=_batch(site_id))
+    from app.main import app
+
+    buffer = app.state.telemetry
+    while buffer.pending:
+        await buffer.flush()
+    assert buffer.stats["inserted"] == 3
+
+    series = (await client.get(f"/data/timeseries/{site_id}")).json()
+    assert [p["value"] for p in series] == [100.0, 101.0, 102.0]
+    assert {p["unit"] for p in series} == {"mm"}
+
+
+async def test_post_readings_unknown_site(client, site_id):
+    response = await client.post("/telemetry/readings", json=_batch(site_id + 99))
+    assert response.status_code == 404
+
+
+async def test_buffer_backpressure():
+    buffer = TelemetryBuffer(max_pending=4, put_timeout_s=0.05)
+    reading = {"site_id": 1, "parameter": "depth", "timestamp": None, "value": 1.0, "source": "x"}
+    assert await buffer.put([reading] * 3) == 3
+    with pytest.raises(BufferFull):
+        await buffer.put([reading] * 2)
+
+    # A waiting producer is admitted once the buffer drains.
+    waiter = asyncio.create_task(buffer.put([reading] * 2))
+    await asyncio.sleep(0.01)
+    async with buffer._cond:
+        buffer._pending.clear()
+        buffer._cond.notify_all()
+    assert await waiter == 2
+
+
+async def test_deleted_site_does_not_drop_other_sites(client, site_id, monkeypatch):
+    project_id = (await client.get("/projects/")).json()[0]["id"]
+    other = (
+        await client.post(
+            f"/projects/{project_id}/sites", json={"project_id": project_id, "name": "Site B"}
+        )
+    ).json()["id"]
+    from app.main import app
+
+    await client.post("/telemetry/readings", json=_batch(site_id))
+    await client.post("/telemetry/readings", json=_batch(other, start_minute=30))
+    buffer = app.state.telemetry
+    while buffer.pending:
+        await buffer.flush()
+    assert site_id in buffer.known_sites
+
+    # SQLite here does not enforce foreign keys; fail the way Postgres would.
+    upsert = telemetry.upsert_raw_rows
+    deleted_channel = buffer._channels[(site_id, "depth")]
+
+    async def upsert_checking_site(session, rows, on_conflict="skip"):
+        if any(r["channel_id"] == deleted_channel for r in rows):
+            raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        return await upsert(session, rows, on_conflict)
+
+    monkeypatch.setattr(telemetry, "upsert_raw_rows", upsert_checking_site)
+    async with new_session() as session:
+        await session.delete(await session.get(Site, site_id))
+        await session.commit()
+
+    # The buffer still knows the deleted site, so its readings are accepted.
+    await client.post("/telemetry/readings", json=_batch(site_id, start_minute=10))
+    await client.post("/telemetry/readings", json=_batch(other))
+    assert await buffer.flush() == 6
+    assert buffer.pending == 0
+    assert buffer.stats["dropped"] == 3
+    assert site_id not in buffer.known_sites
+    series = (await client.get(f"/data/timeseries/{other}")).json()
+    assert [p["value"] for p in series] == [100.0, 101.0, 102.0] * 2
+    assert (await client.post("/telemetry/readings", json=_batch(site_id))).status_code == 404
+
+
+async def test_stop_drops_unwritable_readings_with_a_count(monkeypatch, caplog):
+    buffer = TelemetryBuffer(max_retries=2)
+
+    async def failing_write(site_id, readings):
+        raise RuntimeError("database unavailable")
+
+    async def none_deleted(site_ids):
+        return set()
+
+    monkeypatch.setattr(buffer, "_write", failing_write)
+    monkeypatch.setattr(buffer, "_deleted_sites", none_deleted)
+    reading = {"site_id": 1, "parameter": "depth", "timestamp": None, "value": 1.0, "source": "x"}
+    await buffer.put([reading] * 2)
+    await buffer.stop()
+    assert buffer.pending == 0
+    assert buffer.stats["dropped"] == 2
+    assert "Dropping 2 telemetry readings after 2 failed flushes" in caplog.text
+
+
+def test_websocket_ingest(tmp_path):
+    from db.session import Base
+    from db.models.core import Project, Site
+
+    path = tmp_path / "ws.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        site = Site(name="Site A", project=Project(name="P"))
+        session.add(site)
+        session.commit()
+        site_id = site.id
+    engine.dispose()
+
+    from app.main import create_app
+
+    app = create_app(Settings(database_url=f"sqlite+aiosqlite:///{path}", debug=False))
+    with TestClient(app) as tc, tc.websocket_connect("/telemetry/ws") as ws:
+        ws.send_json(_batch(site_id, n=5))
+        ack = ws.receive_json()
+        assert (ack["status"], ack["accepted"]) == (202, 5)
+        ws.send_text("{}")
+        assert ws.receive_json()["status"] == 422
+        ws.send_json(_batch(site_id + 1))
+        assert ws.receive_json()["status"] == 404
+
+    # Shutdown flushes whatever the interval had not yet written.
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT count(*) FROM time_series_raw").fetchone()[0] == 5
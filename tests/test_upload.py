@@ -0,0 +1,168 @@
+import io
+import json
+import zipfile
+
+from sqlalchemy.exc import OperationalError
+
+from app.api.routes import data
+from app.config import get_settings
+
+
+def _zip(members: dict[str, str]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return buffer.getvalue()
+
+
+CSV = "timestamp,depth,velocity\n2024-01-01T00:00:00Z,100,0.5\n2024-01-01T00:15:00Z,110,\n"
+
+
+async def test_upload_single_file(client, site_id):
+    response = await client.post(
+        f"/data/upload/{site_id}", files={"file": ("logger.csv", CSV, "text/csv")}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["records_imported"] == 3
+    assert body["parameters"]["depth"]["count"] == 2
+
+
+async def test_upload_batch_zip(client, site_id):
+    archive = _zip({"a.csv": CSV, "b.csv": CSV, "bad.csv": "time,depth\n1,2\n", "extra.csv": CSV})
+    manifest = {"a.csv": site_id, "b.csv": site_id, "bad.csv": site_id, "gone.csv": site_id}
+    response = await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", archive, "application/zip")},
+        data={"manifest": json.dumps(manifest)},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["files_processed"] == 2
+    assert body["files_failed"] == 3
+    # b.csv repeats a.csv for the same site, so its samples are skipped.
+    assert body["records_imported"] == 3
+    assert body["skipped"] == 3
+    errors = {f["filename"]: f["error"] for f in body["files"]}
+    assert errors["extra.csv"] == "Not listed in manifest"
+    assert errors["gone.csv"] == "Not found in archive"
+    assert errors["bad.csv"].startswith("Failed to parse CSV")
+
+    series = await client.get(f"/data/timeseries/{site_id}", params={"parameter": "depth"})
+    assert len(series.json()) == 2
+
+
+async def test_upload_batch_reports_storage_errors_per_member(client, site_id, monkeypatch):
+    upsert = data.upsert_raw_rows
+
+    async def failing_upsert(session, rows, on_conflict="skip"):
+        if any(r["value"] == 999 for r in rows):
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return await upsert(session, rows, on_conflict)
+
+    monkeypatch.setattr(data, "upsert_raw_rows", failing_upsert)
+    archive = _zip({"a.csv": CSV, "b.csv": CSV.replace("2024-01-01", "2024-02-01").replace("110", "999")})
+    response = await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", archive, "application/zip")},
+        data={"manifest": json.dumps({"a.csv": site_id, "b.csv": site_id})},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["files_processed"], body["files_failed"], body["records_imported"]) == (1, 1, 3)
+    errors = {f["filename"]: f["error"] for f in body["files"]}
+    assert errors["a.csv"] is None
+    assert errors["b.csv"] == "Failed to store data: database is locked"
+
+
+async def test_upload_batch_isolates_unreadable_members(client, site_id, monkeypatch):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("a.csv", CSV)
+        zf.writestr("corrupt.csv", CSV.replace("2024-01-01", "2024-03-01"))
+        zf.writestr("huge.csv", CSV.replace("2024-01-01", "2024-04-01") + "#" * 200)
+    # Flip a byte inside the stored data so its CRC no longer matches.
+    raw = bytearray(buffer.getvalue())
+    offset = raw.index(b"2024-03-01")
+    raw[offset] = ord("3")
+    monkeypatch.setattr(get_settings(), "batch_member_max_bytes", 150)
+
+    response = await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", bytes(raw), "application/zip")},
+        data={"manifest": json.dumps({n: site_id for n in ("a.csv", "corrupt.csv", "huge.csv")})},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["files_processed"], body["files_failed"], body["records_imported"]) == (1, 2, 3)
+    errors = {f["filename"]: f["error"] for f in body["files"]}
+    assert errors["a.csv"] is None
+    assert errors["corrupt.csv"].startswith("Failed to read member")
+    assert errors["huge.csv"] == "Member exceeds 150 bytes uncompressed"
+
+
+async def test_upload_batch_rejects_bad_manifest(client):
+    response = await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", _zip({}), "application/zip")},
+        data={"manifest": "[1, 2]"},
+    )
+    assert response.status_code == 400
+
+
+async def test_reupload_overlap_is_idempotent(client, site_id):
+    await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", CSV, "text/csv")})
+    overlap = CSV + "2024-01-01T00:30:00Z,120,0.6\n"
+
+    response = await client.post(f"/data/upload/{site_id}", files={"file": ("b.csv", overlap, "text/csv")})
+    body = response.json()
+    assert (body["inserted"], body["updated"], body["skipped"]) == (2, 0, 3)
+
+    changed = overlap.replace(",100,", ",105,")
+    response = await client.post(
+        f"/data/upload/{site_id}",
+        params={"on_conflict": "update"},
+        files={"file": ("c.csv", changed, "text/csv")},
+    )
+    body = response.json()
+    assert (body["inserted"], body["updated"], body["skipped"]) == (0, 1, 4)
+
+    series = (await client.get(f"/data/timeseries/{site_id}", params={"parameter": "depth"})).json()
+    assert [p["value"] for p in series] == [105.0, 110.0, 120.0]
+
+
+async def test_upload_header_units_populate_channels(client, site_id):
+    text = "timestamp,depth (mm),velocity [m/s]\n2024-01-01T00:00:00Z,100,0.5\n"
+    response = await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", text, "text/csv")})
+    assert set(response.json()["parameters"]) == {"depth", "velocity"}
+
+    # A later file without units keeps them; the batch path parses headers the same way.
+    archive = _zip({"b.csv": "timestamp,depth\n2024-01-01T00:15:00Z,110\n"})
+    await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", archive, "application/zip")},
+        data={"manifest": json.dumps({"b.csv": site_id})},
+    )
+    series = (await client.get(f"/data/timeseries/{site_id}")).json()
+    assert [(p["parameter"], p["unit"]) for p in series] == [
+        ("depth", "mm"),
+        ("velocity", "m/s"),
+        ("depth", "mm"),
+    ]
+
+
+async def test_upload_rejects_headers_naming_one_parameter_twice(client, site_id):
+    text = "timestamp,depth (mm),depth\n2024-01-01T00:00:00Z,100,101\n"
+    response = await client.post(f"/data/upload/{site_id}", files={"file": ("a.csv", text, "text/csv")})
+    assert response.status_code == 400
+    assert "depth" in response.json()["detail"]
+
+    response = await client.post(
+        "/data/upload/batch",
+        files={"file": ("survey.zip", _zip({"a.csv": text}), "application/zip")},
+        data={"manifest": json.dumps({"a.csv": site_id})},
+    )
+    assert response.json()["files"][0]["error"].startswith("Failed to parse CSV")
+    assert (await client.get(f"/data/timeseries/{site_id}")).json() == []
+    assert (await client.get(f"/data/coverage/{site_id}")).json()["uploads"] == 0